@@ -1,16 +1,101 @@
-import numpy as np
-import pandas as pd
-from datetime import datetime, timedelta
+from __future__ import annotations
+
+from datetime import date, datetime, timedelta
+import gc
+import importlib
 import json
-import random
+import os
+import time
+import hashlib
+import sqlite3
+import threading
+import uuid
+import zlib
+from abc import ABC, abstractmethod
+from collections import OrderedDict
 from typing import Dict, List, Tuple, Optional, Union
 
 
+class _LazyModule:
+    """
+    Stand-in for a heavy module that imports it on first attribute access.
+
+    The real module then replaces the stand-in in this module's globals, so
+    only the first access pays for the indirection.
+    """
+
+    def __init__(self, name: str, alias: str):
+        self._name = name
+        self._alias = alias
+
+    def __getattr__(self, attr):
+        module = importlib.import_module(self._name)
+        globals()[self._alias] = module
+        return getattr(module, attr)
+
+
+# numpy and pandas are only imported once the engine does real work
+np = _LazyModule('numpy', 'np')
+pd = _LazyModule('pandas', 'pd')
+
+
 class UserProfile:
     """
     Stores and manages user profile information for personalization
+
+    Derived metrics (bmi, bmr, tdee, target_calories, macros) are computed on first
+    access and only recomputed after an input they depend on changes, so small
+    updates such as a daily weight sync don't redo the whole profile.
     """
 
+    __slots__ = ('user_id', 'age', 'gender', 'height', 'weight', 'goal', 'activity_level',
+                 'dietary_restrictions', 'allergies', 'fitness_experience',
+                 'preferred_workout_days', 'workout_duration', 'available_equipment',
+                 'health_conditions', 'favorite_foods', 'disliked_foods',
+                 '_derived', '_target_override')
+
+    # Derived metrics to drop when an input changes
+    _DEPENDENTS = {
+        'height': ('bmi', 'bmr', 'tdee', 'target_calories', 'macros'),
+        'weight': ('bmi', 'bmr', 'tdee', 'target_calories', 'macros'),
+        'age': ('bmr', 'tdee', 'target_calories', 'macros'),
+        'gender': ('bmr', 'tdee', 'target_calories', 'macros'),
+        'activity_level': ('tdee', 'target_calories', 'macros'),
+        'goal': ('target_calories', 'macros'),
+    }
+
+    # Activity level -> TDEE multiplier (unknown levels count as sedentary)
+    ACTIVITY_MULTIPLIERS = {
+        'sedentary': 1.2,
+        'lightly_active': 1.375,
+        'moderately_active': 1.55,
+        'very_active': 1.725,
+        'extra_active': 1.9
+    }
+
+    # Goal -> TDEE factor: 20% caloric deficit, 10% caloric surplus (other goals are maintenance)
+    GOAL_CALORIE_FACTORS = {
+        'weight_loss': 0.8,
+        'muscle_gain': 1.1
+    }
+
+    # Goal -> (protein, fat, carb) share of target calories
+    MACRO_SPLITS = {
+        'weight_loss': (0.40, 0.30, 0.30),  # Higher protein for weight loss
+        'muscle_gain': (0.30, 0.25, 0.45),  # Higher carbs for muscle gain
+        'maintenance': (0.30, 0.30, 0.40)
+    }
+
+    # List fields and the value used when they're missing
+    _LIST_DEFAULTS = {
+        'dietary_restrictions': [],
+        'allergies': [],
+        'available_equipment': ['bodyweight'],
+        'health_conditions': [],
+        'favorite_foods': [],
+        'disliked_foods': [],
+    }
+
     def __init__(self,
                  user_id: str,
                  age: int,
@@ -30,6 +115,8 @@ class UserProfile:
                  favorite_foods: List[str] = None,
                  disliked_foods: List[str] = None):
 
+        object.__setattr__(self, '_derived', {})
+        object.__setattr__(self, '_target_override', None)
         self.user_id = user_id
         self.age = age
         self.gender = gender
@@ -47,12 +134,84 @@ class UserProfile:
         self.favorite_foods = favorite_foods or []
         self.disliked_foods = disliked_foods or []
 
-        # Calculate BMI and BMR
-        self.bmi = self._calculate_bmi()
-        self.bmr = self._calculate_bmr()
-        self.tdee = self._calculate_tdee()
-        self.target_calories = self._calculate_target_calories()
-        self.macros = self._calculate_macros()
+    def __setattr__(self, name, value):
+        object.__setattr__(self, name, value)
+        dependents = self._DEPENDENTS.get(name)
+        if dependents:
+            derived = getattr(self, '_derived', None)
+            if derived:
+                for metric in dependents:
+                    derived.pop(metric, None)
+
+    def __getstate__(self):
+        return {name: getattr(self, name) for name in self.__slots__}
+
+    def __setstate__(self, state):
+        for name, value in state.items():
+            object.__setattr__(self, name, value)
+
+    def _derive(self, metric: str, compute):
+        """Return a cached derived metric, computing it if an input changed since"""
+        derived = self._derived
+        value = derived.get(metric)
+        if value is None:
+            value = derived[metric] = compute()
+        return value
+
+    @property
+    def bmi(self) -> float:
+        return self._derive('bmi', self._calculate_bmi)
+
+    @property
+    def bmr(self) -> float:
+        return self._derive('bmr', self._calculate_bmr)
+
+    @property
+    def tdee(self) -> float:
+        return self._derive('tdee', self._calculate_tdee)
+
+    @property
+    def target_calories(self) -> float:
+        if self._target_override is not None:
+            return self._target_override
+        return self._derive('target_calories', self._calculate_target_calories)
+
+    @target_calories.setter
+    def target_calories(self, value: float):
+        # An explicit target pins the calories; macros stay based on the goal's target
+        object.__setattr__(self, '_target_override', value)
+
+    @target_calories.deleter
+    def target_calories(self):
+        object.__setattr__(self, '_target_override', None)
+
+    @property
+    def macros(self) -> Dict[str, float]:
+        return self._derive('macros', self._calculate_macros)
+
+    def replace(self, **changes) -> 'UserProfile':
+        """
+        Return a copy with some inputs changed, keeping derived metrics that don't depend on them
+
+        Args:
+            **changes: Constructor fields to change
+
+        Returns:
+            Updated UserProfile object
+        """
+        unknown = set(changes).difference(PROFILE_FIELDS)
+        if unknown:
+            raise ValueError(f"Unknown profile fields: {sorted(unknown)}")
+
+        profile = UserProfile.__new__(UserProfile)
+        for name in self.__slots__:
+            object.__setattr__(profile, name, getattr(self, name))
+        object.__setattr__(profile, '_derived', dict(self._derived))
+        for name, value in changes.items():
+            if name in self._LIST_DEFAULTS:
+                value = value or list(self._LIST_DEFAULTS[name])
+            setattr(profile, name, value)
+        return profile
 
     def _calculate_bmi(self) -> float:
         """Calculate Body Mass Index"""
@@ -67,47 +226,25 @@ class UserProfile:
 
     def _calculate_tdee(self) -> float:
         """Calculate Total Daily Energy Expenditure"""
-        activity_multipliers = {
-            'sedentary': 1.2,
-            'lightly_active': 1.375,
-            'moderately_active': 1.55,
-            'very_active': 1.725,
-            'extra_active': 1.9
-        }
-
-        multiplier = activity_multipliers.get(self.activity_level, 1.2)
+        multiplier = self.ACTIVITY_MULTIPLIERS.get(self.activity_level, 1.2)
         return round(self.bmr * multiplier, 2)
 
     def _calculate_target_calories(self) -> float:
         """Calculate target calories based on goals"""
-        if self.goal == 'weight_loss':
-            # 20% caloric deficit
-            return round(self.tdee * 0.8, 2)
-        elif self.goal == 'muscle_gain':
-            # 10% caloric surplus
-            return round(self.tdee * 1.1, 2)
-        else:  # maintenance
+        factor = self.GOAL_CALORIE_FACTORS.get(self.goal)
+        if factor is None:  # maintenance
             return self.tdee
+        return round(self.tdee * factor, 2)
 
     def _calculate_macros(self) -> Dict[str, float]:
         """Calculate macronutrient targets based on goal"""
-        if self.goal == 'weight_loss':
-            protein_pct = 0.40  # Higher protein for weight loss
-            fat_pct = 0.30
-            carb_pct = 0.30
-        elif self.goal == 'muscle_gain':
-            protein_pct = 0.30
-            fat_pct = 0.25
-            carb_pct = 0.45  # Higher carbs for muscle gain
-        else:  # maintenance
-            protein_pct = 0.30
-            fat_pct = 0.30
-            carb_pct = 0.40
+        protein_pct, fat_pct, carb_pct = self.MACRO_SPLITS.get(self.goal, self.MACRO_SPLITS['maintenance'])
 
         # Calculate grams
-        protein_cals = self.target_calories * protein_pct
-        fat_cals = self.target_calories * fat_pct
-        carb_cals = self.target_calories * carb_pct
+        target_calories = self._derive('target_calories', self._calculate_target_calories)
+        protein_cals = target_calories * protein_pct
+        fat_cals = target_calories * fat_pct
+        carb_cals = target_calories * carb_pct
 
         # Convert to grams
         protein_g = round(protein_cals / 4, 2)  # 4 calories per gram of protein
@@ -145,24 +282,644 @@ class UserProfile:
         }
 
 
+def _round_decimals(values: np.ndarray, decimals: int = 2) -> np.ndarray:
+    """Vectorized round(x, decimals) that gives exactly what Python's round() gives (decimals <= 2)"""
+    if not 0 <= decimals <= 2:
+        raise ValueError(f"decimals must be between 0 and 2, got {decimals}")
+    scale = 10.0 ** decimals
+    scaled = values * scale
+    rounded = np.rint(scaled)
+
+    # values * scale isn't exact, so near a half it can land on the wrong side. For those, split
+    # each value so both parts times scale are exact (Veltkamp, 46 + 7 bits) and compare the exact
+    # product with the midpoint; exact ties round half to even like round()
+    near_half = np.abs(np.abs(scaled - rounded) - 0.5) < 1e-6
+    if near_half.any():
+        x = values[near_half]
+        split = x * 129.0
+        high = split - (split - x)
+        low = x - high
+        lower = np.floor(scaled[near_half])
+        side = np.sign((high * scale - (lower + 0.5)) + low * scale)
+        tie = lower + np.remainder(lower, 2)
+        rounded[near_half] = np.where(side > 0, lower + 1, np.where(side < 0, lower, tie))
+    return rounded / scale
+
+
+def _lookup_columns(values, tables: List[Dict], defaults: List[float], key=None) -> List[np.ndarray]:
+    """Map a column of labels to floats through each table, looking up each distinct label once"""
+    codes, labels = pd.factorize(pd.Series(values, copy=False), use_na_sentinel=False)
+    if key:
+        labels = [key(label) for label in labels]
+    return [np.array([table.get(label, default) for label in labels], dtype=float)[codes]
+            for table, default in zip(tables, defaults)]
+
+
+def calculate_energy_targets(profiles: Union[pd.DataFrame, Dict]) -> Dict[str, np.ndarray]:
+    """
+    Vectorized BMI, BMR, TDEE, calorie and macro targets for many users at once
+
+    Uses the same formulas and rounding as UserProfile, so every value is
+    identical to the corresponding UserProfile attribute.
+
+    Args:
+        profiles: DataFrame or dict of equal-length columns 'age', 'gender',
+            'height' (cm), 'weight' (kg), 'goal' and 'activity_level'
+
+    Returns:
+        Dictionary of float arrays: bmi, bmr, tdee, target_calories, protein, fat, carbs
+    """
+    missing = [column for column in ['age', 'gender', 'height', 'weight', 'goal', 'activity_level']
+               if column not in profiles]
+    if missing:
+        raise ValueError(f"Missing profile columns: {missing}")
+
+    age = np.asarray(profiles['age'], dtype=float)
+    height = np.asarray(profiles['height'], dtype=float)
+    weight = np.asarray(profiles['weight'], dtype=float)
+    gender_offset, = _lookup_columns(profiles['gender'], [{'male': 5.0}], [-161.0],
+                                     key=lambda gender: str(gender).lower())
+    multiplier, = _lookup_columns(profiles['activity_level'], [UserProfile.ACTIVITY_MULTIPLIERS], [1.2])
+    splits = UserProfile.MACRO_SPLITS
+    calorie_factor, protein_pct, fat_pct, carb_pct = _lookup_columns(
+        profiles['goal'],
+        [UserProfile.GOAL_CALORIE_FACTORS] + [{goal: split[i] for goal, split in splits.items()} for i in range(3)],
+        [1.0] + list(splits['maintenance']))
+
+    bmi = _round_decimals(weight / ((height / 100) ** 2))
+    bmr = _round_decimals((10 * weight) + (6.25 * height) - (5 * age) + gender_offset)
+    tdee = _round_decimals(bmr * multiplier)
+    # Maintenance keeps tdee as is; rounding an already rounded value doesn't change it
+    target_calories = _round_decimals(tdee * calorie_factor)
+
+    return {
+        'bmi': bmi,
+        'bmr': bmr,
+        'tdee': tdee,
+        'target_calories': target_calories,
+        'protein': _round_decimals(target_calories * protein_pct / 4),
+        'fat': _round_decimals(target_calories * fat_pct / 9),
+        'carbs': _round_decimals(target_calories * carb_pct / 4)
+    }
+
+
+class _LRUCache:
+    """
+    Thread-safe least-recently-used cache with hit/miss counters
+
+    With a ttl (in seconds), entries also expire that long after being stored.
+    """
+
+    def __init__(self, maxsize: int = 128, ttl: Optional[float] = None):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()  # key -> (value, expiry time or None)
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def __getstate__(self) -> Dict:
+        state = self.__dict__.copy()
+        del state['_lock']
+        return state
+
+    def __setstate__(self, state: Dict):
+        self.__dict__.update(state)
+        self._lock = threading.Lock()
+
+    def get(self, key, default=None):
+        """Return the cached value for key, marking it as most recently used"""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry[1] is not None and entry[1] <= time.monotonic():
+                del self._entries[key]
+                entry = None
+            if entry is None:
+                self.misses += 1
+                return default
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry[0]
+
+    def put(self, key, value):
+        """Store a value, evicting the least recently used entries beyond maxsize"""
+        expires = time.monotonic() + self.ttl if self.ttl is not None else None
+        with self._lock:
+            self._entries[key] = (value, expires)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+
+    def discard(self, predicate) -> int:
+        """Remove every entry whose key satisfies predicate; returns the number removed"""
+        with self._lock:
+            keys = [key for key in self._entries if predicate(key)]
+            for key in keys:
+                del self._entries[key]
+            return len(keys)
+
+    def clear(self):
+        """Drop all entries and reset the counters"""
+        with self._lock:
+            self._entries.clear()
+            self.hits = 0
+            self.misses = 0
+
+    def stats(self) -> Dict:
+        """Hit/miss counters and occupancy, for sizing the cache"""
+        lookups = self.hits + self.misses
+        return {
+            'hits': self.hits,
+            'misses': self.misses,
+            'hit_rate': round(self.hits / lookups, 4) if lookups else 0.0,
+            'size': len(self._entries),
+            'maxsize': self.maxsize,
+            'ttl': self.ttl
+        }
+
+
+def _resolve_rng(seed: Optional[Union[int, np.random.Generator]] = None) -> np.random.Generator:
+    """
+    Turn a seed into a NumPy random generator
+
+    Args:
+        seed: None for fresh OS entropy, an int for a reproducible stream, or
+            an existing Generator which is used (and advanced) as-is
+    """
+    return np.random.default_rng(seed)
+
+
+def _normalize_label(value: str) -> str:
+    """Exercise label or equipment name in canonical form: lowercase, single spaces ("full body")"""
+    return ' '.join(value.lower().split())
+
+
+def _normalize_equipment(value) -> List[str]:
+    """Equipment cell as a list of distinct normalized items; exercises without any need 'none'"""
+    return list(dict.fromkeys(_normalize_label(item) for item in _parse_tags(value))) or ['none']
+
+
+def _parse_tags(value) -> List[str]:
+    """Normalize a tags cell (list, delimited string or missing) to a list of tags"""
+    if isinstance(value, (list, tuple, set, np.ndarray)):
+        return [str(tag).strip() for tag in value if str(tag).strip()]
+    if not isinstance(value, str):
+        return []
+
+    value = value.strip()
+    if value.startswith('['):
+        # Lists serialized by pandas/json, e.g. "['high_protein', 'low_carb']"
+        value = value.strip('[]').replace('"', '').replace("'", '')
+    for separator in ';|':
+        value = value.replace(separator, ',')
+    return [tag.strip() for tag in value.split(',') if tag.strip()]
+
+
+def _encode_labels(values) -> Tuple[np.ndarray, List[str]]:
+    """Intern a column of labels as small integer codes plus a vocabulary"""
+    vocabulary = {}
+    codes = np.empty(len(values), dtype=np.int16)
+    for i, value in enumerate(values):
+        codes[i] = vocabulary.setdefault(value, len(vocabulary))
+    return codes, list(vocabulary)
+
+
+def _encode_tag_bits(tag_lists) -> Tuple[np.ndarray, List[str]]:
+    """
+    Encode per-row tag lists as a bitmask matrix
+
+    Returns:
+        (bits, vocabulary) where bits has shape (rows, words) and dtype uint64;
+        tag i of the vocabulary is bit (i % 64) of word (i // 64)
+    """
+    vocabulary = {}
+    for tags in tag_lists:
+        for tag in tags:
+            vocabulary.setdefault(tag, len(vocabulary))
+
+    words = max(1, (len(vocabulary) + 63) // 64)
+    bits = np.zeros((len(tag_lists), words), dtype=np.uint64)
+    for row, tags in enumerate(tag_lists):
+        for tag in tags:
+            position = vocabulary[tag]
+            bits[row, position // 64] |= np.uint64(1) << np.uint64(position % 64)
+    return bits, list(vocabulary)
+
+
+def _decode_tag_bits(bits: np.ndarray, vocabulary: List[str]) -> List[List[str]]:
+    """Inverse of _encode_tag_bits: per-row lists of tags"""
+    positions = np.arange(len(vocabulary))
+    present = (bits[:, positions // 64] >> (positions % 64).astype(np.uint64)) & np.uint64(1)
+    return [[vocabulary[position] for position in np.flatnonzero(row)] for row in present.astype(bool)]
+
+
+class _StringColumn:
+    """
+    Read-only column of strings stored as one UTF-8 buffer plus row offsets.
+
+    Both arrays can be memory-mapped, so a catalog holds no per-row Python
+    string objects until a value is actually read.
+    """
+
+    def __init__(self, data: np.ndarray, offsets: np.ndarray):
+        self.data = data  # uint8 buffer
+        self.offsets = offsets  # int64, rows + 1 entries
+
+    @classmethod
+    def from_strings(cls, values) -> '_StringColumn':
+        encoded = [str(value).encode('utf-8') for value in values]
+        offsets = np.zeros(len(encoded) + 1, dtype=np.int64)
+        offsets[1:] = np.cumsum([len(value) for value in encoded])
+        return cls(np.frombuffer(b''.join(encoded), dtype=np.uint8), offsets)
+
+    def __len__(self) -> int:
+        return len(self.offsets) - 1
+
+    def __getitem__(self, row: int) -> str:
+        return self.data[self.offsets[row]:self.offsets[row + 1]].tobytes().decode('utf-8')
+
+    def __iter__(self):
+        buffer = self.data.tobytes()
+        offsets = self.offsets.tolist()
+        for start, end in zip(offsets, offsets[1:]):
+            yield buffer[start:end].decode('utf-8')
+
+    def tolist(self) -> List[str]:
+        return list(self)
+
+
+# Compiled catalogs are directories of .npy files plus a meta.json header.
+# Bump the version whenever the layout written by _write_catalog changes.
+CATALOG_FORMAT = 'fitnessai-catalog'
+CATALOG_FORMAT_VERSION = 1
+
+
+def _catalog_fingerprint(arrays: List[np.ndarray], vocabularies: List) -> str:
+    """Content hash of catalog columns and vocabularies, identifying a catalog version"""
+    digest = hashlib.sha1()
+    for array in arrays:
+        digest.update(f'{array.dtype}{array.shape}'.encode('utf-8'))
+        digest.update(np.ascontiguousarray(array).data)
+    digest.update(json.dumps(vocabularies).encode('utf-8'))
+    return digest.hexdigest()
+
+
+def _is_compiled_catalog(path: str) -> bool:
+    """Whether path points at a catalog written by compile_catalog"""
+    return os.path.isdir(path) and os.path.isfile(os.path.join(path, 'meta.json'))
+
+
+def _write_catalog(path: str,
+                   kind: str,
+                   arrays: Dict[str, np.ndarray],
+                   strings: Dict[str, _StringColumn],
+                   meta: Dict):
+    """Write catalog columns as individual .npy files so they can be memory-mapped"""
+    os.makedirs(path, exist_ok=True)
+    for name, array in arrays.items():
+        np.save(os.path.join(path, f'{name}.npy'), np.ascontiguousarray(array))
+    for name, column in strings.items():
+        np.save(os.path.join(path, f'{name}.data.npy'), np.ascontiguousarray(column.data))
+        np.save(os.path.join(path, f'{name}.offsets.npy'), np.ascontiguousarray(column.offsets))
+
+    # The header is written last; a directory without it is not a usable catalog
+    _write_catalog_header(path, kind, list(arrays), list(strings), meta)
+
+
+def _write_catalog_header(path: str, kind: str, arrays: List[str], strings: List[str], meta: Dict):
+    """Write meta.json describing the .npy columns already present in path"""
+    header = dict(meta, format=CATALOG_FORMAT, format_version=CATALOG_FORMAT_VERSION, kind=kind,
+                  arrays=sorted(arrays), strings=sorted(strings))
+    with open(os.path.join(path, 'meta.json'), 'w') as f:
+        json.dump(header, f)
+
+
+def _load_array(filepath: str, mmap: bool) -> np.ndarray:
+    """Load a .npy file, memory-mapped read-only when possible"""
+    if mmap:
+        try:
+            return np.load(filepath, mmap_mode='r')
+        except ValueError:
+            pass  # empty arrays cannot be mapped
+    array = np.load(filepath)
+    array.setflags(write=False)
+    return array
+
+
+def _read_catalog(path: str, kind: str, mmap: bool = True) -> Tuple[Dict, Dict[str, np.ndarray], Dict[str, _StringColumn]]:
+    """Read a compiled catalog written by _write_catalog"""
+    with open(os.path.join(path, 'meta.json')) as f:
+        meta = json.load(f)
+
+    if meta.get('format') != CATALOG_FORMAT or meta.get('kind') != kind:
+        raise ValueError(f"{path} is not a compiled {kind} catalog")
+    if meta.get('format_version') != CATALOG_FORMAT_VERSION:
+        raise ValueError(
+            f"Unsupported catalog format version {meta.get('format_version')} "
+            f"(expected {CATALOG_FORMAT_VERSION}); recompile {path}"
+        )
+
+    arrays = {name: _load_array(os.path.join(path, f'{name}.npy'), mmap) for name in meta['arrays']}
+    strings = {
+        name: _StringColumn(_load_array(os.path.join(path, f'{name}.data.npy'), mmap),
+                            _load_array(os.path.join(path, f'{name}.offsets.npy'), mmap))
+        for name in meta['strings']
+    }
+    return meta, arrays, strings
+
+
+def _ingredients_text(value) -> str:
+    """Normalize an ingredients cell (list, text or missing) to comma-separated text"""
+    if isinstance(value, (list, tuple, np.ndarray)):
+        return ', '.join(str(item).strip() for item in value if str(item).strip())
+    if not isinstance(value, str):
+        return ''
+    return value.strip()
+
+
+class _AllergenMatcher:
+    """
+    Substring matcher for allergens over food names and ingredient lists.
+
+    The lowercased name and ingredients of every food are concatenated into a
+    single search text with row start offsets. Matching an allergen is one
+    str.find scan over that text, mapping hits back to rows with
+    searchsorted, instead of a Python-level test per food. Masks are cached
+    per allergen and per allergy set, so repeated requests are lookups.
+    """
+
+    def __init__(self, names: _StringColumn, ingredients: Optional[_StringColumn] = None, cache_size: int = 256):
+        parts = []
+        for i, name in enumerate(names):
+            # Lowercased before measuring: some characters grow ('İ' -> 'i̇') and would shift later offsets
+            parts.append((name if ingredients is None else f"{name}\n{ingredients[i]}").lower())
+        # NUL separators keep a match from spanning two foods
+        self.text = '\0'.join(parts)
+        lengths = np.fromiter((len(part) + 1 for part in parts), dtype=np.int64, count=len(parts))
+        self.starts = np.zeros(len(parts), dtype=np.int64)
+        np.cumsum(lengths[:-1], out=self.starts[1:])
+        self._allergen_masks = _LRUCache(cache_size)
+        self._exclusion_masks = _LRUCache(cache_size)
+
+    def __len__(self) -> int:
+        return len(self.starts)
+
+    def allergen_mask(self, allergen: str) -> np.ndarray:
+        """Boolean mask of foods whose name or ingredients contain the allergen"""
+        allergen = allergen.strip().lower()
+        mask = self._allergen_masks.get(allergen)
+        if mask is not None:
+            return mask
+
+        mask = np.zeros(len(self), dtype=bool)
+        if allergen:
+            position = self.text.find(allergen)
+            while position != -1:
+                row = int(np.searchsorted(self.starts, position, side='right')) - 1
+                mask[row] = True
+                # Resume at the next food; further hits in this one add nothing
+                if row + 1 == len(self):
+                    break
+                position = self.text.find(allergen, int(self.starts[row + 1]))
+        mask.setflags(write=False)
+        self._allergen_masks.put(allergen, mask)
+        return mask
+
+    def exclusion_mask(self, allergies: List[str]) -> np.ndarray:
+        """Boolean mask of foods containing any of the allergens (cached per allergy set)"""
+        key = frozenset(allergy.strip().lower() for allergy in allergies)
+        mask = self._exclusion_masks.get(key)
+        if mask is not None:
+            return mask
+
+        mask = np.zeros(len(self), dtype=bool)
+        for allergen in key:
+            mask |= self.allergen_mask(allergen)
+        mask.setflags(write=False)
+        self._exclusion_masks.put(key, mask)
+        return mask
+
+    def cache_info(self) -> Dict:
+        """Hit/miss counters of the per-allergen and per-allergy-set mask caches"""
+        return {'allergens': self._allergen_masks.stats(), 'allergy_sets': self._exclusion_masks.stats()}
+
+
+class FoodCatalog:
+    """
+    Compact columnar representation of a food table.
+
+    Nutrition is held as a contiguous float matrix (one row per nutrient),
+    categories are interned as small integer codes and tags are precomputed
+    as a bitmask per food, so tag, category and restriction filters are
+    single vectorized mask operations instead of per-row Python lambdas.
+    """
+
+    NUTRIENTS = ['calories', 'protein', 'carbs', 'fat']
+
+    def __init__(self,
+                 names: _StringColumn,
+                 category_codes: np.ndarray,
+                 categories: List[str],
+                 nutrients: np.ndarray,
+                 serving_sizes: _StringColumn,
+                 tag_bits: np.ndarray,
+                 tags: List[str],
+                 ingredients: Optional[_StringColumn] = None):
+        self.names = names
+        self.category_codes = category_codes
+        self.categories = categories
+        self.nutrients = nutrients  # shape (len(NUTRIENTS), rows)
+        self.serving_sizes = serving_sizes
+        self.tag_bits = tag_bits  # shape (rows, words)
+        self.tags = tags
+        self.ingredients = ingredients  # only present when the source lists ingredients
+        self._allergens = None
+        self._fingerprint = None
+
+        self._category_index = {category: code for code, category in enumerate(categories)}
+        self._tag_index = {tag: position for position, tag in enumerate(tags)}
+
+    @classmethod
+    def from_frame(cls, foods: pd.DataFrame) -> 'FoodCatalog':
+        """Build a catalog from a food DataFrame (rows keep their positional order)"""
+        category_codes, categories = _encode_labels(foods['category'].astype(str).tolist())
+        tag_column = foods['tags'] if 'tags' in foods else [None] * len(foods)
+        tag_bits, tags = _encode_tag_bits([_parse_tags(value) for value in tag_column])
+
+        nutrients = np.ascontiguousarray(
+            foods[cls.NUTRIENTS].apply(pd.to_numeric, errors='coerce').fillna(0).to_numpy(dtype=np.float64).T
+        )
+
+        return cls(
+            names=_StringColumn.from_strings(foods['name'].astype(str)),
+            category_codes=category_codes,
+            categories=categories,
+            nutrients=nutrients,
+            serving_sizes=_StringColumn.from_strings(foods['serving_size'].astype(str)),
+            tag_bits=tag_bits,
+            tags=tags,
+            ingredients=_StringColumn.from_strings(foods['ingredients'].map(_ingredients_text))
+            if 'ingredients' in foods else None
+        )
+
+    def save(self, path: str):
+        """Write the catalog and its derived indexes in the compiled, memory-mappable format"""
+        strings = {'names': self.names, 'serving_sizes': self.serving_sizes}
+        if self.ingredients is not None:
+            strings['ingredients'] = self.ingredients
+        _write_catalog(
+            path, 'food',
+            arrays={'category_codes': self.category_codes, 'nutrients': self.nutrients, 'tag_bits': self.tag_bits},
+            strings=strings,
+            meta={'rows': len(self), 'nutrients': self.NUTRIENTS, 'categories': self.categories, 'tags': self.tags}
+        )
+
+    @classmethod
+    def load(cls, path: str, mmap: bool = True) -> 'FoodCatalog':
+        """Open a compiled catalog; with mmap the arrays are shared page-cache mappings"""
+        meta, arrays, strings = _read_catalog(path, 'food', mmap)
+        if meta['nutrients'] != cls.NUTRIENTS:
+            raise ValueError(f"{path} was compiled with nutrients {meta['nutrients']}; recompile it")
+        return cls(
+            names=strings['names'],
+            category_codes=arrays['category_codes'],
+            categories=meta['categories'],
+            nutrients=arrays['nutrients'],
+            serving_sizes=strings['serving_sizes'],
+            tag_bits=arrays['tag_bits'],
+            tags=meta['tags'],
+            ingredients=strings.get('ingredients')
+        )
+
+    def to_frame(self) -> pd.DataFrame:
+        """Materialize the catalog as a food DataFrame"""
+        foods = pd.DataFrame({
+            'name': self.names.tolist(),
+            'category': [self.categories[code] for code in self.category_codes.tolist()]
+        })
+        for i, nutrient in enumerate(self.NUTRIENTS):
+            foods[nutrient] = self.nutrients[i]
+        foods['serving_size'] = self.serving_sizes.tolist()
+        foods['tags'] = _decode_tag_bits(self.tag_bits, self.tags)
+        if self.ingredients is not None:
+            foods['ingredients'] = self.ingredients.tolist()
+        return foods
+
+    def __len__(self) -> int:
+        return len(self.names)
+
+    def fingerprint(self) -> str:
+        """Content hash of the catalog (computed once), used to version cached plans"""
+        if self._fingerprint is None:
+            columns = [self.names, self.serving_sizes] + ([self.ingredients] if self.ingredients is not None else [])
+            arrays = [array for column in columns for array in (column.data, column.offsets)]
+            arrays += [self.category_codes, self.nutrients, self.tag_bits]
+            self._fingerprint = _catalog_fingerprint(arrays, [self.categories, self.tags])
+        return self._fingerprint
+
+    def nutrient(self, name: str) -> np.ndarray:
+        """Column of a single nutrient across all foods"""
+        return self.nutrients[self.NUTRIENTS.index(name)]
+
+    def category_mask(self, *categories: str) -> np.ndarray:
+        """Boolean mask of foods belonging to any of the given categories"""
+        codes = [self._category_index[c] for c in categories if c in self._category_index]
+        if not codes:
+            return np.zeros(len(self), dtype=bool)
+        if len(codes) == 1:
+            return self.category_codes == codes[0]
+        return np.isin(self.category_codes, codes)
+
+    def tag_mask(self, *tags: str) -> np.ndarray:
+        """Boolean mask of foods carrying at least one of the given tags"""
+        query = np.zeros(self.tag_bits.shape[1], dtype=np.uint64)
+        for tag in tags:
+            position = self._tag_index.get(tag)
+            if position is not None:
+                query[position // 64] |= np.uint64(1) << np.uint64(position % 64)
+        if not query.any():
+            return np.zeros(len(self), dtype=bool)
+        return ((self.tag_bits & query) != 0).any(axis=1)
+
+    def restriction_mask(self, restrictions: List[str], restriction_tag_map: Dict[str, List[str]]) -> np.ndarray:
+        """Boolean mask of foods compatible with every known dietary restriction"""
+        mask = np.ones(len(self), dtype=bool)
+        for restriction in restrictions:
+            if restriction in restriction_tag_map:
+                # Keep only foods that have at least one of the allowed tags
+                mask &= self.tag_mask(*restriction_tag_map[restriction])
+        return mask
+
+    @property
+    def allergens(self) -> _AllergenMatcher:
+        """Allergen matcher over names and ingredients (built on first use)"""
+        if self._allergens is None:
+            self._allergens = _AllergenMatcher(self.names, self.ingredients)
+        return self._allergens
+
+    def allergen_mask(self, allergies: List[str]) -> np.ndarray:
+        """Boolean mask of foods free of every listed allergen"""
+        if not allergies:
+            return np.ones(len(self), dtype=bool)
+        return ~self.allergens.exclusion_mask(allergies)
+
+
 class FoodDatabase:
     """
-    A database of foods with nutritional information
+    A database of foods with nutritional information.
+
+    ``foods`` remains available as a pandas DataFrame view, while filtering is
+    served from the columnar ``catalog``. ``food_data_path`` may point at a
+    CSV/JSON file or at a catalog written by ``compile_catalog``, which is
+    memory-mapped instead of parsed.
     """
 
+    RESTRICTION_TAG_MAP = {
+        'vegetarian': ['vegetarian', 'vegan', 'plant_based'],
+        'vegan': ['vegan', 'plant_based'],
+        'gluten_free': ['gluten_free'],
+        'dairy_free': ['dairy_free', 'vegan', 'plant_based'],
+        'nut_free': ['nut_free']
+    }
+
     def __init__(self, food_data_path: Optional[str] = None):
+        self._foods = None
+
+        # Compiled catalogs are mapped directly; the DataFrame view is built on demand
+        if food_data_path and _is_compiled_catalog(food_data_path):
+            self.catalog = FoodCatalog.load(food_data_path)
+            return
+
         # Load from path if provided, otherwise use sample data
         if food_data_path:
-            self.foods = self._load_food_data(food_data_path)
+            foods = self._load_food_data(food_data_path)
         else:
-            self.foods = self._create_sample_food_data()
+            foods = self._create_sample_food_data()
+
+        # Positional index so DataFrame rows line up with catalog rows
+        foods = foods.reset_index(drop=True)
+        if 'tags' in foods:
+            foods['tags'] = foods['tags'].apply(_parse_tags)
+        self._foods = foods
+        self.catalog = FoodCatalog.from_frame(foods)
+
+    @property
+    def foods(self) -> pd.DataFrame:
+        """DataFrame view of the catalog (materialized on first access)"""
+        if self._foods is None:
+            self._foods = self.catalog.to_frame()
+        return self._foods
 
     def _load_food_data(self, filepath: str) -> pd.DataFrame:
         """Load food data from CSV or JSON file"""
         if filepath.endswith('.csv'):
             return pd.read_csv(filepath)
         elif filepath.endswith('.json'):
-            return pd.DataFrame(json.load(open(filepath)))
+            with open(filepath) as f:
+                return pd.DataFrame(json.load(f))
         else:
             raise ValueError("Unsupported file format. Please provide CSV or JSON.")
 
@@ -227,32 +984,23 @@ class FoodDatabase:
 
     def get_foods_by_category(self, category: str) -> pd.DataFrame:
         """Retrieve foods by category"""
-        return self.foods[self.foods['category'] == category]
+        return self.foods[self.catalog.category_mask(category)]
 
     def get_foods_by_tag(self, tag: str) -> pd.DataFrame:
         """Retrieve foods containing a specific tag"""
-        return self.foods[self.foods['tags'].apply(lambda x: tag in x)]
+        return self.foods[self.catalog.tag_mask(tag)]
 
     def filter_by_restrictions(self, restrictions: List[str]) -> pd.DataFrame:
         """Filter out foods with certain tags based on dietary restrictions"""
-        filtered_foods = self.foods.copy()
-        restriction_tag_map = {
-            'vegetarian': ['vegetarian', 'vegan', 'plant_based'],
-            'vegan': ['vegan', 'plant_based'],
-            'gluten_free': ['gluten_free'],
-            'dairy_free': ['dairy_free', 'vegan', 'plant_based'],
-            'nut_free': ['nut_free']
-        }
+        return self.foods[self.restriction_mask(restrictions)]
 
-        for restriction in restrictions:
-            if restriction in restriction_tag_map:
-                allowed_tags = restriction_tag_map[restriction]
-                # For each restriction, keep only foods that have at least one of the allowed tags
-                filtered_foods = filtered_foods[filtered_foods['tags'].apply(
-                    lambda x: any(tag in x for tag in allowed_tags)
-                )]
+    def allergen_mask(self, allergies: List[str]) -> np.ndarray:
+        """Boolean mask over ``foods`` of items whose name and ingredients mention none of the allergens"""
+        return self.catalog.allergen_mask(allergies)
 
-        return filtered_foods
+    def restriction_mask(self, restrictions: List[str]) -> np.ndarray:
+        """Boolean mask over ``foods`` of items allowed by the dietary restrictions"""
+        return self.catalog.restriction_mask(restrictions, self.RESTRICTION_TAG_MAP)
 
     def get_food_item(self, food_name: str) -> Dict:
         """Get a specific food item by name"""
@@ -262,24 +1010,205 @@ class FoodDatabase:
         return food.iloc[0].to_dict()
 
 
+class ExerciseCatalog:
+    """
+    Columnar exercise table with an inverted index.
+
+    Every equipment item, difficulty, category and muscle group maps to a
+    packed bitset over exercise rows (built once when the catalog is
+    compiled or loaded), so any combination of equipment, experience and
+    focus resolves with a few bitwise ANDs instead of per-row scans.
+    """
+
+    LABEL_FIELDS = ['difficulty', 'category', 'muscle_group']
+
+    def __init__(self,
+                 names: _StringColumn,
+                 labels: Dict[str, Tuple[np.ndarray, List[str]]],
+                 equipment_bits: np.ndarray,
+                 equipment: List[str],
+                 descriptions: _StringColumn,
+                 instructions: _StringColumn,
+                 postings: Optional[Dict[str, np.ndarray]] = None):
+        self.names = names
+        self.labels = labels  # field -> (codes, vocabulary) for each of LABEL_FIELDS
+        self.equipment_bits = equipment_bits  # shape (rows, words)
+        self.equipment = equipment
+        self.descriptions = descriptions
+        self.instructions = instructions
+        self._fingerprint = None
+
+        # Inverted index: field -> packed bitsets with shape (values, ceil(rows / 8))
+        self.postings = postings if postings is not None else self._build_postings()
+        self._posting_keys = {field: {value: i for i, value in enumerate(self._vocabulary(field))}
+                              for field in self.postings}
+
+    @classmethod
+    def from_frame(cls, exercises: pd.DataFrame) -> 'ExerciseCatalog':
+        """Build a catalog from an exercise DataFrame (rows keep their positional order)"""
+        labels = {field: _encode_labels([_normalize_label(value) for value in exercises[field].astype(str)])
+                  for field in cls.LABEL_FIELDS}
+        equipment_bits, equipment = _encode_tag_bits([_normalize_equipment(value) for value in exercises['equipment']])
+
+        return cls(
+            names=_StringColumn.from_strings(exercises['name'].astype(str)),
+            labels=labels,
+            equipment_bits=equipment_bits,
+            equipment=equipment,
+            descriptions=_StringColumn.from_strings(exercises['description'].fillna('').astype(str)),
+            instructions=_StringColumn.from_strings(exercises['instructions'].fillna('').astype(str))
+        )
+
+    def save(self, path: str):
+        """Write the catalog and its inverted index in the compiled, memory-mappable format"""
+        arrays = {f'{field}_codes': codes for field, (codes, _) in self.labels.items()}
+        arrays['equipment_bits'] = self.equipment_bits
+        arrays.update({f'postings_{field}': bitsets for field, bitsets in self.postings.items()})
+        _write_catalog(
+            path, 'exercise',
+            arrays=arrays,
+            strings={'names': self.names, 'descriptions': self.descriptions, 'instructions': self.instructions},
+            meta={
+                'rows': len(self),
+                'labels': {field: vocabulary for field, (_, vocabulary) in self.labels.items()},
+                'equipment': self.equipment
+            }
+        )
+
+    @classmethod
+    def load(cls, path: str, mmap: bool = True) -> 'ExerciseCatalog':
+        """Open a compiled catalog; with mmap the arrays are shared page-cache mappings"""
+        meta, arrays, strings = _read_catalog(path, 'exercise', mmap)
+        return cls(
+            names=strings['names'],
+            labels={field: (arrays[f'{field}_codes'], meta['labels'][field]) for field in cls.LABEL_FIELDS},
+            equipment_bits=arrays['equipment_bits'],
+            equipment=meta['equipment'],
+            descriptions=strings['descriptions'],
+            instructions=strings['instructions'],
+            postings={field: arrays[f'postings_{field}'] for field in ['equipment'] + cls.LABEL_FIELDS}
+        )
+
+    def to_frame(self) -> pd.DataFrame:
+        """Materialize the catalog as an exercise DataFrame"""
+        exercises = pd.DataFrame({'name': self.names.tolist()})
+        for field in ['category', 'muscle_group', 'difficulty']:
+            codes, vocabulary = self.labels[field]
+            exercises[field] = [vocabulary[code] for code in codes.tolist()]
+        exercises['equipment'] = _decode_tag_bits(self.equipment_bits, self.equipment)
+        exercises['description'] = self.descriptions.tolist()
+        exercises['instructions'] = self.instructions.tolist()
+        return exercises
+
+    def __len__(self) -> int:
+        return len(self.names)
+
+    def fingerprint(self) -> str:
+        """Content hash of the catalog (computed once), used to version cached plans"""
+        if self._fingerprint is None:
+            arrays = [array for column in (self.names, self.descriptions, self.instructions)
+                      for array in (column.data, column.offsets)]
+            arrays += [codes for codes, _ in self.labels.values()] + [self.equipment_bits]
+            vocabularies = [vocabulary for _, vocabulary in self.labels.values()] + [self.equipment]
+            self._fingerprint = _catalog_fingerprint(arrays, vocabularies)
+        return self._fingerprint
+
+    def _vocabulary(self, field: str) -> List[str]:
+        return self.equipment if field == 'equipment' else self.labels[field][1]
+
+    def _build_postings(self) -> Dict[str, np.ndarray]:
+        """Packed row bitsets for every value of every indexed field"""
+        postings = {}
+        positions = np.arange(len(self.equipment))
+        has_item = (self.equipment_bits[:, positions // 64] >> (positions % 64).astype(np.uint64)) & np.uint64(1)
+        postings['equipment'] = np.packbits(has_item.T.astype(bool), axis=1)
+
+        for field, (codes, vocabulary) in self.labels.items():
+            postings[field] = np.packbits(codes[None, :] == np.arange(len(vocabulary))[:, None], axis=1)
+        return postings
+
+    def bitset(self, field: str, values: List[str]) -> np.ndarray:
+        """Packed bitset of exercises matching any of the values for an indexed field"""
+        keys = self._posting_keys[field]
+        selected = [keys[value] for value in values if value in keys]
+        if not selected:
+            return np.zeros((len(self) + 7) // 8, dtype=np.uint8)
+        return np.bitwise_or.reduce(self.postings[field][selected], axis=0)
+
+    def rows(self, *bitsets: np.ndarray) -> np.ndarray:
+        """Row indices of exercises present in every given bitset"""
+        bits = bitsets[0]
+        for other in bitsets[1:]:
+            bits = bits & other
+        return np.flatnonzero(np.unpackbits(bits, count=len(self)))
+
+    def select(self,
+               equipment: Optional[List[str]] = None,
+               difficulties: Optional[List[str]] = None,
+               categories: Optional[List[str]] = None,
+               muscle_groups: Optional[List[str]] = None) -> np.ndarray:
+        """Row indices matching every given constraint (None means unconstrained)"""
+        constraints = [('equipment', equipment), ('difficulty', difficulties),
+                       ('category', categories), ('muscle_group', muscle_groups)]
+        bitsets = [self.bitset(field, values) for field, values in constraints if values is not None]
+        if not bitsets:
+            return np.arange(len(self))
+        return self.rows(*bitsets)
+
+    def record(self, row: int) -> Dict:
+        """Plain dictionary view of a single exercise"""
+        record = {'name': self.names[row]}
+        for field, (codes, vocabulary) in self.labels.items():
+            record[field] = vocabulary[codes[row]]
+        record['description'] = self.descriptions[row]
+        record['instructions'] = self.instructions[row]
+        return record
+
+
 class ExerciseDatabase:
     """
-    A database of exercises with categorization and difficulty levels
+    A database of exercises with categorization and difficulty levels.
+
+    ``exercises`` remains available as a pandas DataFrame view, while
+    lookups are served from the indexed ``catalog``. ``exercise_data_path``
+    may point at a CSV/JSON file or at a catalog written by
+    ``compile_catalog``, which is memory-mapped instead of parsed.
     """
 
     def __init__(self, exercise_data_path: Optional[str] = None):
+        self._exercises = None
+
+        # Compiled catalogs are mapped directly; the DataFrame view is built on demand
+        if exercise_data_path and _is_compiled_catalog(exercise_data_path):
+            self.catalog = ExerciseCatalog.load(exercise_data_path)
+            return
+
         # Load from path if provided, otherwise use sample data
         if exercise_data_path:
-            self.exercises = self._load_exercise_data(exercise_data_path)
+            exercises = self._load_exercise_data(exercise_data_path)
         else:
-            self.exercises = self._create_sample_exercise_data()
+            exercises = self._create_sample_exercise_data()
+
+        # Positional index so DataFrame rows line up with catalog rows
+        exercises = exercises.reset_index(drop=True)
+        exercises['equipment'] = exercises['equipment'].apply(_parse_tags)
+        self._exercises = exercises
+        self.catalog = ExerciseCatalog.from_frame(exercises)
+
+    @property
+    def exercises(self) -> pd.DataFrame:
+        """DataFrame view of the catalog (materialized on first access)"""
+        if self._exercises is None:
+            self._exercises = self.catalog.to_frame()
+        return self._exercises
 
     def _load_exercise_data(self, filepath: str) -> pd.DataFrame:
         """Load exercise data from CSV or JSON file"""
         if filepath.endswith('.csv'):
             return pd.read_csv(filepath)
         elif filepath.endswith('.json'):
-            return pd.DataFrame(json.load(open(filepath)))
+            with open(filepath) as f:
+                return pd.DataFrame(json.load(f))
         else:
             raise ValueError("Unsupported file format. Please provide CSV or JSON.")
 
@@ -384,22 +1313,20 @@ class ExerciseDatabase:
 
     def get_exercises_by_category(self, category: str) -> pd.DataFrame:
         """Retrieve exercises by category"""
-        return self.exercises[self.exercises['category'] == category]
+        return self.exercises.iloc[self.catalog.select(categories=[category])]
 
     def get_exercises_by_muscle_group(self, muscle_group: str) -> pd.DataFrame:
         """Retrieve exercises by muscle group"""
-        return self.exercises[self.exercises['muscle_group'] == muscle_group]
+        return self.exercises.iloc[self.catalog.select(muscle_groups=[muscle_group])]
 
     def get_exercises_by_difficulty(self, difficulty: str) -> pd.DataFrame:
         """Retrieve exercises by difficulty level"""
-        return self.exercises[self.exercises['difficulty'] == difficulty]
+        return self.exercises.iloc[self.catalog.select(difficulties=[difficulty])]
 
     def get_exercises_by_equipment(self, equipment: List[str]) -> pd.DataFrame:
         """Retrieve exercises that can be performed with available equipment"""
-        # Return exercises where at least one of the required equipment items is in the user's available equipment
-        return self.exercises[self.exercises['equipment'].apply(
-            lambda x: any(item in equipment for item in x)
-        )]
+        # Exercises where at least one of the required equipment items is in the user's available equipment
+        return self.exercises.iloc[self.catalog.select(equipment=equipment)]
 
     def get_exercise(self, exercise_name: str) -> Dict:
         """Get a specific exercise by name"""
@@ -409,18 +1336,591 @@ class ExerciseDatabase:
         return exercise.iloc[0].to_dict()
 
 
+def compile_catalog(source_path: str, output_path: str, kind: str = 'food') -> str:
+    """
+    Parse a CSV/JSON catalog once and write it in the compiled format
+
+    The output directory holds the columns and derived indexes (tag bitmasks,
+    category codes, nutrient matrix, exercise postings) as .npy files that
+    FoodDatabase/ExerciseDatabase (and FitnessAI's *_db_path arguments)
+    memory-map, so worker processes share the pages instead of each parsing
+    a private copy.
+
+    Args:
+        source_path: CSV or JSON source file
+        output_path: Directory to write the compiled catalog to
+        kind: 'food' or 'exercise'
+
+    Returns:
+        output_path
+    """
+    if kind == 'food':
+        FoodDatabase(source_path).catalog.save(output_path)
+    elif kind == 'exercise':
+        ExerciseDatabase(source_path).catalog.save(output_path)
+    else:
+        raise ValueError(f"Unknown catalog kind: {kind}. Expected 'food' or 'exercise'.")
+    return output_path
+
+
+# Units accepted in nutrient cells, as factors to kcal (calories) and grams (macros)
+_ENERGY_UNITS = {'': 1.0, 'kcal': 1.0, 'cal': 1.0, 'calories': 1.0, 'kj': 1 / 4.184}
+_MASS_UNITS = {'': 1.0, 'g': 1.0, 'gram': 1.0, 'grams': 1.0, 'mg': 0.001, 'kg': 1000.0}
+
+# Serving size units -> canonical spelling; metric units are written without a space ("100g")
+_SERVING_UNITS = {
+    'g': 'g', 'gr': 'g', 'gram': 'g', 'grams': 'g',
+    'ml': 'ml', 'milliliter': 'ml', 'milliliters': 'ml', 'millilitre': 'ml', 'millilitres': 'ml',
+    'oz': 'oz', 'ounce': 'oz', 'ounces': 'oz',
+    'tbsp': 'tbsp', 'tablespoon': 'tbsp', 'tablespoons': 'tbsp',
+    'tsp': 'tsp', 'teaspoon': 'tsp', 'teaspoons': 'tsp',
+    'cup': 'cup', 'cups': 'cup'
+}
+_METRIC_SERVING_UNITS = {'g', 'ml'}
+
+
+def _iter_json_records(filepath: str, buffer_size: int = 1 << 20):
+    """
+    Yield the objects of a JSON array (or newline-delimited JSON) file one by one
+
+    Only the current buffer and record are held in memory, unlike json.load.
+    """
+    decoder = json.JSONDecoder()
+    with open(filepath, encoding='utf-8') as f:
+        buffer = ''
+        position = 0
+        eof = False
+        while True:
+            # Skip array brackets, separators and whitespace between records
+            while position < len(buffer) and buffer[position] in ' \t\r\n,[]':
+                position += 1
+            if position == len(buffer):
+                if eof:
+                    return
+                buffer, position = f.read(buffer_size), 0
+                eof = not buffer
+                continue
+            try:
+                record, end = decoder.raw_decode(buffer, position)
+            except json.JSONDecodeError:
+                if eof:
+                    raise
+                # Record spans the end of the buffer: read more and retry
+                chunk = f.read(buffer_size)
+                eof = not chunk
+                buffer, position = buffer[position:] + chunk, 0
+                continue
+            yield record
+            position = end
+
+
+def _iter_source_chunks(source_path: str, chunk_size: int, columns: Optional[Dict[str, str]] = None):
+    """Yield the rows of a CSV/JSON source as DataFrames of at most chunk_size rows"""
+    if source_path.endswith('.csv'):
+        chunks = pd.read_csv(source_path, chunksize=chunk_size, dtype=str, keep_default_na=False)
+    elif source_path.endswith(('.json', '.jsonl', '.ndjson')):
+        def json_chunks():
+            records = []
+            for record in _iter_json_records(source_path):
+                records.append(record)
+                if len(records) == chunk_size:
+                    yield pd.DataFrame(records)
+                    records = []
+            if records:
+                yield pd.DataFrame(records)
+        chunks = json_chunks()
+    else:
+        raise ValueError("Unsupported file format. Please provide CSV or JSON.")
+
+    for chunk in chunks:
+        yield chunk.rename(columns=columns) if columns else chunk
+
+
+def _cell_column(chunk: pd.DataFrame, column: str) -> pd.Series:
+    """Column as Python objects, with missing cells (or a missing column) as ''"""
+    if column not in chunk:
+        return pd.Series('', index=chunk.index, dtype=object)
+    values = chunk[column].astype(object)
+    return values.where(values.notna(), '')
+
+
+def _text_column(chunk: pd.DataFrame, column: str) -> pd.Series:
+    """Column as stripped strings, with missing cells (or a missing column) as ''"""
+    return _cell_column(chunk, column).astype(str).str.strip()
+
+
+def _parse_quantities(text: pd.Series, units: Dict[str, float]) -> pd.Series:
+    """Parse cells like "165", "690 kJ" or "250mg" into the base unit; NaN where unparseable"""
+    values = pd.to_numeric(text, errors='coerce').astype(float)
+    # Only cells that are not plain numbers go through the (much slower) unit regex
+    with_units = values.isna() & (text != '')
+    if with_units.any():
+        parts = text[with_units].str.extract(r'^([-+]?(?:\d+(?:\.\d*)?|\.\d+)(?:[eE][-+]?\d+)?)\s*([A-Za-z]*)$')
+        factors = parts[1].str.lower().map(units).astype(float)
+        values[with_units] = pd.to_numeric(parts[0], errors='coerce') * factors
+    return values
+
+
+def _map_distinct(values: pd.Series, func) -> List:
+    """Apply func once per distinct cell; catalog columns repeat the same few values a lot"""
+    try:
+        lookup = {value: func(value) for value in pd.unique(values)}
+    except TypeError:  # unhashable cells, e.g. tag lists from JSON
+        return [func(value) for value in values]
+    return [lookup[value] for value in values]
+
+
+def _normalize_serving_size(value: str) -> str:
+    """Canonical serving size, e.g. "100 Grams" -> "100g", "1 Tablespoon" -> "1 tbsp" (default "100g")"""
+    value = ' '.join(value.lower().split())
+    if not value:
+        return '100g'
+    quantity = value.rstrip('abcdefghijklmnopqrstuvwxyz ')
+    unit = _SERVING_UNITS.get(value[len(quantity):].strip())
+    if quantity and unit and all(c.isdigit() or c in './' for c in quantity):
+        return f"{quantity}{unit}" if unit in _METRIC_SERVING_UNITS else f"{quantity} {unit}"
+    return value
+
+
+def _normalize_tag(tag: str) -> str:
+    """Canonical food tag spelling: lowercase with underscores ("Gluten-Free" -> "gluten_free")"""
+    return '_'.join(tag.lower().replace('-', ' ').split())
+
+
+def _normalize_food_chunk(chunk: pd.DataFrame) -> Tuple[pd.DataFrame, pd.Series]:
+    """
+    Validate and normalize a chunk of food rows
+
+    Returns:
+        (foods, reasons) where reasons holds the rejection reason of every
+        row, or '' for rows kept in foods
+    """
+    reasons = pd.Series('', index=chunk.index, dtype=object)
+
+    def reject(mask: pd.Series, reason: str):
+        reasons[mask & (reasons == '')] = reason
+
+    name = _text_column(chunk, 'name')
+    category = _text_column(chunk, 'category').str.lower()
+    reject(name == '', 'missing name')
+    reject(category == '', 'missing category')
+
+    foods = pd.DataFrame({'name': name, 'category': category})
+    for nutrient in FoodCatalog.NUTRIENTS:
+        text = _text_column(chunk, nutrient)
+        values = _parse_quantities(text, _ENERGY_UNITS if nutrient == 'calories' else _MASS_UNITS)
+        if nutrient == 'calories':
+            reject(text == '', 'missing calories')
+        reject((text != '') & values.isna(), f'invalid {nutrient}')
+        reject(values < 0, f'negative {nutrient}')
+        # Foods commonly omit macros they do not contain
+        foods[nutrient] = values.fillna(0.0)
+
+    foods['serving_size'] = _map_distinct(_text_column(chunk, 'serving_size'), _normalize_serving_size)
+    foods['tags'] = _map_distinct(_cell_column(chunk, 'tags'),
+                                  lambda value: list(dict.fromkeys(map(_normalize_tag, _parse_tags(value)))))
+    foods['ingredients'] = _map_distinct(_cell_column(chunk, 'ingredients'), _ingredients_text)
+    return foods[reasons == ''], reasons
+
+
+def _normalize_exercise_chunk(chunk: pd.DataFrame) -> Tuple[pd.DataFrame, pd.Series]:
+    """
+    Validate and normalize a chunk of exercise rows
+
+    Returns:
+        (exercises, reasons) where reasons holds the rejection reason of every
+        row, or '' for rows kept in exercises
+    """
+    reasons = pd.Series('', index=chunk.index, dtype=object)
+
+    def reject(mask: pd.Series, reason: str):
+        reasons[mask & (reasons == '')] = reason
+
+    exercises = pd.DataFrame({'name': _text_column(chunk, 'name')})
+    reject(exercises['name'] == '', 'missing name')
+    for field in ExerciseCatalog.LABEL_FIELDS:
+        # Same normalization as ExerciseCatalog.from_frame, so ingested and compiled catalogs agree
+        exercises[field] = _map_distinct(_text_column(chunk, field), _normalize_label)
+        reject(exercises[field] == '', f'missing {field}')
+
+    # Equipment names are matched against user input ("pull-up bar")
+    exercises['equipment'] = _map_distinct(_cell_column(chunk, 'equipment'), _normalize_equipment)
+    exercises['description'] = _text_column(chunk, 'description')
+    exercises['instructions'] = _text_column(chunk, 'instructions')
+    return exercises[reasons == ''], reasons
+
+
+class _CatalogSpool:
+    """
+    Append-only staging area for catalog columns during ingestion.
+
+    Accepted chunks are encoded immediately (label codes, tag codes, UTF-8
+    strings) and appended to flat spool files, so memory stays bounded by the
+    chunk size. finish() then converts the spools into the compiled catalog
+    layout of FoodCatalog.save / ExerciseCatalog.save, again block by block.
+    """
+
+    def __init__(self, path: str, kind: str, chunk_size: int):
+        self.path = path
+        self.kind = kind
+        # Row blocks are a multiple of 8 so packed posting bitsets can be written per block
+        self.block_size = max(8, chunk_size - chunk_size % 8)
+        self.rows = 0
+        if kind == 'food':
+            self.labels = {'category': 'category_codes'}
+            self.floats = FoodCatalog.NUTRIENTS
+            self.tag_field, self.bits_name = 'tags', 'tag_bits'
+            self.strings = {'name': 'names', 'serving_size': 'serving_sizes', 'ingredients': 'ingredients'}
+        else:
+            self.labels = {field: f'{field}_codes' for field in ExerciseCatalog.LABEL_FIELDS}
+            self.floats = []
+            self.tag_field, self.bits_name = 'equipment', 'equipment_bits'
+            self.strings = {'name': 'names', 'description': 'descriptions', 'instructions': 'instructions'}
+        self.vocabularies = {field: {} for field in list(self.labels) + [self.tag_field]}
+
+        self.spool_path = os.path.join(path, '.spool')
+        os.makedirs(self.spool_path, exist_ok=True)
+        spools = list(self.labels) + ['floats', 'tag_counts', 'tag_codes']
+        spools += [f'{field}.{part}' for field in self.strings for part in ['data', 'lengths']]
+        self._files = {name: open(os.path.join(self.spool_path, name), 'wb') for name in spools}
+
+    def _intern(self, field: str, values: List[str]) -> np.ndarray:
+        vocabulary = self.vocabularies[field]
+        codes = np.fromiter((vocabulary.setdefault(value, len(vocabulary)) for value in values),
+                            dtype=np.int64, count=len(values))
+        if field in self.labels and len(vocabulary) > np.iinfo(np.int16).max:
+            raise ValueError(f"Too many distinct {field} values for a compiled catalog")
+        return codes
+
+    def append(self, frame: pd.DataFrame):
+        """Encode and spool a chunk of normalized rows"""
+        for field in self.labels:
+            self._intern(field, frame[field].tolist()).astype(np.int16).tofile(self._files[field])
+        if self.floats:
+            frame[self.floats].to_numpy(dtype=np.float64).tofile(self._files['floats'])
+
+        tag_lists = frame[self.tag_field].tolist()
+        np.fromiter(map(len, tag_lists), dtype=np.int32, count=len(tag_lists)).tofile(self._files['tag_counts'])
+        tags = [tag for row_tags in tag_lists for tag in row_tags]
+        self._intern(self.tag_field, tags).astype(np.int32).tofile(self._files['tag_codes'])
+
+        for field in self.strings:
+            encoded = [value.encode('utf-8') for value in frame[field].tolist()]
+            self._files[f'{field}.data'].write(b''.join(encoded))
+            np.fromiter(map(len, encoded), dtype=np.int64, count=len(encoded)).tofile(self._files[f'{field}.lengths'])
+        self.rows += len(frame)
+
+    def _blocks(self, name: str, dtype, width: int = 1):
+        """Read a spool back in blocks of block_size rows"""
+        with open(os.path.join(self.spool_path, name), 'rb') as f:
+            for start in range(0, self.rows, self.block_size):
+                count = min(self.block_size, self.rows - start)
+                block = np.fromfile(f, dtype=dtype, count=count * width)
+                yield start, block.reshape(count, width) if width > 1 else block
+
+    def _tag_bit_blocks(self, words: int):
+        """Blocks of uint64 tag bitmasks, in the layout of _encode_tag_bits"""
+        with open(os.path.join(self.spool_path, 'tag_codes'), 'rb') as codes_file:
+            for start, counts in self._blocks('tag_counts', np.int32):
+                codes = np.fromfile(codes_file, dtype=np.int32, count=int(counts.sum())).astype(np.uint64)
+                bits = np.zeros((len(counts), words), dtype=np.uint64)
+                rows = np.repeat(np.arange(len(counts)), counts)
+                np.bitwise_or.at(bits, (rows, codes // np.uint64(64)), np.uint64(1) << (codes % np.uint64(64)))
+                yield start, bits
+
+    def _create(self, name: str, dtype, shape: Tuple[int, ...]) -> np.ndarray:
+        """Create <name>.npy in the catalog directory and return a writable mapping of it"""
+        filepath = os.path.join(self.path, f'{name}.npy')
+        if 0 in shape:
+            # Zero-length files cannot be mapped; there is nothing to fill in anyway
+            np.save(filepath, np.zeros(shape, dtype=dtype))
+            return np.zeros(shape, dtype=dtype)
+        return np.lib.format.open_memmap(filepath, mode='w+', dtype=dtype, shape=shape)
+
+    def finish(self):
+        """Write the compiled catalog files and header, then remove the spools"""
+        for f in self._files.values():
+            f.close()
+        vocabularies = {field: list(vocabulary) for field, vocabulary in self.vocabularies.items()}
+        words = max(1, (len(vocabularies[self.tag_field]) + 63) // 64)
+        width = (self.rows + 7) // 8
+
+        for field, name in self.labels.items():
+            codes = self._create(name, np.int16, (self.rows,))
+            for start, block in self._blocks(field, np.int16):
+                codes[start:start + len(block)] = block
+            del codes  # flushes the mapping
+
+        if self.floats:
+            nutrients = self._create('nutrients', np.float64, (len(self.floats), self.rows))
+            for start, block in self._blocks('floats', np.float64, len(self.floats)):
+                nutrients[:, start:start + len(block)] = block.T
+            del nutrients
+
+        bits = self._create(self.bits_name, np.uint64, (self.rows, words))
+        for start, block in self._tag_bit_blocks(words):
+            bits[start:start + len(block)] = block
+        del bits
+
+        for field, name in self.strings.items():
+            total = os.path.getsize(os.path.join(self.spool_path, f'{field}.data'))
+            data = self._create(f'{name}.data', np.uint8, (total,))
+            offsets = self._create(f'{name}.offsets', np.int64, (self.rows + 1,))
+            end = 0
+            with open(os.path.join(self.spool_path, f'{field}.data'), 'rb') as data_file:
+                for start, lengths in self._blocks(f'{field}.lengths', np.int64):
+                    block_offsets = end + np.cumsum(lengths)
+                    offsets[start + 1:start + 1 + len(lengths)] = block_offsets
+                    data[end:block_offsets[-1]] = np.frombuffer(data_file.read(int(lengths.sum())), dtype=np.uint8)
+                    end = int(block_offsets[-1])
+            del data, offsets
+
+        arrays = list(self.labels.values()) + (['nutrients'] if self.floats else []) + [self.bits_name]
+        if self.kind == 'food':
+            meta = {'rows': self.rows, 'nutrients': FoodCatalog.NUTRIENTS,
+                    'categories': vocabularies['category'], 'tags': vocabularies['tags']}
+        else:
+            # Inverted index in the layout of ExerciseCatalog._build_postings
+            postings = self._create('postings_equipment', np.uint8, (len(vocabularies['equipment']), width))
+            positions = np.arange(len(vocabularies['equipment']))
+            for start, block in self._tag_bit_blocks(words):
+                has_item = (block[:, positions // 64] >> (positions % 64).astype(np.uint64)) & np.uint64(1)
+                postings[:, start // 8:(start + len(block) + 7) // 8] = np.packbits(has_item.T.astype(bool), axis=1)
+            del postings
+            for field in self.labels:
+                values = np.arange(len(vocabularies[field]))
+                postings = self._create(f'postings_{field}', np.uint8, (len(values), width))
+                for start, block in self._blocks(field, np.int16):
+                    postings[:, start // 8:(start + len(block) + 7) // 8] = \
+                        np.packbits(block[None, :] == values[:, None], axis=1)
+                del postings
+            arrays += [f'postings_{field}' for field in ['equipment'] + list(self.labels)]
+            meta = {'rows': self.rows, 'labels': {field: vocabularies[field] for field in self.labels},
+                    'equipment': vocabularies['equipment']}
+
+        # The header goes last, as in _write_catalog
+        _write_catalog_header(self.path, self.kind, arrays, list(self.strings.values()), meta)
+        self.discard()
+
+    def discard(self):
+        """Remove the spool files"""
+        for f in self._files.values():
+            f.close()
+        if os.path.isdir(self.spool_path):
+            for name in os.listdir(self.spool_path):
+                os.remove(os.path.join(self.spool_path, name))
+            os.rmdir(self.spool_path)
+
+
+def ingest_catalog(source_path: str,
+                   output_path: str,
+                   kind: str = 'food',
+                   chunk_size: int = 50000,
+                   columns: Optional[Dict[str, str]] = None,
+                   progress=None,
+                   max_rejected_samples: int = 100) -> Dict:
+    """
+    Stream a large CSV/JSON source into a compiled catalog
+
+    Unlike compile_catalog, the source is never loaded as a whole: rows are
+    parsed chunk by chunk, validated and normalized (tags, nutrient units,
+    serving sizes, labels) and spooled in their encoded form, so peak memory
+    depends on chunk_size rather than on the size of the source. The output
+    is read by FoodDatabase/ExerciseDatabase like any compiled catalog.
+
+    Args:
+        source_path: CSV, JSON array or newline-delimited JSON source file
+        output_path: Directory to write the compiled catalog to
+        kind: 'food' or 'exercise'
+        chunk_size: Rows parsed and encoded at a time
+        columns: Optional mapping of source column names to catalog column names
+        progress: Optional callable receiving the running report after every chunk
+        max_rejected_samples: Number of rejected rows to keep as examples in the report
+
+    Returns:
+        Report with row counts, rejection reasons and sample rejected rows
+    """
+    if kind == 'food':
+        normalize = _normalize_food_chunk
+    elif kind == 'exercise':
+        normalize = _normalize_exercise_chunk
+    else:
+        raise ValueError(f"Unknown catalog kind: {kind}. Expected 'food' or 'exercise'.")
+    if chunk_size < 1:
+        raise ValueError("chunk_size must be positive")
+
+    report = {
+        'output_path': output_path,
+        'rows_read': 0,
+        'rows_accepted': 0,
+        'rows_rejected': 0,
+        'rejection_reasons': {},
+        'rejected_samples': []
+    }
+
+    os.makedirs(output_path, exist_ok=True)
+    # An existing header would describe columns that are about to be overwritten
+    if os.path.exists(os.path.join(output_path, 'meta.json')):
+        os.remove(os.path.join(output_path, 'meta.json'))
+
+    spool = _CatalogSpool(output_path, kind, chunk_size)
+    try:
+        for chunk in _iter_source_chunks(source_path, chunk_size, columns):
+            first_row = report['rows_read']
+            accepted, reasons = normalize(chunk.reset_index(drop=True))
+            if not accepted.empty:
+                spool.append(accepted)
+
+            rejected = reasons[reasons != '']
+            for reason, count in rejected.value_counts().items():
+                report['rejection_reasons'][reason] = report['rejection_reasons'].get(reason, 0) + int(count)
+            for row, reason in rejected.items():
+                if len(report['rejected_samples']) >= max_rejected_samples:
+                    break
+                report['rejected_samples'].append({'row': first_row + int(row), 'reason': reason})
+
+            report['rows_read'] += len(chunk)
+            report['rows_accepted'] += len(accepted)
+            report['rows_rejected'] += len(rejected)
+            if progress is not None:
+                progress(dict(report))
+
+        spool.finish()
+    except BaseException:
+        spool.discard()
+        raise
+    return report
+
+
 class MealPlanner:
     """
     Generates personalized meal plans based on user profile and preferences
     """
 
-    def __init__(self, food_database: FoodDatabase):
+    SOLVERS = ['greedy', 'optimize']
+
+    # Serving bounds of each meal component for the 'optimize' solver:
+    # ((low, high) in main meals, (low, high) in snacks)
+    SOLVER_SERVING_BOUNDS = {
+        'protein': ((0.5, 3.0), (0.0, 2.0)),
+        'carb': ((0.0, 3.0), (0.0, 2.0)),
+        'fat': ((0.0, 2.0), (0.0, 1.5)),
+        'vegetable': ((0.5, 2.0), (0.0, 0.0))
+    }
+
+    def __init__(self, food_database: FoodDatabase, candidate_cache_size: int = 256):
         self.food_db = food_database
 
+        # Candidate pools only depend on (restrictions, allergies, meal type),
+        # so they are computed once and shared by every slot, day and user
+        self.candidate_cache = _LRUCache(candidate_cache_size)
+
+    def candidate_cache_info(self) -> Dict:
+        """Hit/miss counters and occupancy of the candidate pool cache"""
+        return self.candidate_cache.stats()
+
+    @staticmethod
+    def _meal_kind(meal_type: str) -> str:
+        """Collapse a meal type to the kind that determines its food selection"""
+        if meal_type == "Breakfast":
+            return 'breakfast'
+        elif "Snack" in meal_type:
+            return 'snack'
+        elif "Post-workout" in meal_type:
+            return 'post_workout'
+        return 'main'
+
+    def _available_rows(self, restrictions: Tuple[str, ...], allergies: Tuple[str, ...]) -> np.ndarray:
+        """Catalog rows allowed by the dietary restrictions and allergies (cached)"""
+        key = ('available', restrictions, allergies)
+        rows = self.candidate_cache.get(key)
+        if rows is not None:
+            return rows
+
+        mask = self.food_db.restriction_mask(list(restrictions))
+
+        # Remove foods whose name or ingredients mention an allergen
+        if allergies:
+            mask &= self.food_db.allergen_mask(list(allergies))
+
+        rows = np.flatnonzero(mask)
+        self.candidate_cache.put(key, rows)
+        return rows
+
+    def get_candidate_pools(self,
+                            restrictions: List[str],
+                            allergies: List[str],
+                            meal_type: str = "Meal") -> Dict[str, np.ndarray]:
+        """
+        Get the catalog rows eligible for each component of a meal
+
+        Args:
+            restrictions: Dietary restrictions of the user
+            allergies: Allergies of the user
+            meal_type: Type of meal (breakfast, lunch, etc.)
+
+        Returns:
+            Dictionary mapping 'available', 'protein', 'carb', 'fat' and
+            'vegetable' to arrays of catalog row indices
+        """
+        restrictions = tuple(sorted(set(restrictions or [])))
+        allergies = tuple(sorted(set(allergies or [])))
+        kind = self._meal_kind(meal_type)
+
+        key = ('pools', restrictions, allergies, kind)
+        pools = self.candidate_cache.get(key)
+        if pools is not None:
+            return pools
+
+        catalog = self.food_db.catalog
+        available = self._available_rows(restrictions, allergies)
+
+        def select(mask: np.ndarray) -> np.ndarray:
+            return available[mask[available]]
+
+        # Define food selections based on meal type
+        if kind == 'breakfast':
+            protein_foods = select(catalog.tag_mask('breakfast', 'high_protein'))
+            carb_foods = select(catalog.tag_mask('breakfast', 'whole_grain'))
+        elif kind == 'snack':
+            protein_foods = select(catalog.tag_mask('snack', 'high_protein'))
+            carb_foods = select(catalog.tag_mask('snack', 'quick_energy'))
+        elif kind == 'post_workout':
+            protein_foods = select(catalog.category_mask('protein'))
+            carb_foods = select(catalog.tag_mask('quick_energy', 'complex_carbs'))
+        else:  # Default for lunch, dinner, etc.
+            protein_foods = select(catalog.category_mask('protein'))
+            carb_foods = select(catalog.category_mask('carb'))
+
+        # Always include some healthy fats and vegetables
+        fat_foods = select(catalog.category_mask('fat'))
+        vegetable_foods = select(catalog.category_mask('vegetable'))
+
+        # Handle empty pools (e.g., due to dietary restrictions)
+        if not len(protein_foods):
+            protein_foods = select(catalog.nutrient('protein') > 5)  # Fallback to any protein-rich food
+        if not len(carb_foods):
+            carb_foods = select(catalog.nutrient('carbs') > 5)  # Fallback to any carb-rich food
+        if not len(fat_foods):
+            fat_foods = select(catalog.nutrient('fat') > 3)  # Fallback to any fat-containing food
+        if not len(vegetable_foods) and kind != 'snack':  # Only require veggies for main meals
+            vegetable_foods = available  # Just pick something
+
+        pools = {
+            'available': available,
+            'protein': protein_foods,
+            'carb': carb_foods,
+            'fat': fat_foods,
+            'vegetable': vegetable_foods
+        }
+        self.candidate_cache.put(key, pools)
+        return pools
+
     def generate_daily_meals(self,
                              user_profile: UserProfile,
                              meal_count: int = 3,
-                             snack_count: int = 2) -> Dict:
+                             snack_count: int = 2,
+                             rng: Optional[Union[int, np.random.Generator]] = None) -> Dict:
         """
         Generate a full day's meal plan based on user profile
 
@@ -428,21 +1928,12 @@ class MealPlanner:
             user_profile: UserProfile object with user data
             meal_count: Number of main meals to include
             snack_count: Number of snacks to include
+            rng: Seed or numpy Generator driving every random draw
 
         Returns:
             Dictionary with meal plan details
         """
-        # Filter foods based on dietary restrictions
-        available_foods = self.food_db.foods
-        if user_profile.dietary_restrictions:
-            available_foods = self.food_db.filter_by_restrictions(user_profile.dietary_restrictions)
-
-        # Remove foods with allergens
-        if user_profile.allergies:
-            # This is a simplified version - in a real system, you'd have a more robust
-            # way to identify allergens in foods
-            for allergen in user_profile.allergies:
-                available_foods = available_foods[~available_foods['name'].str.contains(allergen, case=False)]
+        rng = _resolve_rng(rng)
 
         # Calculate calories per meal and snack
         calories_per_main_meal = user_profile.target_calories * 0.8 / meal_count
@@ -469,11 +1960,13 @@ class MealPlanner:
         # Generate main meals
         meal_names = ['Breakfast', 'Lunch', 'Dinner', 'Pre-workout Meal', 'Post-workout Meal']
         for i in range(meal_count):
+            meal_type = meal_names[i] if i < len(meal_names) else f"Meal {i + 1}"
             meal = self._generate_meal(
-                available_foods,
+                self.get_candidate_pools(user_profile.dietary_restrictions, user_profile.allergies, meal_type),
                 target_calories=calories_per_main_meal,
                 protein_ratio=0.35,  # Higher protein ratio for main meals
-                meal_type=meal_names[i] if i < len(meal_names) else f"Meal {i + 1}"
+                meal_type=meal_type,
+                rng=rng
             )
 
             # Add to meal plan and update totals
@@ -483,11 +1976,13 @@ class MealPlanner:
 
         # Generate snacks
         for i in range(snack_count):
+            meal_type = f"Snack {i + 1}"
             snack = self._generate_meal(
-                available_foods,
+                self.get_candidate_pools(user_profile.dietary_restrictions, user_profile.allergies, meal_type),
                 target_calories=calories_per_snack,
                 protein_ratio=0.25,  # Moderate protein for snacks
-                meal_type=f"Snack {i + 1}"
+                meal_type=meal_type,
+                rng=rng
             )
 
             # Add to meal plan and update totals
@@ -501,54 +1996,55 @@ class MealPlanner:
 
         return meal_plan
 
+    def _food_entry(self, row: int, serving_multiplier: float, servings: float) -> Dict:
+        """Describe a catalog food scaled by a serving multiplier"""
+        catalog = self.food_db.catalog
+        calories, protein, carbs, fat = catalog.nutrients[:, row].tolist()
+        return {
+            'name': catalog.names[row],
+            'servings': servings,
+            'serving_size': catalog.serving_sizes[row],
+            'nutrition': {
+                'calories': round(calories * serving_multiplier, 1),
+                'protein': round(protein * serving_multiplier, 1),
+                'carbs': round(carbs * serving_multiplier, 1),
+                'fat': round(fat * serving_multiplier, 1)
+            }
+        }
+
+    @staticmethod
+    def _serving_multiplier(target: float, per_serving: float, low: float, high: float) -> float:
+        """Servings needed to reach target, clamped to [low, high] (high when per_serving is 0)"""
+        per_serving = float(per_serving)
+        if per_serving <= 0:
+            return high
+        return max(low, min(high, target / per_serving))
+
     def _generate_meal(self,
-                       available_foods: pd.DataFrame,
+                       pools: Dict[str, np.ndarray],
                        target_calories: float,
                        protein_ratio: float = 0.3,
-                       meal_type: str = "Meal") -> Dict:
+                       meal_type: str = "Meal",
+                       rng: Optional[np.random.Generator] = None) -> Dict:
         """
         Generate a single meal or snack
 
         Args:
-            available_foods: DataFrame of foods to select from
+            pools: Candidate catalog rows per meal component (see get_candidate_pools)
             target_calories: Target calories for this meal
             protein_ratio: Desired ratio of protein in the meal
             meal_type: Type of meal (breakfast, lunch, etc.)
+            rng: numpy Generator used to pick foods
 
         Returns:
             Dictionary with meal information
         """
-        # Define food selections based on meal type
-        if meal_type == "Breakfast":
-            protein_foods = available_foods[
-                available_foods['tags'].apply(lambda x: 'breakfast' in x or 'high_protein' in x)]
-            carb_foods = available_foods[
-                available_foods['tags'].apply(lambda x: 'breakfast' in x or 'whole_grain' in x)]
-        elif "Snack" in meal_type:
-            protein_foods = available_foods[
-                available_foods['tags'].apply(lambda x: 'snack' in x or 'high_protein' in x)]
-            carb_foods = available_foods[available_foods['tags'].apply(lambda x: 'snack' in x or 'quick_energy' in x)]
-        elif "Post-workout" in meal_type:
-            protein_foods = available_foods[available_foods['category'] == 'protein']
-            carb_foods = available_foods[
-                available_foods['tags'].apply(lambda x: 'quick_energy' in x or 'complex_carbs' in x)]
-        else:  # Default for lunch, dinner, etc.
-            protein_foods = available_foods[available_foods['category'] == 'protein']
-            carb_foods = available_foods[available_foods['category'] == 'carb']
-
-        # Always include some healthy fats and vegetables
-        fat_foods = available_foods[available_foods['category'] == 'fat']
-        vegetable_foods = available_foods[available_foods['category'] == 'vegetable']
-
-        # Handle empty dataframes (e.g., due to dietary restrictions)
-        if protein_foods.empty:
-            protein_foods = available_foods[available_foods['protein'] > 5]  # Fallback to any protein-rich food
-        if carb_foods.empty:
-            carb_foods = available_foods[available_foods['carbs'] > 5]  # Fallback to any carb-rich food
-        if fat_foods.empty:
-            fat_foods = available_foods[available_foods['fat'] > 3]  # Fallback to any fat-containing food
-        if vegetable_foods.empty and 'Snack' not in meal_type:  # Only require veggies for main meals
-            vegetable_foods = available_foods.sample(min(3, len(available_foods)))  # Just pick something
+        rng = _resolve_rng(rng)
+        nutrients = self.food_db.catalog.nutrients
+        protein_foods = pools['protein']
+        carb_foods = pools['carb']
+        fat_foods = pools['fat']
+        vegetable_foods = pools['vegetable']
 
         # Initialize meal
         meal = {
@@ -562,121 +2058,94 @@ class MealPlanner:
             }
         }
 
-        # Calculate protein target
-        protein_target = (target_calories * protein_ratio) / 4  # 4 calories per gram of protein
-
-        # Add a protein source
-        if not protein_foods.empty:
-            protein_item = protein_foods.sample(1).iloc[0]
-            serving_multiplier = (protein_target / protein_item[
-                'protein']) * 0.8  # Aim for 80% of protein from main protein source
-            serving_multiplier = max(0.5, min(2.0, serving_multiplier))  # Keep servings reasonable
-
-            meal['foods'].append({
-                'name': protein_item['name'],
-                'servings': round(serving_multiplier, 1),
-                'serving_size': protein_item['serving_size'],
-                'nutrition': {
-                    'calories': round(protein_item['calories'] * serving_multiplier, 1),
-                    'protein': round(protein_item['protein'] * serving_multiplier, 1),
-                    'carbs': round(protein_item['carbs'] * serving_multiplier, 1),
-                    'fat': round(protein_item['fat'] * serving_multiplier, 1)
-                }
-            })
+        def add_food(row: int, serving_multiplier: float, servings: float):
+            meal['foods'].append(self._food_entry(row, serving_multiplier, servings))
 
             # Update meal nutrition
             for nutrient in ['calories', 'protein', 'carbs', 'fat']:
                 meal['nutrition'][nutrient] += meal['foods'][-1]['nutrition'][nutrient]
 
+        # Calculate protein target
+        protein_target = (target_calories * protein_ratio) / 4  # 4 calories per gram of protein
+
+        # Add a protein source
+        if len(protein_foods):
+            protein_row = protein_foods[rng.integers(len(protein_foods))]
+            # Aim for 80% of protein from main protein source, keeping servings reasonable
+            serving_multiplier = self._serving_multiplier(protein_target * 0.8, nutrients[1, protein_row], 0.5, 2.0)
+            add_food(protein_row, serving_multiplier, round(serving_multiplier, 1))
+
         # Calculate remaining calories
         remaining_calories = target_calories - meal['nutrition']['calories']
 
         # Add a carb source if appropriate
-        if remaining_calories > 100 and not carb_foods.empty:
-            carb_item = carb_foods.sample(1).iloc[0]
+        if remaining_calories > 100 and len(carb_foods):
+            carb_row = carb_foods[rng.integers(len(carb_foods))]
             # Target around 40-50% of remaining calories from carbs
             carb_target_calories = remaining_calories * 0.45
-            serving_multiplier = carb_target_calories / carb_item['calories']
-            serving_multiplier = max(0.5, min(2.0, serving_multiplier))  # Keep servings reasonable
-
-            meal['foods'].append({
-                'name': carb_item['name'],
-                'servings': round(serving_multiplier, 1),
-                'serving_size': carb_item['serving_size'],
-                'nutrition': {
-                    'calories': round(carb_item['calories'] * serving_multiplier, 1),
-                    'protein': round(carb_item['protein'] * serving_multiplier, 1),
-                    'carbs': round(carb_item['carbs'] * serving_multiplier, 1),
-                    'fat': round(carb_item['fat'] * serving_multiplier, 1)
-                }
-            })
-
-            # Update meal nutrition
-            for nutrient in ['calories', 'protein', 'carbs', 'fat']:
-                meal['nutrition'][nutrient] += meal['foods'][-1]['nutrition'][nutrient]
+            serving_multiplier = self._serving_multiplier(carb_target_calories, nutrients[0, carb_row], 0.5, 2.0)
+            add_food(carb_row, serving_multiplier, round(serving_multiplier, 1))
 
         # Recalculate remaining calories
         remaining_calories = target_calories - meal['nutrition']['calories']
 
         # Add a healthy fat source
-        if remaining_calories > 50 and not fat_foods.empty:
-            fat_item = fat_foods.sample(1).iloc[0]
+        if remaining_calories > 50 and len(fat_foods):
+            fat_row = fat_foods[rng.integers(len(fat_foods))]
             # Target around 20-30% of remaining calories from fat
             fat_target_calories = remaining_calories * 0.25
-            serving_multiplier = fat_target_calories / fat_item['calories']
-            serving_multiplier = max(0.25, min(1.5, serving_multiplier))  # Keep servings reasonable
-
-            meal['foods'].append({
-                'name': fat_item['name'],
-                'servings': round(serving_multiplier, 1),
-                'serving_size': fat_item['serving_size'],
-                'nutrition': {
-                    'calories': round(fat_item['calories'] * serving_multiplier, 1),
-                    'protein': round(fat_item['protein'] * serving_multiplier, 1),
-                    'carbs': round(fat_item['carbs'] * serving_multiplier, 1),
-                    'fat': round(fat_item['fat'] * serving_multiplier, 1)
-                }
-            })
-
-            # Update meal nutrition
-            for nutrient in ['calories', 'protein', 'carbs', 'fat']:
-                meal['nutrition'][nutrient] += meal['foods'][-1]['nutrition'][nutrient]
+            serving_multiplier = self._serving_multiplier(fat_target_calories, nutrients[0, fat_row], 0.25, 1.5)
+            add_food(fat_row, serving_multiplier, round(serving_multiplier, 1))
 
         # Add vegetables for main meals
-        if 'Snack' not in meal_type and not vegetable_foods.empty:
-            veggie = vegetable_foods.sample(1).iloc[0]
+        if 'Snack' not in meal_type and len(vegetable_foods):
             # Standard serving of vegetables
-            serving_multiplier = 1.0
-
-            meal['foods'].append({
-                'name': veggie['name'],
-                'servings': serving_multiplier,
-                'serving_size': veggie['serving_size'],
-                'nutrition': {
-                    'calories': round(veggie['calories'] * serving_multiplier, 1),
-                    'protein': round(veggie['protein'] * serving_multiplier, 1),
-                    'carbs': round(veggie['carbs'] * serving_multiplier, 1),
-                    'fat': round(veggie['fat'] * serving_multiplier, 1)
-                }
-            })
-
-            # Update meal nutrition
-            for nutrient in ['calories', 'protein', 'carbs', 'fat']:
-                meal['nutrition'][nutrient] += meal['foods'][-1]['nutrition'][nutrient]
+            add_food(vegetable_foods[rng.integers(len(vegetable_foods))], 1.0, 1.0)
 
         return meal
 
-    def generate_weekly_plan(self, user_profile: UserProfile, days: int = 7) -> Dict:
+    @staticmethod
+    def _meal_structure(goal: str) -> Tuple[int, int]:
+        """Number of (main meals, snacks) per day for a goal"""
+        if goal == 'weight_loss':
+            return 3, 1  # Fewer, more structured meals for weight loss
+        elif goal == 'muscle_gain':
+            return 5, 2  # More frequent meals for muscle gain
+        else:  # maintenance
+            return 3, 2
+
+    def generate_weekly_plan(self,
+                             user_profile: UserProfile,
+                             days: int = 7,
+                             batched: bool = False,
+                             rng: Optional[Union[int, np.random.Generator]] = None,
+                             solver: str = 'greedy') -> Dict:
         """
         Generate a complete weekly meal plan
 
         Args:
             user_profile: UserProfile object with user data
             days: Number of days to generate plan for
+            batched: Draw all days and slots at once with array operations
+                (same output format, much higher throughput)
+            rng: Seed or numpy Generator driving every random draw
+            solver: 'greedy' picks foods step by step; 'optimize' solves
+                servings against the calorie and macro targets (see
+                generate_weekly_plans, which also batches many users)
 
         Returns:
             Dictionary with weekly meal plan
         """
+        if solver != 'greedy':
+            return self.generate_weekly_plans([user_profile], days, solver=solver, rng=rng)[0]
+
+        # Determine meal structure based on user's goals and preferences
+        meal_count, snack_count = self._meal_structure(user_profile.goal)
+        rng = _resolve_rng(rng)
+
+        if batched:
+            return self._generate_weekly_plan_batched(user_profile, days, meal_count, snack_count, rng)
+
         weekly_plan = {
             'user_id': user_profile.user_id,
             'days': [],
@@ -688,21 +2157,45 @@ class MealPlanner:
             }
         }
 
-        # Determine meal structure based on user's goals and preferences
-        if user_profile.goal == 'weight_loss':
-            meal_count = 3  # Fewer, more structured meals for weight loss
-            snack_count = 1
-        elif user_profile.goal == 'muscle_gain':
-            meal_count = 5  # More frequent meals for muscle gain
-            snack_count = 2
-        else:  # maintenance
-            meal_count = 3
-            snack_count = 2
+        for day_plan in self.iter_weekly_plan(user_profile, days, rng=rng):
+            weekly_plan['days'].append(day_plan)
+
+            # Add to weekly average
+            for nutrient in weekly_plan['weekly_nutrition_avg']:
+                weekly_plan['weekly_nutrition_avg'][nutrient] += day_plan['total_nutrition'][nutrient] / days
+
+        # Round the averages
+        for nutrient in weekly_plan['weekly_nutrition_avg']:
+            weekly_plan['weekly_nutrition_avg'][nutrient] = round(weekly_plan['weekly_nutrition_avg'][nutrient], 1)
+
+        return weekly_plan
+
+    def iter_weekly_plan(self,
+                         user_profile: UserProfile,
+                         days: int = 7,
+                         rng: Optional[Union[int, np.random.Generator]] = None):
+        """
+        Generate a meal plan one day at a time
+
+        Yields the same day plans as generate_weekly_plan (greedy solver) for
+        the same seed, each as soon as it is produced, so callers can stream
+        long plans without holding them in memory.
+
+        Args:
+            user_profile: UserProfile object with user data
+            days: Number of days to generate plan for
+            rng: Seed or numpy Generator driving every random draw
+
+        Yields:
+            Day plan dictionaries, with 'day' numbered from 1
+        """
+        meal_count, snack_count = self._meal_structure(user_profile.goal)
+        rng = _resolve_rng(rng)
 
         # Generate each day's plan
         for day in range(1, days + 1):
             # Small day-to-day calorie variation for better adherence
-            calorie_adjustment = random.uniform(0.95, 1.05)
+            calorie_adjustment = rng.uniform(0.95, 1.05)
             temp_profile = UserProfile(
                 user_id=user_profile.user_id,
                 age=user_profile.age,
@@ -723,19 +2216,340 @@ class MealPlanner:
             day_plan = self.generate_daily_meals(
                 temp_profile,
                 meal_count=meal_count,
-                snack_count=snack_count
+                snack_count=snack_count,
+                rng=rng
             )
 
             day_plan['day'] = day
-            weekly_plan['days'].append(day_plan)
+            yield day_plan
+
+    def _generate_weekly_plan_batched(self,
+                                      user_profile: UserProfile,
+                                      days: int,
+                                      meal_count: int,
+                                      snack_count: int,
+                                      rng: np.random.Generator) -> Dict:
+        """
+        Generate a weekly meal plan with every day and slot drawn at once
 
-            # Add to weekly average
-            for nutrient in weekly_plan['weekly_nutrition_avg']:
-                weekly_plan['weekly_nutrition_avg'][nutrient] += day_plan['total_nutrition'][nutrient] / days
+        Food picks, serving multipliers and nutrition are computed as
+        (days, slots) arrays following the same greedy rules as
+        _generate_meal; dictionaries are only built at the end.
+        """
+        nutrients = self.food_db.catalog.nutrients
 
-        # Round the averages
-        for nutrient in weekly_plan['weekly_nutrition_avg']:
-            weekly_plan['weekly_nutrition_avg'][nutrient] = round(weekly_plan['weekly_nutrition_avg'][nutrient], 1)
+        meal_names = ['Breakfast', 'Lunch', 'Dinner', 'Pre-workout Meal', 'Post-workout Meal']
+        slot_types = [meal_names[i] if i < len(meal_names) else f"Meal {i + 1}" for i in range(meal_count)]
+        slot_types += [f"Snack {i + 1}" for i in range(snack_count)]
+        is_main = np.array([i < meal_count for i in range(len(slot_types))])
+
+        # Small day-to-day calorie variation for better adherence
+        day_calories = user_profile.target_calories * rng.uniform(0.95, 1.05, size=days)
+        slot_share = np.where(is_main, 0.8 / max(meal_count, 1), 0.2 / max(snack_count, 1))
+        targets = day_calories[:, None] * slot_share[None, :]
+        protein_ratio = np.where(is_main, 0.35, 0.25)
+
+        # Draw one candidate row per (day, slot) and component; -1 marks an empty pool
+        picks = {component: np.full((days, len(slot_types)), -1, dtype=np.int64)
+                 for component in ['protein', 'carb', 'fat', 'vegetable']}
+        for slot, meal_type in enumerate(slot_types):
+            pools = self.get_candidate_pools(user_profile.dietary_restrictions, user_profile.allergies, meal_type)
+            for component, pick in picks.items():
+                pool = pools[component]
+                if len(pool):
+                    pick[:, slot] = pool[rng.integers(0, len(pool), size=days)]
+
+        def scaled(component: str, multiplier: np.ndarray, present: np.ndarray) -> np.ndarray:
+            values = nutrients[:, np.maximum(picks[component], 0)]  # (nutrients, days, slots)
+            return np.where(present, np.round(values * multiplier, 1), 0.0)
+
+        def servings(target: np.ndarray, per_serving: np.ndarray, low: float, high: float) -> np.ndarray:
+            ratio = np.divide(target, per_serving, out=np.full_like(target, np.inf), where=per_serving > 0)
+            return np.clip(ratio, low, high)
+
+        # Protein source: aim for 80% of protein from main protein source
+        has_protein = picks['protein'] >= 0
+        protein_target = targets * protein_ratio / 4
+        protein_multiplier = servings(protein_target * 0.8, nutrients[1, np.maximum(picks['protein'], 0)], 0.5, 2.0)
+        protein_nutrition = scaled('protein', protein_multiplier, has_protein)
+        meal_nutrition = protein_nutrition.copy()
+
+        # Carb source: around 45% of remaining calories
+        remaining = targets - meal_nutrition[0]
+        has_carb = (picks['carb'] >= 0) & (remaining > 100)
+        carb_multiplier = servings(remaining * 0.45, nutrients[0, np.maximum(picks['carb'], 0)], 0.5, 2.0)
+        carb_nutrition = scaled('carb', carb_multiplier, has_carb)
+        meal_nutrition += carb_nutrition
+
+        # Healthy fat source: around 25% of remaining calories
+        remaining = targets - meal_nutrition[0]
+        has_fat = (picks['fat'] >= 0) & (remaining > 50)
+        fat_multiplier = servings(remaining * 0.25, nutrients[0, np.maximum(picks['fat'], 0)], 0.25, 1.5)
+        fat_nutrition = scaled('fat', fat_multiplier, has_fat)
+        meal_nutrition += fat_nutrition
+
+        # Standard serving of vegetables for main meals
+        has_vegetable = (picks['vegetable'] >= 0) & is_main[None, :]
+        vegetable_nutrition = scaled('vegetable', np.ones_like(targets), has_vegetable)
+        meal_nutrition += vegetable_nutrition
+
+        # Per-food arrays with shape (days, slots, foods[, nutrients]) for the shared assembly step
+        rows = np.stack([picks[component] for component in ['protein', 'carb', 'fat', 'vegetable']], axis=-1)
+        present = np.stack([has_protein, has_carb, has_fat, has_vegetable], axis=-1)
+        multipliers = np.stack([np.round(protein_multiplier, 1), np.round(carb_multiplier, 1),
+                                np.round(fat_multiplier, 1), np.ones_like(targets)], axis=-1)
+        food_nutrition = np.stack([protein_nutrition, carb_nutrition, fat_nutrition, vegetable_nutrition], axis=-1)
+        return self._assemble_weekly_plan(user_profile, slot_types, is_main, day_calories, rows, present,
+                                          multipliers, food_nutrition.transpose(1, 2, 3, 0))
+
+    @staticmethod
+    def _solve_servings(food_nutrients: np.ndarray,
+                        targets: np.ndarray,
+                        low: np.ndarray,
+                        high: np.ndarray,
+                        sweeps: int = 5) -> np.ndarray:
+        """
+        Servings minimizing the relative nutrition error of many meals at once
+
+        Solves min_s sum_n ((A s - t)_n / t_n)^2 subject to low <= s <= high
+        for every meal in the batch with projected coordinate descent on the
+        normal equations; each step is exact for one food, so a few sweeps
+        over the (small) number of foods converge.
+
+        Args:
+            food_nutrients: Array (..., nutrients, foods) with per-serving nutrition A
+            targets: Array (..., nutrients) with the nutrition targets t
+            low: Array (..., foods) with minimum servings
+            high: Array (..., foods) with maximum servings
+
+        Returns:
+            Array (..., foods) of servings
+        """
+        weights = 1.0 / np.maximum(targets, 1.0) ** 2
+        weighted = food_nutrients * weights[..., :, None]
+        hessian = np.einsum('...nk,...nj->...kj', weighted, food_nutrients)
+        gradient_offset = np.einsum('...nk,...n->...k', weighted, targets)
+        curvature = np.diagonal(hessian, axis1=-2, axis2=-1)
+
+        servings = np.clip(np.ones_like(low), low, high)
+        gradient = np.einsum('...kj,...j->...k', hessian, servings) - gradient_offset
+        inverse_curvature = np.divide(1.0, curvature, out=np.zeros_like(curvature), where=curvature > 0)
+        for _ in range(sweeps):
+            for food in range(servings.shape[-1]):
+                updated = np.clip(servings[..., food] - gradient[..., food] * inverse_curvature[..., food],
+                                  low[..., food], high[..., food])
+                # Keep the gradient current instead of recomputing H s - b
+                gradient += hessian[..., food] * (updated - servings[..., food])[..., None]
+                servings[..., food] = updated
+        return servings
+
+    def _optimize_meals(self,
+                        meal_pools: List[Dict[str, np.ndarray]],
+                        is_main: np.ndarray,
+                        targets: np.ndarray,
+                        rng: np.random.Generator,
+                        candidates: int = 8,
+                        block_size: int = 4096) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Choose foods and servings for a batch of meals with the macro-targeting solver
+
+        For every meal, `candidates` combinations of one protein, carb, fat
+        and vegetable food are drawn from its pools; servings are solved for
+        all of them together (_solve_servings), rounded to 0.1 and the
+        combination with the smallest remaining error is kept.
+
+        Args:
+            meal_pools: Candidate pools of each meal (see get_candidate_pools)
+            is_main: Boolean array, True for main meals and False for snacks
+            targets: Array (meals, nutrients) of nutrition targets
+            rng: numpy Generator used to draw the candidate combinations
+
+        Returns:
+            (rows, servings), both of shape (meals, foods); rows are -1 and
+            servings 0 where a food is left out
+        """
+        nutrients = self.food_db.catalog.nutrients
+        components = list(self.SOLVER_SERVING_BOUNDS)
+        meal_count = len(meal_pools)
+
+        # Draw candidate rows per pool, so meals sharing pools share one draw call
+        candidate_rows = np.full((meal_count, candidates, len(components)), -1, dtype=np.int64)
+        groups = {}
+        for meal, pools in enumerate(meal_pools):
+            groups.setdefault(id(pools), (pools, []))[1].append(meal)
+        for pools, meals in groups.values():
+            for food, component in enumerate(components):
+                pool = pools[component]
+                if len(pool):
+                    candidate_rows[meals, :, food] = pool[rng.integers(0, len(pool), size=(len(meals), candidates))]
+
+        bounds = np.array([self.SOLVER_SERVING_BOUNDS[component] for component in components])  # (foods, kind, 2)
+        meal_bounds = np.where(is_main[:, None, None], bounds[None, :, 0], bounds[None, :, 1])  # (meals, foods, 2)
+
+        rows = np.full((meal_count, len(components)), -1, dtype=np.int64)
+        servings = np.zeros((meal_count, len(components)))
+        for start in range(0, meal_count, block_size):
+            block = slice(start, start + block_size)
+            block_rows = candidate_rows[block]
+            available = block_rows >= 0
+            food_nutrients = np.where(available[:, :, None, :],
+                                      nutrients[:, np.maximum(block_rows, 0)].transpose(1, 2, 0, 3), 0.0)
+            low = np.where(available, meal_bounds[block, None, :, 0], 0.0)
+            high = np.where(available, meal_bounds[block, None, :, 1], 0.0)
+            block_targets = targets[block, None, :]
+
+            solved = np.clip(np.round(self._solve_servings(food_nutrients, block_targets, low, high), 1), low, high)
+            residual = (np.einsum('...nk,...k->...n', food_nutrients, solved) - block_targets) \
+                / np.maximum(block_targets, 1.0)
+            best = (residual ** 2).sum(axis=-1).argmin(axis=1)
+
+            chosen = np.arange(len(best))
+            servings[block] = solved[chosen, best]
+            rows[block] = np.where(servings[block] > 0, block_rows[chosen, best], -1)
+        return rows, servings
+
+    def generate_weekly_plans(self,
+                              user_profiles: List[UserProfile],
+                              days: int = 7,
+                              solver: str = 'greedy',
+                              rng: Optional[Union[int, np.random.Generator]] = None) -> List[Dict]:
+        """
+        Generate weekly meal plans for many users
+
+        With solver='optimize' every meal of every user and day is solved in a
+        single vectorized call: foods and continuous servings are chosen to
+        minimize the error against the per-meal share of the user's calorie
+        and macro targets. 'greedy' uses the batched greedy rules per user.
+
+        Args:
+            user_profiles: UserProfile objects to plan for
+            days: Number of days to generate plans for
+            solver: 'greedy' or 'optimize'
+            rng: Seed or numpy Generator driving every random draw
+
+        Returns:
+            List of weekly meal plans, in the order of user_profiles
+        """
+        if solver not in self.SOLVERS:
+            raise ValueError(f"Unknown solver: {solver}. Expected one of {self.SOLVERS}.")
+        rng = _resolve_rng(rng)
+
+        if solver == 'greedy' or not user_profiles:
+            return [self.generate_weekly_plan(profile, days, batched=True, rng=rng) for profile in user_profiles]
+
+        meal_names = ['Breakfast', 'Lunch', 'Dinner', 'Pre-workout Meal', 'Post-workout Meal']
+        layouts, meal_pools, is_main, targets = [], [], [], []
+        for profile in user_profiles:
+            meal_count, snack_count = self._meal_structure(profile.goal)
+            slot_types = [meal_names[i] if i < len(meal_names) else f"Meal {i + 1}" for i in range(meal_count)]
+            slot_types += [f"Snack {i + 1}" for i in range(snack_count)]
+            slot_main = np.array([i < meal_count for i in range(len(slot_types))])
+            pools = [self.get_candidate_pools(profile.dietary_restrictions, profile.allergies, meal_type)
+                     for meal_type in slot_types]
+
+            # Small day-to-day calorie variation for better adherence; macros scale along
+            day_calories = profile.target_calories * rng.uniform(0.95, 1.05, size=days)
+            slot_share = np.where(slot_main, 0.8 / max(meal_count, 1), 0.2 / max(snack_count, 1))
+            day_targets = np.array([profile.target_calories, profile.macros['protein'],
+                                    profile.macros['carbs'], profile.macros['fat']])
+            scale = (day_calories / profile.target_calories)[:, None] * slot_share[None, :]  # (days, slots)
+            targets.append((scale[:, :, None] * day_targets).reshape(-1, len(day_targets)))
+
+            layouts.append((slot_types, slot_main, day_calories))
+            meal_pools.extend(pools * days)
+            is_main.append(np.tile(slot_main, days))
+
+        rows, servings = self._optimize_meals(meal_pools, np.concatenate(is_main), np.concatenate(targets), rng)
+
+        nutrients = self.food_db.catalog.nutrients
+        plans = []
+        start = 0
+        for profile, (slot_types, slot_main, day_calories) in zip(user_profiles, layouts):
+            end = start + days * len(slot_types)
+            shape = (days, len(slot_types), rows.shape[1])
+            user_rows = rows[start:end].reshape(shape)
+            user_servings = servings[start:end].reshape(shape)
+            present = user_rows >= 0
+            food_nutrition = np.where(present[..., None],
+                                      np.round(nutrients[:, np.maximum(user_rows, 0)].transpose(1, 2, 3, 0)
+                                               * user_servings[..., None], 1), 0.0)
+            plans.append(self._assemble_weekly_plan(profile, slot_types, slot_main, day_calories,
+                                                    user_rows, present, user_servings, food_nutrition))
+            start = end
+        return plans
+
+    def _assemble_weekly_plan(self,
+                              user_profile: UserProfile,
+                              slot_types: List[str],
+                              is_main: np.ndarray,
+                              day_calories: np.ndarray,
+                              rows: np.ndarray,
+                              present: np.ndarray,
+                              servings: np.ndarray,
+                              food_nutrition: np.ndarray) -> Dict:
+        """
+        Build the weekly plan dictionaries from per-food arrays
+
+        rows, present and servings have shape (days, slots, foods) and
+        food_nutrition (days, slots, foods, nutrients), with zeros for
+        absent foods. Dictionaries are built in one pass over native Python
+        values.
+        """
+        catalog = self.food_db.catalog
+        days = len(day_calories)
+
+        # Meal totals add the foods in order, as _generate_meal does
+        meal_nutrition = food_nutrition[:, :, 0]
+        for food in range(1, food_nutrition.shape[2]):
+            meal_nutrition = meal_nutrition + food_nutrition[:, :, food]
+        day_totals = np.round(meal_nutrition.sum(axis=1), 1)  # (days, nutrients)
+        weekly_avg = np.round((day_totals / days).sum(axis=0), 1)
+
+        # Decode each distinct food's strings once rather than once per occurrence
+        labels = {row: (catalog.names[row], catalog.serving_sizes[row]) for row in np.unique(rows[present]).tolist()}
+        rows, present, servings = rows.tolist(), present.tolist(), servings.tolist()
+        food_values = food_nutrition.tolist()
+        meal_values = meal_nutrition.tolist()
+        day_values = day_totals.tolist()
+        day_targets = day_calories.tolist()
+        macros = user_profile.macros
+
+        weekly_plan = {
+            'user_id': user_profile.user_id,
+            'days': [],
+            'weekly_nutrition_avg': dict(zip(FoodCatalog.NUTRIENTS, weekly_avg.tolist()))
+        }
+        for day in range(days):
+            day_plan = {
+                'daily_target': {
+                    'calories': day_targets[day],
+                    'protein': macros['protein'],
+                    'carbs': macros['carbs'],
+                    'fat': macros['fat']
+                },
+                'meals': [],
+                'snacks': [],
+                'total_nutrition': dict(zip(FoodCatalog.NUTRIENTS, day_values[day])),
+                'day': day + 1
+            }
+            for slot, meal_type in enumerate(slot_types):
+                foods = []
+                for food, row in enumerate(rows[day][slot]):
+                    if present[day][slot][food]:
+                        name, serving_size = labels[row]
+                        foods.append({
+                            'name': name,
+                            'servings': servings[day][slot][food],
+                            'serving_size': serving_size,
+                            'nutrition': dict(zip(FoodCatalog.NUTRIENTS, food_values[day][slot][food]))
+                        })
+                meal = {
+                    'type': meal_type,
+                    'foods': foods,
+                    'nutrition': dict(zip(FoodCatalog.NUTRIENTS, meal_values[day][slot]))
+                }
+                day_plan['meals' if is_main[slot] else 'snacks'].append(meal)
+            weekly_plan['days'].append(day_plan)
 
         return weekly_plan
 
@@ -748,10 +2562,43 @@ class WorkoutPlanner:
     def __init__(self, exercise_database: ExerciseDatabase):
         self.exercise_db = exercise_database
 
+    @staticmethod
+    def _pick(rows: np.ndarray, rng: np.random.Generator) -> int:
+        """Draw a single catalog row"""
+        return int(rows[rng.integers(len(rows))])
+
+    @staticmethod
+    def _draw(rows: np.ndarray, count: int, rng: np.random.Generator) -> np.ndarray:
+        """Draw up to count distinct catalog rows"""
+        return rng.choice(rows, size=min(count, len(rows)), replace=False)
+
+    # Most sets a single exercise gets when extra sets fill a session
+    MAX_SETS_PER_EXERCISE = 6
+
+    @classmethod
+    def _add_extra_sets(cls, exercises: List[Dict], missing: int) -> int:
+        """
+        Spread one extra set per missing exercise over the exercises, top first,
+        up to MAX_SETS_PER_EXERCISE each
+
+        Returns:
+            Number of missing exercises that couldn't be covered
+        """
+        missing = max(missing, 0)
+        open_exercises = [exercise for exercise in exercises if exercise['sets'] < cls.MAX_SETS_PER_EXERCISE]
+        while missing and open_exercises:
+            for exercise in open_exercises[:missing]:
+                exercise['sets'] += 1
+                missing -= 1
+            open_exercises = [exercise for exercise in open_exercises
+                              if exercise['sets'] < cls.MAX_SETS_PER_EXERCISE]
+        return missing
+
     def generate_workout_session(self,
                                  user_profile: UserProfile,
                                  focus: str = None,  # 'upper', 'lower', 'full', 'cardio', 'core', etc.
-                                 duration_minutes: int = None) -> Dict:
+                                 duration_minutes: int = None,
+                                 rng: Optional[Union[int, np.random.Generator]] = None) -> Dict:
         """
         Generate a single workout session
 
@@ -759,16 +2606,18 @@ class WorkoutPlanner:
             user_profile: UserProfile object with user data
             focus: Workout focus area
             duration_minutes: Target workout duration
+            rng: Seed or numpy Generator driving every random draw
 
         Returns:
             Dictionary with workout session details
         """
+        rng = _resolve_rng(rng)
+
         # Use profile defaults if not specified
         if duration_minutes is None:
             duration_minutes = user_profile.workout_duration
 
-        # Filter exercises by available equipment
-        available_exercises = self.exercise_db.get_exercises_by_equipment(user_profile.available_equipment)
+        catalog = self.exercise_db.catalog
 
         # Filter by experience level
         if user_profile.fitness_experience == 'beginner':
@@ -778,7 +2627,12 @@ class WorkoutPlanner:
         else:  # advanced
             difficulty_levels = ['beginner', 'intermediate', 'advanced']
 
-        experience_appropriate = available_exercises[available_exercises['difficulty'].isin(difficulty_levels)]
+        # Exercises doable with the available equipment at this experience level
+        experience_appropriate = catalog.bitset('equipment', user_profile.available_equipment) & \
+            catalog.bitset('difficulty', difficulty_levels)
+        cardio_exercises = catalog.rows(experience_appropriate, catalog.bitset('category', ['cardio']))
+        flexibility_exercises = catalog.rows(experience_appropriate, catalog.bitset('category', ['flexibility']))
+        strength_exercises = catalog.rows(experience_appropriate, catalog.bitset('category', ['strength']))
 
         # Determine workout structure based on focus
         workout = {
@@ -791,9 +2645,8 @@ class WorkoutPlanner:
         }
 
         # Add warm-up
-        cardio_exercises = experience_appropriate[experience_appropriate['category'] == 'cardio']
-        if not cardio_exercises.empty:
-            warm_up_exercise = cardio_exercises.sample(1).iloc[0]
+        if len(cardio_exercises):
+            warm_up_exercise = catalog.record(self._pick(cardio_exercises, rng))
             workout['warm_up'].append({
                 'name': warm_up_exercise['name'],
                 'sets': 1,
@@ -804,9 +2657,8 @@ class WorkoutPlanner:
             })
 
         # Add mobility/flexibility warm-up
-        flexibility_exercises = experience_appropriate[experience_appropriate['category'] == 'flexibility']
-        if not flexibility_exercises.empty:
-            mobility_exercise = flexibility_exercises.sample(1).iloc[0]
+        if len(flexibility_exercises):
+            mobility_exercise = catalog.record(self._pick(flexibility_exercises, rng))
             workout['warm_up'].append({
                 'name': mobility_exercise['name'],
                 'sets': 1,
@@ -837,40 +2689,35 @@ class WorkoutPlanner:
 
         if focus == 'cardio':
             # For cardio focus, select mostly cardio exercises
-            cardio_options = experience_appropriate[experience_appropriate['category'] == 'cardio']
-            if not cardio_options.empty:
-                selected_cardio = cardio_options.sample(min(exercise_count, len(cardio_options)))
-                for _, exercise in selected_cardio.iterrows():
-                    selected_exercises.append(exercise)
+            if len(cardio_exercises):
+                selected_exercises.extend(self._draw(cardio_exercises, exercise_count, rng).tolist())
         else:
             # For strength/mixed workouts, select exercise for each target muscle group
             for muscle_group in muscle_groups:
-                group_exercises = experience_appropriate[experience_appropriate['muscle_group'] == muscle_group]
-                if not group_exercises.empty:
+                group_exercises = catalog.rows(experience_appropriate, catalog.bitset('muscle_group', [muscle_group]))
+                if len(group_exercises):
                     # Select 1-2 exercises per muscle group depending on focus
                     count = 2 if (focus == 'upper' and muscle_group in ['chest', 'back']) or \
                                  (focus == 'lower' and muscle_group == 'legs') or \
                                  (focus == 'core' and muscle_group == 'core') else 1
 
-                    group_selections = group_exercises.sample(min(count, len(group_exercises)))
-                    for _, exercise in group_selections.iterrows():
-                        selected_exercises.append(exercise)
-
-        # If we didn't get enough exercises, add some general ones
-        while len(selected_exercises) < exercise_count:
-            # Prioritize strength exercises for non-cardio focuses
-            if focus != 'cardio' and not experience_appropriate[experience_appropriate['category'] == 'strength'].empty:
-                additional = experience_appropriate[experience_appropriate['category'] == 'strength'].sample(1).iloc[0]
-            else:
-                # Otherwise just pick something available
-                additional = experience_appropriate.sample(1).iloc[0]
-
-            # Check if this exercise is already selected
-            if additional['name'] not in [ex['name'] for ex in selected_exercises]:
-                selected_exercises.append(additional)
+                    selected_exercises.extend(self._draw(group_exercises, count, rng).tolist())
+
+        # If we didn't get enough exercises, add some general ones, sampling without
+        # replacement from what is left: strength first for non-cardio focuses, then
+        # any exercise type that can be programmed as a main exercise
+        fallback_pools = [strength_exercises] if focus != 'cardio' else []
+        fallback_pools.append(catalog.rows(experience_appropriate,
+                                           catalog.bitset('category', ['strength', 'core', 'cardio'])))
+        for pool in fallback_pools:
+            shortfall = exercise_count - len(selected_exercises)
+            if shortfall <= 0:
+                break
+            remaining = np.setdiff1d(pool, selected_exercises)
+            selected_exercises.extend(self._draw(remaining, shortfall, rng).tolist())
 
         # Format exercises for the workout
-        for exercise in selected_exercises:
+        for exercise in map(catalog.record, selected_exercises):
             # Determine sets, reps, etc. based on category and experience
             if exercise['category'] == 'cardio':
                 if focus == 'cardio':
@@ -944,10 +2791,15 @@ class WorkoutPlanner:
                     'instructions': exercise['instructions']
                 })
 
+        # Not enough distinct exercises for the duration (e.g. a beginner with
+        # bodyweight only): repeat the top exercises with extra sets instead, and
+        # shorten the session by whatever the capped sets can't fill
+        uncovered = self._add_extra_sets(workout['main_exercises'], exercise_count - len(workout['main_exercises']))
+        workout['duration_minutes'] -= 5 * uncovered
+
         # Add cool-down stretches
-        cool_down_stretches = experience_appropriate[experience_appropriate['category'] == 'flexibility']
-        if not cool_down_stretches.empty:
-            stretch = cool_down_stretches.sample(1).iloc[0]
+        if len(flexibility_exercises):
+            stretch = catalog.record(self._pick(flexibility_exercises, rng))
             workout['cool_down'].append({
                 'name': stretch['name'],
                 'sets': 1,
@@ -961,13 +2813,17 @@ class WorkoutPlanner:
 
         return workout
 
-    def generate_weekly_plan(self, user_profile: UserProfile, days: int = None) -> Dict:
+    def generate_weekly_plan(self,
+                             user_profile: UserProfile,
+                             days: int = None,
+                             rng: Optional[Union[int, np.random.Generator]] = None) -> Dict:
         """
         Generate a complete weekly workout plan
 
         Args:
             user_profile: UserProfile object with user data
             days: Number of workout days (defaults to user preference)
+            rng: Seed or numpy Generator driving every random draw
 
         Returns:
             Dictionary with weekly workout plan
@@ -975,13 +2831,35 @@ class WorkoutPlanner:
         if days is None:
             days = user_profile.preferred_workout_days
 
-        weekly_plan = {
+        return {
             'user_id': user_profile.user_id,
             'days_per_week': days,
-            'workouts': [],
+            'workouts': list(self.iter_weekly_plan(user_profile, days, rng=rng)),
             'rest_days': 7 - days
         }
 
+    def iter_weekly_plan(self,
+                         user_profile: UserProfile,
+                         days: int = None,
+                         rng: Optional[Union[int, np.random.Generator]] = None):
+        """
+        Generate a workout plan one session at a time
+
+        Yields the same workouts as generate_weekly_plan for the same seed,
+        each as soon as it is produced.
+
+        Args:
+            user_profile: UserProfile object with user data
+            days: Number of workout days (defaults to user preference)
+            rng: Seed or numpy Generator driving every random draw
+
+        Yields:
+            Workout session dictionaries, with 'day' numbered from 1
+        """
+        if days is None:
+            days = user_profile.preferred_workout_days
+        rng = _resolve_rng(rng)
+
         # Determine workout split based on days per week and goals
         if days <= 2:
             # 1-2 days: Full body workouts
@@ -1017,14 +2895,212 @@ class WorkoutPlanner:
             workout = self.generate_workout_session(
                 user_profile=user_profile,
                 focus=focus,
-                duration_minutes=user_profile.workout_duration
+                duration_minutes=user_profile.workout_duration,
+                rng=rng
             )
 
             # Add day number
             workout['day'] = i + 1
-            weekly_plan['workouts'].append(workout)
+            yield workout
+
+
+# Constructor arguments of UserProfile; derived metrics are recomputed on load
+PROFILE_FIELDS = ['user_id', 'age', 'gender', 'height', 'weight', 'goal', 'activity_level',
+                  'dietary_restrictions', 'allergies', 'fitness_experience', 'preferred_workout_days',
+                  'workout_duration', 'available_equipment', 'health_conditions', 'favorite_foods',
+                  'disliked_foods']
 
-        return weekly_plan
+
+class ProfileVersionConflict(ValueError):
+    """Raised when a profile changed in the store since it was read"""
+
+
+class ProfileStore(ABC):
+    """
+    Storage backend for user profiles.
+
+    Profiles are stored as records of PROFILE_FIELDS. Every write bumps a
+    per-user version number, which lets in-process caches detect changes
+    made by other workers. Subclasses must implement every method below.
+    """
+
+    @abstractmethod
+    def get(self, user_id: str) -> Optional[Tuple[Dict, int]]:
+        """Return (record, version) for a user, or None if unknown"""
+        raise NotImplementedError
+
+    @abstractmethod
+    def version(self, user_id: str) -> Optional[int]:
+        """Return the current version of a user's record, or None if unknown"""
+        raise NotImplementedError
+
+    @abstractmethod
+    def put(self, user_id: str, record: Dict, expected_version: Optional[int] = None) -> int:
+        """
+        Store a record and return its new version
+
+        Args:
+            user_id: User the record belongs to
+            record: Profile record (see PROFILE_FIELDS)
+            expected_version: If given, only write when the stored version
+                still matches (0 for a user that must not exist yet);
+                raises ProfileVersionConflict otherwise
+        """
+        raise NotImplementedError
+
+    @abstractmethod
+    def delete(self, user_id: str) -> bool:
+        """Remove a user's record; returns whether it existed"""
+        raise NotImplementedError
+
+    @abstractmethod
+    def __len__(self) -> int:
+        raise NotImplementedError
+
+
+class InMemoryProfileStore(ProfileStore):
+    """
+    Process-local profile store (the default); profiles are lost on restart
+    """
+
+    def __init__(self):
+        self._records = {}  # user_id -> (record, version)
+        self._lock = threading.Lock()
+
+    def __getstate__(self) -> Dict:
+        return {'_records': self._records}
+
+    def __setstate__(self, state: Dict):
+        self._records = state['_records']
+        self._lock = threading.Lock()
+
+    def get(self, user_id: str) -> Optional[Tuple[Dict, int]]:
+        entry = self._records.get(user_id)
+        return (dict(entry[0]), entry[1]) if entry else None
+
+    def version(self, user_id: str) -> Optional[int]:
+        entry = self._records.get(user_id)
+        return entry[1] if entry else None
+
+    def put(self, user_id: str, record: Dict, expected_version: Optional[int] = None) -> int:
+        with self._lock:
+            current = self.version(user_id) or 0
+            if expected_version is not None and current != expected_version:
+                raise ProfileVersionConflict(f"Profile {user_id} changed (version {current}, expected {expected_version})")
+            self._records[user_id] = (dict(record), current + 1)
+            return current + 1
+
+    def delete(self, user_id: str) -> bool:
+        with self._lock:
+            return self._records.pop(user_id, None) is not None
+
+    def __len__(self) -> int:
+        return len(self._records)
+
+
+class SQLiteProfileStore(ProfileStore):
+    """
+    Profile store in a local SQLite database, shared by every process using the file.
+
+    Each thread (and each forked process) opens its own connection; WAL mode
+    lets readers proceed while a writer commits.
+    """
+
+    def __init__(self, path: str, timeout: float = 30.0):
+        self.path = path
+        self.timeout = timeout
+        self._local = threading.local()
+        self._connection().execute(
+            'CREATE TABLE IF NOT EXISTS profiles ('
+            'user_id TEXT PRIMARY KEY, data TEXT NOT NULL, version INTEGER NOT NULL, updated_at REAL NOT NULL)'
+        )
+
+    def __getstate__(self) -> Dict:
+        return {'path': self.path, 'timeout': self.timeout}
+
+    def __setstate__(self, state: Dict):
+        self.__init__(state['path'], state['timeout'])
+
+    def _connection(self) -> sqlite3.Connection:
+        """Connection for the current thread, reopened after a fork"""
+        if getattr(self._local, 'pid', None) != os.getpid():
+            # Autocommit mode; writes open their own transactions
+            connection = sqlite3.connect(self.path, timeout=self.timeout, isolation_level=None)
+            connection.execute('PRAGMA journal_mode=WAL')
+            connection.execute('PRAGMA synchronous=NORMAL')
+            self._local.connection = connection
+            self._local.pid = os.getpid()
+        return self._local.connection
+
+    def get(self, user_id: str) -> Optional[Tuple[Dict, int]]:
+        row = self._connection().execute(
+            'SELECT data, version FROM profiles WHERE user_id = ?', (user_id,)
+        ).fetchone()
+        return (json.loads(row[0]), row[1]) if row else None
+
+    def version(self, user_id: str) -> Optional[int]:
+        row = self._connection().execute('SELECT version FROM profiles WHERE user_id = ?', (user_id,)).fetchone()
+        return row[0] if row else None
+
+    def put(self, user_id: str, record: Dict, expected_version: Optional[int] = None) -> int:
+        connection = self._connection()
+        connection.execute('BEGIN IMMEDIATE')
+        try:
+            current = self.version(user_id) or 0
+            if expected_version is not None and current != expected_version:
+                raise ProfileVersionConflict(f"Profile {user_id} changed (version {current}, expected {expected_version})")
+            connection.execute(
+                'INSERT INTO profiles (user_id, data, version, updated_at) VALUES (?, ?, 1, ?) '
+                'ON CONFLICT(user_id) DO UPDATE SET '
+                'data = excluded.data, version = profiles.version + 1, updated_at = excluded.updated_at',
+                (user_id, json.dumps(record), time.time())
+            )
+        except BaseException:
+            connection.execute('ROLLBACK')
+            raise
+        connection.execute('COMMIT')
+        return current + 1
+
+    def delete(self, user_id: str) -> bool:
+        return self._connection().execute('DELETE FROM profiles WHERE user_id = ?', (user_id,)).rowcount > 0
+
+    def __len__(self) -> int:
+        return self._connection().execute('SELECT COUNT(*) FROM profiles').fetchone()[0]
+
+
+# Engine used by generate_plans_batch worker processes (set by _init_batch_worker)
+_batch_engine = None
+
+
+def _init_batch_worker(engine: 'FitnessAI'):
+    """Pool initializer; with the fork start method the engine is inherited, otherwise it arrives pickled"""
+    global _batch_engine
+    _batch_engine = engine
+
+
+def _user_seed(seed: Optional[int], user_id: str) -> Optional[np.random.SeedSequence]:
+    """Independent per-user seed, so batch results do not depend on chunking or scheduling"""
+    if seed is None:
+        return None
+    return np.random.SeedSequence([seed, zlib.crc32(str(user_id).encode('utf-8'))])
+
+
+def _generate_plan_chunk(user_ids: List[str],
+                         meal_days: int,
+                         workout_days: Optional[int],
+                         seed: Optional[int],
+                         engine: Optional['FitnessAI'] = None) -> List[Tuple[str, Optional[Dict], Optional[str]]]:
+    """Generate complete plans for a chunk of users, capturing per-user errors"""
+    engine = engine or _batch_engine
+    results = []
+    for user_id in user_ids:
+        try:
+            plan = engine.generate_complete_fitness_plan(user_id, meal_days, workout_days,
+                                                         seed=_user_seed(seed, user_id))
+            results.append((user_id, plan, None))
+        except Exception as e:
+            results.append((user_id, None, str(e)))
+    return results
 
 
 class FitnessAI:
@@ -1032,30 +3108,68 @@ class FitnessAI:
     Main AI class that orchestrates personalized fitness recommendations
     """
 
-    def __init__(self, food_db_path: str = None, exercise_db_path: str = None):
-        # Initialize databases
-        self.food_database = FoodDatabase(food_db_path)
-        self.exercise_database = ExerciseDatabase(exercise_db_path)
+    def __init__(self,
+                 food_db_path: str = None,
+                 exercise_db_path: str = None,
+                 plan_cache_size: int = 1024,
+                 plan_cache_ttl: Optional[float] = 3600,
+                 profile_store: Optional[ProfileStore] = None,
+                 profile_cache_size: int = 1024):
+        # Initialize databases (shared with every engine in the process if preload() built them)
+        food_database = _PRELOADED_DATABASES.get(('food', food_db_path))
+        exercise_database = _PRELOADED_DATABASES.get(('exercise', exercise_db_path))
+        self.food_database = food_database if food_database is not None else FoodDatabase(food_db_path)
+        self.exercise_database = (exercise_database if exercise_database is not None
+                                  else ExerciseDatabase(exercise_db_path))
 
         # Initialize planners
         self.meal_planner = MealPlanner(self.food_database)
         self.workout_planner = WorkoutPlanner(self.exercise_database)
 
-        # User session storage
-        self.user_profiles = {}
+        # User profiles live in the store (shared across processes for durable stores);
+        # the bounded cache holds (profile, version) and is revalidated on every read
+        self.profile_store = profile_store if profile_store is not None else InMemoryProfileStore()
+        self.profile_cache = _LRUCache(profile_cache_size)
+
+        # Generated plans keyed by user, profile fingerprint, parameters, catalog version and seed
+        self.plan_cache = _LRUCache(plan_cache_size, ttl=plan_cache_ttl)
+
+    def plan_cache_info(self) -> Dict:
+        """Hit/miss counters and occupancy of the plan cache"""
+        return self.plan_cache.stats()
+
+    def _plan_cache_key(self, kind: str, profile: UserProfile, seed, *params) -> Optional[Tuple]:
+        """
+        Cache key for a generated plan, or None when the plan cannot be cached
+
+        Only None and integer seeds are cacheable; a Generator or SeedSequence
+        carries state that the key cannot capture.
+        """
+        if seed is not None and not isinstance(seed, (int, np.integer)):
+            return None
+        profile_fingerprint = hashlib.sha1(
+            json.dumps(profile.to_dict(), sort_keys=True, default=str).encode('utf-8')
+        ).hexdigest()
+        catalog_version = (self.food_database.catalog.fingerprint(), self.exercise_database.catalog.fingerprint())
+        return (kind, profile.user_id, profile_fingerprint, params, catalog_version,
+                None if seed is None else int(seed))
 
     def create_user_profile(self, user_data: Dict) -> UserProfile:
         """
         Create and store a user profile
 
         Args:
-            user_data: Dictionary with user information
+            user_data: Dictionary with user information (a random user_id is
+                assigned when none is given)
 
         Returns:
             UserProfile object
+
+        Raises:
+            ProfileVersionConflict: If a profile with that user_id already exists
         """
         profile = UserProfile(
-            user_id=user_data.get('user_id', str(len(self.user_profiles) + 1)),
+            user_id=user_data.get('user_id') or uuid.uuid4().hex,
             age=user_data.get('age'),
             gender=user_data.get('gender'),
             height=user_data.get('height'),
@@ -1073,13 +3187,31 @@ class FitnessAI:
             disliked_foods=user_data.get('disliked_foods', [])
         )
 
-        # Store the profile
-        self.user_profiles[profile.user_id] = profile
+        # Write through to the store; create-only, so another worker's profile is never overwritten
+        try:
+            version = self.profile_store.put(profile.user_id, {field: getattr(profile, field) for field in PROFILE_FIELDS},
+                                             expected_version=0)
+        except ProfileVersionConflict:
+            raise ProfileVersionConflict(f"User ID {profile.user_id} already exists") from None
+        self.profile_cache.put(profile.user_id, (profile, version))
         return profile
 
     def get_user_profile(self, user_id: str) -> UserProfile:
-        """Get a user profile by ID"""
-        return self.user_profiles.get(user_id)
+        """Get a user profile by ID (cached until the stored version changes)"""
+        version = self.profile_store.version(user_id)
+        if version is None:
+            return None
+        cached = self.profile_cache.get(user_id)
+        if cached is not None and cached[1] == version:
+            return cached[0]
+
+        entry = self.profile_store.get(user_id)
+        if entry is None:
+            return None
+        record, version = entry
+        profile = UserProfile(**record)
+        self.profile_cache.put(user_id, (profile, version))
+        return profile
 
     def update_user_profile(self, user_id: str, updates: Dict) -> UserProfile:
         """
@@ -1092,39 +3224,77 @@ class FitnessAI:
         Returns:
             Updated UserProfile object
         """
-        if user_id not in self.user_profiles:
-            raise ValueError(f"User ID {user_id} not found")
-
-        # Get existing profile data
-        profile = self.user_profiles[user_id]
-        profile_dict = profile.to_dict()
-
-        # Update with new values
-        for key, value in updates.items():
-            if hasattr(profile, key):
-                profile_dict[key] = value
-
-        # Create new profile with updated data
-        updated_profile = self.create_user_profile(profile_dict)
+        attempts = 3
+        for attempt in range(attempts):
+            entry = self.profile_store.get(user_id)
+            if entry is None:
+                raise ValueError(f"User ID {user_id} not found")
+            record, version = entry
+
+            # Update with new values
+            changes = {key: value for key, value in updates.items()
+                       if key in record and key != 'user_id'}
+            record.update(changes)
+
+            # Patch the cached profile when it's current, so only affected metrics are recomputed
+            cached = self.profile_cache.get(user_id)
+            if cached is not None and cached[1] == version:
+                updated_profile = cached[0].replace(**changes)
+            else:
+                updated_profile = UserProfile(**record)
+
+            # Only write over the version that was read; retry if another worker got there first
+            try:
+                version = self.profile_store.put(user_id, record, expected_version=version)
+                break
+            except ProfileVersionConflict:
+                if attempt == attempts - 1:
+                    raise
+        self.profile_cache.put(user_id, (updated_profile, version))
+
+        # Plans built from the previous profile are stale
+        self.plan_cache.discard(lambda key: key[1] == user_id)
         return updated_profile
 
-    def generate_meal_plan(self, user_id: str, days: int = 7) -> Dict:
-        """Generate a meal plan for a user"""
+    def generate_meal_plan(self,
+                           user_id: str,
+                           days: int = 7,
+                           seed: Optional[Union[int, np.random.Generator]] = None) -> Dict:
+        """Generate a meal plan for a user (identical for identical inputs and seed; cached)"""
         profile = self.get_user_profile(user_id)
         if not profile:
             raise ValueError(f"User ID {user_id} not found")
 
-        return self.meal_planner.generate_weekly_plan(profile, days)
-
-    def generate_workout_plan(self, user_id: str, days: int = None) -> Dict:
-        """Generate a workout plan for a user"""
+        key = self._plan_cache_key('meal', profile, seed, days)
+        plan = self.plan_cache.get(key) if key else None
+        if plan is None:
+            plan = self.meal_planner.generate_weekly_plan(profile, days, rng=_resolve_rng(seed))
+            if key:
+                self.plan_cache.put(key, plan)
+        return plan
+
+    def generate_workout_plan(self,
+                              user_id: str,
+                              days: int = None,
+                              seed: Optional[Union[int, np.random.Generator]] = None) -> Dict:
+        """Generate a workout plan for a user (identical for identical inputs and seed; cached)"""
         profile = self.get_user_profile(user_id)
         if not profile:
             raise ValueError(f"User ID {user_id} not found")
 
-        return self.workout_planner.generate_weekly_plan(profile, days)
-
-    def generate_complete_fitness_plan(self, user_id: str, meal_days: int = 7, workout_days: int = None) -> Dict:
+        key = self._plan_cache_key('workout', profile, seed, days)
+        plan = self.plan_cache.get(key) if key else None
+        if plan is None:
+            plan = self.workout_planner.generate_weekly_plan(profile, days, rng=_resolve_rng(seed))
+            if key:
+                self.plan_cache.put(key, plan)
+        return plan
+
+    def generate_complete_fitness_plan(self,
+                                       user_id: str,
+                                       meal_days: int = 7,
+                                       workout_days: int = None,
+                                       seed: Optional[Union[int, np.random.Generator]] = None) -> Dict:
         """
         Generate a complete fitness plan including both meals and workouts
 
@@ -1132,16 +3302,26 @@ class FitnessAI:
             user_id: User ID
             meal_days: Number of days for meal plan
             workout_days: Number of days for workout plan (defaults to user preference)
+            seed: Seed or numpy Generator; the same seed and inputs reproduce the same plan
 
         Returns:
-            Complete fitness plan dictionary
+            Complete fitness plan dictionary. The meal and workout plans may be
+            served from the plan cache and shared between calls; only the
+            profile and dates are rebuilt every time.
         """
         profile = self.get_user_profile(user_id)
         if not profile:
             raise ValueError(f"User ID {user_id} not found")
 
-        meal_plan = self.meal_planner.generate_weekly_plan(profile, meal_days)
-        workout_plan = self.workout_planner.generate_weekly_plan(profile, workout_days)
+        key = self._plan_cache_key('complete', profile, seed, meal_days, workout_days)
+        plans = self.plan_cache.get(key) if key else None
+        if plans is None:
+            rng = _resolve_rng(seed)
+            plans = (self.meal_planner.generate_weekly_plan(profile, meal_days, rng=rng),
+                     self.workout_planner.generate_weekly_plan(profile, workout_days, rng=rng))
+            if key:
+                self.plan_cache.put(key, plans)
+        meal_plan, workout_plan = plans
 
         return {
             'user_id': user_id,
@@ -1153,15 +3333,402 @@ class FitnessAI:
             'plan_end_date': (datetime.now() + timedelta(days=meal_days)).strftime('%Y-%m-%d')
         }
 
+    def iter_meal_plan(self,
+                       user_id: str,
+                       days: int = 7,
+                       seed: Optional[Union[int, np.random.Generator]] = None):
+        """
+        Stream a meal plan as records (see iter_complete_fitness_plan)
+
+        Yields a 'header', one 'meal_day' per day and a 'summary' with the
+        weekly averages. Raises ValueError immediately for unknown users.
+        """
+        profile = self.get_user_profile(user_id)
+        if not profile:
+            raise ValueError(f"User ID {user_id} not found")
+
+        header = {'type': 'header', 'user_id': user_id, 'days': days}
+        key = self._plan_cache_key('meal', profile, seed, days)
+        cached = self.plan_cache.get(key) if key else None
+        if cached is not None:
+            return self._replay_plan_records(header, meal_plan=cached)
+        return self._stream_plan_records(header, profile, _resolve_rng(seed), meal_days=days)
+
+    def iter_workout_plan(self,
+                          user_id: str,
+                          days: int = None,
+                          seed: Optional[Union[int, np.random.Generator]] = None):
+        """
+        Stream a workout plan as records (see iter_complete_fitness_plan)
+
+        Yields a 'header', one 'workout' per session and a 'summary'.
+        Raises ValueError immediately for unknown users.
+        """
+        profile = self.get_user_profile(user_id)
+        if not profile:
+            raise ValueError(f"User ID {user_id} not found")
+
+        workout_days = days if days is not None else profile.preferred_workout_days
+        header = {'type': 'header', 'user_id': user_id, 'days_per_week': workout_days, 'rest_days': 7 - workout_days}
+        key = self._plan_cache_key('workout', profile, seed, days)
+        cached = self.plan_cache.get(key) if key else None
+        if cached is not None:
+            return self._replay_plan_records(header, workout_plan=cached)
+        return self._stream_plan_records(header, profile, _resolve_rng(seed), workout_days=workout_days)
+
+    def iter_complete_fitness_plan(self,
+                                   user_id: str,
+                                   meal_days: int = 7,
+                                   workout_days: int = None,
+                                   seed: Optional[Union[int, np.random.Generator]] = None):
+        """
+        Stream a complete fitness plan as records, each produced as it is generated
+
+        The plan content matches generate_complete_fitness_plan (greedy meal
+        solver) for the same seed, split into records that can be written out
+        one by one, so the first record is available after the first day and
+        memory stays flat for long plans:
+
+            {'type': 'header', 'user_id', 'user_profile', dates, 'days_per_week', 'rest_days'}
+            {'type': 'meal_day', ...day plan}      one per meal day
+            {'type': 'workout', ...workout}        one per workout
+            {'type': 'summary', 'weekly_nutrition_avg', 'workouts'}
+
+        A plan already in the plan cache is replayed; freshly streamed plans
+        are not cached, as that would require holding them in memory.
+        Raises ValueError immediately for unknown users.
+        """
+        profile = self.get_user_profile(user_id)
+        if not profile:
+            raise ValueError(f"User ID {user_id} not found")
+
+        days_per_week = workout_days if workout_days is not None else profile.preferred_workout_days
+        header = {
+            'type': 'header',
+            'user_id': user_id,
+            'user_profile': profile.to_dict(),
+            'generation_date': datetime.now().strftime('%Y-%m-%d'),
+            'plan_start_date': (datetime.now() + timedelta(days=1)).strftime('%Y-%m-%d'),
+            'plan_end_date': (datetime.now() + timedelta(days=meal_days)).strftime('%Y-%m-%d'),
+            'days_per_week': days_per_week,
+            'rest_days': 7 - days_per_week
+        }
+        key = self._plan_cache_key('complete', profile, seed, meal_days, workout_days)
+        cached = self.plan_cache.get(key) if key else None
+        if cached is not None:
+            return self._replay_plan_records(header, *cached)
+        return self._stream_plan_records(header, profile, _resolve_rng(seed), meal_days, days_per_week)
+
+    def _stream_plan_records(self,
+                             header: Dict,
+                             profile: UserProfile,
+                             rng: np.random.Generator,
+                             meal_days: Optional[int] = None,
+                             workout_days: Optional[int] = None):
+        """Generate plan records lazily; meals are drawn before workouts, as in the non-streaming methods"""
+        yield header
+        summary = {'type': 'summary'}
+
+        if meal_days is not None:
+            average = {'calories': 0, 'protein': 0, 'carbs': 0, 'fat': 0}
+            for day_plan in self.meal_planner.iter_weekly_plan(profile, meal_days, rng=rng):
+                for nutrient in average:
+                    average[nutrient] += day_plan['total_nutrition'][nutrient] / meal_days
+                yield {'type': 'meal_day', **day_plan}
+            summary['weekly_nutrition_avg'] = {nutrient: round(value, 1) for nutrient, value in average.items()}
+
+        if workout_days is not None:
+            count = 0
+            for workout in self.workout_planner.iter_weekly_plan(profile, workout_days, rng=rng):
+                count += 1
+                yield {'type': 'workout', **workout}
+            summary['workouts'] = count
+
+        yield summary
+
+    @staticmethod
+    def _replay_plan_records(header: Dict, meal_plan: Optional[Dict] = None, workout_plan: Optional[Dict] = None):
+        """Records for an already generated (cached) plan"""
+        yield header
+        summary = {'type': 'summary'}
+        if meal_plan is not None:
+            for day_plan in meal_plan['days']:
+                yield {'type': 'meal_day', **day_plan}
+            summary['weekly_nutrition_avg'] = meal_plan['weekly_nutrition_avg']
+        if workout_plan is not None:
+            for workout in workout_plan['workouts']:
+                yield {'type': 'workout', **workout}
+            summary['workouts'] = len(workout_plan['workouts'])
+        yield summary
+
+    def generate_plans_batch(self,
+                             user_ids: List[str],
+                             meal_days: int = 7,
+                             workout_days: int = None,
+                             seed: Optional[int] = None,
+                             max_workers: Optional[int] = None,
+                             chunk_size: int = 64):
+        """
+        Generate complete fitness plans for many users in parallel
+
+        Users are split into chunks that run in a process pool. Workers are
+        forked, inheriting this engine - its catalogs and profiles - instead
+        of receiving pickled copies, unless the calling process already runs
+        other threads (e.g. a threaded Flask/gunicorn worker): forking a
+        threaded process can deadlock the child, so those calls start clean
+        workers with forkserver (or spawn) and pickle the engine to them.
+        Results are yielded as chunks finish, so they arrive out of order.
+
+        Args:
+            user_ids: IDs of the users to plan for
+            meal_days: Number of days for meal plans
+            workout_days: Number of days for workout plans (defaults to user preference)
+            seed: Base seed; each user's plan is seeded from (seed, user_id) and
+                matches across runs regardless of chunking or worker count
+            max_workers: Worker processes (defaults to the CPU count); 1 runs in-process
+            chunk_size: Users per task
+
+        Returns:
+            Iterator of (user_id, plan, error) tuples; plan is None and error
+            holds the message when a user's plan could not be generated
+
+        Raises:
+            ValueError: If chunk_size is not positive (raised by the call itself)
+        """
+        if chunk_size < 1:
+            raise ValueError("chunk_size must be positive")
+        chunks = [user_ids[i:i + chunk_size] for i in range(0, len(user_ids), chunk_size)]
+        return self._iter_plans_batch(chunks, meal_days, workout_days, seed, max_workers)
+
+    def _iter_plans_batch(self,
+                          chunks: List[List[str]],
+                          meal_days: int,
+                          workout_days: Optional[int],
+                          seed: Optional[int],
+                          max_workers: Optional[int]):
+        """Generator behind generate_plans_batch"""
+        if max_workers == 1:
+            for chunk in chunks:
+                yield from _generate_plan_chunk(chunk, meal_days, workout_days, seed, engine=self)
+            return
+
+        import multiprocessing
+        from concurrent.futures import ProcessPoolExecutor, as_completed
+
+        methods = multiprocessing.get_all_start_methods()
+        if 'fork' in methods and threading.active_count() == 1:
+            method = 'fork'
+        else:
+            method = 'forkserver' if 'forkserver' in methods else 'spawn'
+        executor = ProcessPoolExecutor(max_workers=max_workers, mp_context=multiprocessing.get_context(method),
+                                       initializer=_init_batch_worker, initargs=(self,))
+        try:
+            futures = [executor.submit(_generate_plan_chunk, chunk, meal_days, workout_days, seed)
+                       for chunk in chunks]
+            for future in as_completed(futures):
+                yield from future.result()
+        finally:
+            # Also reached when the caller stops consuming early
+            executor.shutdown(wait=True, cancel_futures=True)
+
+
+# Databases built by preload(), keyed by (kind, path)
+_PRELOADED_DATABASES: Dict[Tuple[str, Optional[str]], Union[FoodDatabase, ExerciseDatabase]] = {}
+
+
+def _freeze_arrays(value):
+    """Mark every numpy array reachable through value's containers and string columns read-only"""
+    if isinstance(value, np.ndarray):
+        value.flags.writeable = False
+    elif isinstance(value, _StringColumn):
+        _freeze_arrays(value.data)
+        _freeze_arrays(value.offsets)
+    elif isinstance(value, dict):
+        for item in value.values():
+            _freeze_arrays(item)
+    elif isinstance(value, (list, tuple)):
+        for item in value:
+            _freeze_arrays(item)
+
+
+def preload(food_db_path: Optional[str] = None, exercise_db_path: Optional[str] = None):
+    """
+    Build the catalogs once, before a server forks its workers (gunicorn --preload)
+
+    Every FitnessAI created afterwards with the same paths reuses these
+    databases. The catalogs are columnar arrays, made read-only here; the
+    DataFrame views (one Python object per cell) are dropped, and the objects
+    that exist now are moved out of the garbage collector's reach, so workers
+    share the pages copy-on-write instead of dirtying them with reference
+    count and GC bookkeeping writes.
+
+    Args:
+        food_db_path: Food catalog, as for FitnessAI
+        exercise_db_path: Exercise catalog, as for FitnessAI
+    """
+    food_database = FoodDatabase(food_db_path)
+    exercise_database = ExerciseDatabase(exercise_db_path)
+
+    # Compute everything workers would otherwise build lazily (and separately)
+    food_database.catalog.fingerprint()
+    food_database.catalog.allergens
+    exercise_database.catalog.fingerprint()
+    food_database._foods = None
+    exercise_database._exercises = None
+    for catalog in (food_database.catalog, exercise_database.catalog, food_database.catalog.allergens):
+        _freeze_arrays(vars(catalog))
+
+    _PRELOADED_DATABASES[('food', food_db_path)] = food_database
+    _PRELOADED_DATABASES[('exercise', exercise_db_path)] = exercise_database
+    gc.collect()
+    gc.freeze()
+
+
     # Web API implementation using Flask
 
 
-from flask import Flask, request, jsonify, render_template
+def _json_default(value):
+    """json.dumps fallback for the numpy/pandas values that plans are built from"""
+    if isinstance(value, np.generic):
+        return value.item()
+    if isinstance(value, np.ndarray):
+        return value.tolist()
+    if isinstance(value, (datetime, date)):  # includes pd.Timestamp
+        return value.isoformat()
+    if isinstance(value, (set, frozenset)):
+        return list(value)
+    raise TypeError(f"Object of type {type(value).__name__} is not JSON serializable")
+
 
+def dumps_json(obj) -> str:
+    """Serialize plans and other engine output to compact JSON, converting numpy values natively"""
+    return json.dumps(obj, default=_json_default, ensure_ascii=False, separators=(',', ':'))
+
+
+class PlanCompactor:
+    """
+    Replaces the catalog text repeated throughout plans with ids into a lookup table.
+
+    Exercises lose their name, description and instructions (in favour of
+    'exercise_id') and foods their name and serving size (in favour of
+    'food_id'); per-plan fields such as sets, reps, servings and nutrition
+    stay inline. Ids are assigned in order of first appearance and stay
+    valid for everything passed through the same compactor, so a stream
+    only needs to send each table entry once.
+    """
+
+    # kind -> (field marking an item of that kind, id field, static fields moved to the table)
+    CATALOG_FIELDS = {
+        'exercises': ('instructions', 'exercise_id', ('name', 'description', 'instructions')),
+        'foods': ('serving_size', 'food_id', ('name', 'serving_size'))
+    }
+
+    def __init__(self):
+        self.ids = {kind: {} for kind in self.CATALOG_FIELDS}
+        self._new_entries = {kind: {} for kind in self.CATALOG_FIELDS}
+
+    def compact(self, value):
+        """Compacted copy of a plan (or stream record); the input is left untouched"""
+        if isinstance(value, list):
+            return [self.compact(item) if isinstance(item, (dict, list)) else item for item in value]
+        if not isinstance(value, dict):
+            return value
+
+        compacted = {}
+        skip = ()
+        for kind, (marker, id_field, fields) in self.CATALOG_FIELDS.items():
+            if marker in value and all(field in value for field in fields):
+                key = tuple(value[field] for field in fields)
+                ids = self.ids[kind]
+                item_id = ids.get(key)
+                if item_id is None:
+                    item_id = ids[key] = len(ids)
+                    self._new_entries[kind][str(item_id)] = dict(zip(fields, key))
+                compacted[id_field] = item_id
+                skip = fields
+                break
+        for k, v in value.items():
+            if k not in skip:
+                compacted[k] = self.compact(v) if isinstance(v, (dict, list)) else v
+        return compacted
+
+    def take_catalog(self) -> Dict[str, Dict[str, Dict]]:
+        """Table entries added since the last call, as {kind: {id: fields}} (empty kinds omitted)"""
+        catalog = {kind: entries for kind, entries in self._new_entries.items() if entries}
+        self._new_entries = {kind: {} for kind in self.CATALOG_FIELDS}
+        return catalog
+
+
+def compact_plan(plan: Dict) -> Tuple[Dict, Dict[str, Dict[str, Dict]]]:
+    """
+    Compact a plan so catalog items are referenced by id
+
+    Returns:
+        Tuple of (compacted plan, lookup table as {kind: {id: fields}})
+    """
+    compactor = PlanCompactor()
+    compacted = compactor.compact(plan)
+    return compacted, compactor.take_catalog()
+
+
+def create_fitness_api(profile_db_path: Optional[str] = None):
+    """
+    Create the Flask app
+
+    Args:
+        profile_db_path: SQLite file for user profiles (defaults to the
+            FITNESSAI_PROFILE_DB environment variable); every worker using
+            the same file sees the same profiles. Without it, profiles are
+            kept in process memory.
+    """
+    from flask import Flask, Response, request, jsonify, render_template, stream_with_context
+    from flask.json.provider import DefaultJSONProvider
+
+    class PlanJSONProvider(DefaultJSONProvider):
+        """jsonify() that understands numpy values and skips key sorting and ASCII escaping"""
+
+        ensure_ascii = False
+        sort_keys = False
+
+        @staticmethod
+        def default(value):
+            return _json_default(value)
 
-def create_fitness_api():
     app = Flask(__name__)
-    fitness_ai = FitnessAI()
+    app.json = PlanJSONProvider(app)
+    profile_db_path = profile_db_path or os.environ.get('FITNESSAI_PROFILE_DB')
+    fitness_ai = FitnessAI(profile_store=SQLiteProfileStore(profile_db_path) if profile_db_path else None)
+
+    def ndjson_response(records, compact: bool = False) -> Response:
+        """
+        Stream plan records as newline-delimited JSON, one record per line
+
+        With compact, records reference catalog items by id and carry the
+        table entries first used in them under 'catalog'.
+        """
+        compactor = PlanCompactor() if compact else None
+
+        def generate():
+            try:
+                for record in records:
+                    if compactor:
+                        record = compactor.compact(record)
+                        catalog = compactor.take_catalog()
+                        if catalog:
+                            record['catalog'] = catalog
+                    yield dumps_json(record) + '\n'
+            except Exception as e:
+                # The status line has already been sent; report the failure in-band
+                yield dumps_json({'type': 'error', 'message': str(e)}) + '\n'
+
+        return Response(stream_with_context(generate()), mimetype='application/x-ndjson')
+
+    def plan_response(field: str, plan: Dict, compact: bool = False) -> Response:
+        """JSON response for a plan, optionally with catalog items moved to a lookup table"""
+        if not compact:
+            return jsonify({'success': True, field: plan})
+        plan, catalog = compact_plan(plan)
+        return jsonify({'success': True, field: plan, 'catalog': catalog})
 
     @app.route('/')
     def home():
@@ -1222,13 +3789,15 @@ def create_fitness_api():
     def get_meal_plan(user_id):
         """Generate a meal plan for a user"""
         days = request.args.get('days', default=7, type=int)
+        seed = request.args.get('seed', default=None, type=int)
+        stream = request.args.get('stream', default=0, type=int)
+        compact = request.args.get('compact', default=0, type=int)
 
         try:
-            meal_plan = fitness_ai.generate_meal_plan(user_id, days)
-            return jsonify({
-                'success': True,
-                'meal_plan': meal_plan
-            })
+            if stream:
+                return ndjson_response(fitness_ai.iter_meal_plan(user_id, days, seed=seed), compact)
+            meal_plan = fitness_ai.generate_meal_plan(user_id, days, seed=seed)
+            return plan_response('meal_plan', meal_plan, compact)
         except Exception as e:
             return jsonify({
                 'success': False,
@@ -1239,13 +3808,15 @@ def create_fitness_api():
     def get_workout_plan(user_id):
         """Generate a workout plan for a user"""
         days = request.args.get('days', default=None, type=int)
+        seed = request.args.get('seed', default=None, type=int)
+        stream = request.args.get('stream', default=0, type=int)
+        compact = request.args.get('compact', default=0, type=int)
 
         try:
-            workout_plan = fitness_ai.generate_workout_plan(user_id, days)
-            return jsonify({
-                'success': True,
-                'workout_plan': workout_plan
-            })
+            if stream:
+                return ndjson_response(fitness_ai.iter_workout_plan(user_id, days, seed=seed), compact)
+            workout_plan = fitness_ai.generate_workout_plan(user_id, days, seed=seed)
+            return plan_response('workout_plan', workout_plan, compact)
         except Exception as e:
             return jsonify({
                 'success': False,
@@ -1257,17 +3828,50 @@ def create_fitness_api():
         """Generate a complete fitness plan for a user"""
         meal_days = request.args.get('meal_days', default=7, type=int)
         workout_days = request.args.get('workout_days', default=None, type=int)
+        seed = request.args.get('seed', default=None, type=int)
+        stream = request.args.get('stream', default=0, type=int)
+        compact = request.args.get('compact', default=0, type=int)
 
         try:
-            fitness_plan = fitness_ai.generate_complete_fitness_plan(user_id, meal_days, workout_days)
-            return jsonify({
-                'success': True,
-                'fitness_plan': fitness_plan
-            })
+            if stream:
+                return ndjson_response(
+                    fitness_ai.iter_complete_fitness_plan(user_id, meal_days, workout_days, seed=seed), compact
+                )
+            fitness_plan = fitness_ai.generate_complete_fitness_plan(user_id, meal_days, workout_days, seed=seed)
+            return plan_response('fitness_plan', fitness_plan, compact)
         except Exception as e:
             return jsonify({
                 'success': False,
                 'message': str(e)
             }), 400
 
-    return app
\ No newline at end of file
+    return app
+
+
+if __name__ == '__main__':
+    import argparse
+
+    parser = argparse.ArgumentParser(description='FitnessAI catalog tools')
+    commands = parser.add_subparsers(dest='command', required=True)
+    compile_parser = commands.add_parser('compile', help='Compile a CSV/JSON catalog to the memory-mapped format')
+    compile_parser.add_argument('source', help='CSV or JSON source file')
+    compile_parser.add_argument('output', help='Directory to write the compiled catalog to')
+    compile_parser.add_argument('--kind', choices=['food', 'exercise'], default='food')
+    ingest_parser = commands.add_parser('ingest', help='Stream a large CSV/JSON source into a compiled catalog')
+    ingest_parser.add_argument('source', help='CSV, JSON or newline-delimited JSON source file')
+    ingest_parser.add_argument('output', help='Directory to write the compiled catalog to')
+    ingest_parser.add_argument('--kind', choices=['food', 'exercise'], default='food')
+    ingest_parser.add_argument('--chunk-size', type=int, default=50000)
+    args = parser.parse_args()
+
+    if args.command == 'compile':
+        print(compile_catalog(args.source, args.output, args.kind))
+    elif args.command == 'ingest':
+        import sys
+
+        def report_progress(report):
+            print(f"{report['rows_read']} rows read, {report['rows_accepted']} accepted, "
+                  f"{report['rows_rejected']} rejected", file=sys.stderr)
+
+        print(json.dumps(ingest_catalog(args.source, args.output, args.kind, args.chunk_size,
+                                        progress=report_progress), indent=2))
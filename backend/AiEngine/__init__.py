@@ -0,0 +1,26 @@
+"""
+FitnessAI engine
+
+Importing the package is cheap: the engine module, and numpy, pandas and
+Flask with it, is only loaded when one of the names below is first used.
+The engine class itself is AiEngine.FitnessAI.FitnessAI; the package does
+not re-export it, since AiEngine.FitnessAI must stay the submodule.
+"""
+
+import importlib
+
+__all__ = [
+    'UserProfile', 'FoodDatabase', 'ExerciseDatabase', 'MealPlanner', 'WorkoutPlanner',
+    'ProfileStore', 'InMemoryProfileStore', 'SQLiteProfileStore', 'ProfileVersionConflict',
+    'calculate_energy_targets', 'compile_catalog', 'ingest_catalog',
+    'PlanCompactor', 'compact_plan', 'dumps_json', 'create_fitness_api', 'preload'
+]
+
+
+def __getattr__(name):
+    if name not in __all__:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    engine = importlib.import_module('.FitnessAI', __name__)
+    value = getattr(engine, name)
+    globals()[name] = value
+    return value
@@ -0,0 +1,326 @@
+"""
+Benchmarks for the FitnessAI engine
+
+Run from this directory:
+    python benchmarks.py --output baseline.json
+    python benchmarks.py --compare baseline.json
+
+The operation suite times catalog filters, the meal and workout planners and
+complete plans against synthetic food catalogs of each --sizes, with fixed
+seeds, and reports ops/sec, p50/p99 latency and peak traced memory per
+operation. --compare flags operations that got slower or hungrier than the
+saved baseline (and exits with status 1 if any did).
+"""
+
+import argparse
+import json
+import os
+import platform
+import sys
+import tempfile
+import time
+import tracemalloc
+from typing import Callable, Dict, List, Optional
+
+import numpy as np
+import pandas as pd
+
+from FitnessAI import FitnessAI, FoodCatalog, UserProfile, calculate_energy_targets
+
+FOOD_CATEGORIES = {
+    # category -> (calories, protein, carbs, fat) ranges per serving
+    'protein': ((100, 260), (15, 32), (0, 10), (1, 18)),
+    'carb': ((80, 390), (1, 17), (18, 70), (0, 7)),
+    'fat': ((55, 200), (0, 8), (0, 10), (3, 20)),
+    'vegetable': ((20, 60), (0.5, 4), (3, 12), (0, 1))
+}
+FOOD_TAGS = ['vegetarian', 'vegan', 'plant_based', 'gluten_free', 'dairy_free', 'nut_free', 'high_protein',
+             'low_carb', 'breakfast', 'snack', 'fiber', 'whole_grain', 'healthy_fat', 'omega3']
+
+
+def synthetic_profiles(engine: FitnessAI, count: int, seed: int = 0) -> List[UserProfile]:
+    """Create reproducible random user profiles on the engine"""
+    rng = np.random.default_rng(seed)
+    restrictions = [[], [], ['vegetarian'], ['dairy_free']]
+    profiles = []
+    for i in range(count):
+        profiles.append(engine.create_user_profile({
+            'user_id': f'bench-{i}',
+            'age': int(rng.integers(18, 70)),
+            'gender': str(rng.choice(['male', 'female'])),
+            'height': float(rng.uniform(150, 195)),
+            'weight': float(rng.uniform(50, 120)),
+            'goal': str(rng.choice(['weight_loss', 'muscle_gain', 'maintenance'])),
+            'activity_level': str(rng.choice(['sedentary', 'light', 'moderate', 'active', 'very_active'])),
+            'dietary_restrictions': restrictions[int(rng.integers(len(restrictions)))]
+        }))
+    return profiles
+
+
+def synthetic_food_catalog(path: str, size: int, seed: int = 0) -> str:
+    """Write a reproducible random food catalog of the given size in the compiled format"""
+    rng = np.random.default_rng(seed)
+    categories = np.array(list(FOOD_CATEGORIES))[rng.integers(len(FOOD_CATEGORIES), size=size)]
+    foods = pd.DataFrame({
+        'name': [f'Food {i}' for i in range(size)],
+        'category': categories,
+        'serving_size': '100g'
+    })
+    for i, nutrient in enumerate(FoodCatalog.NUTRIENTS):
+        low = np.array([FOOD_CATEGORIES[category][i][0] for category in categories])
+        high = np.array([FOOD_CATEGORIES[category][i][1] for category in categories])
+        foods[nutrient] = rng.uniform(low, high).round(1)
+    tag_bits = rng.random((size, len(FOOD_TAGS))) < 0.25
+    foods['tags'] = [[FOOD_TAGS[j] for j in np.flatnonzero(row)] for row in tag_bits]
+    FoodCatalog.from_frame(foods).save(path)
+    return path
+
+
+def measure(run: Callable[[], object], min_time: float = 0.5, max_runs: int = 10000) -> Dict[str, float]:
+    """
+    Time an operation until min_time has passed (at least 5 runs, after one warm-up run)
+
+    Returns:
+        ops_per_second, p50_ms and p99_ms over the timed runs, and
+        peak_memory_kb traced by tracemalloc during one extra run
+    """
+    run()
+    timings = []
+    start = time.perf_counter()
+    while len(timings) < max_runs and (len(timings) < 5 or time.perf_counter() - start < min_time):
+        began = time.perf_counter()
+        run()
+        timings.append(time.perf_counter() - began)
+
+    tracemalloc.start()
+    try:
+        run()
+        peak = tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+
+    timings = np.array(timings)
+    return {
+        'ops_per_second': round(len(timings) / timings.sum(), 2),
+        'p50_ms': round(float(np.percentile(timings, 50)) * 1000, 4),
+        'p99_ms': round(float(np.percentile(timings, 99)) * 1000, 4),
+        'peak_memory_kb': round(peak / 1024, 1),
+        'runs': len(timings)
+    }
+
+
+def _seeds(seed: int):
+    """Fixed sequence of seeds, so repeated calls don't just hit the plan cache"""
+    counter = iter(range(seed, seed + 10 ** 9))
+    return lambda: next(counter)
+
+
+def bench_operations(sizes: List[int], seed: int = 0, min_time: float = 0.5) -> Dict[str, Dict[str, float]]:
+    """
+    ops/sec, p50/p99 and peak memory for the engine's main operations
+
+    Food catalog and meal planner operations run once per catalog size
+    (keyed 'foods=<size>/<operation>'); workout operations only depend on
+    the exercise catalog and run once.
+    """
+    profile = UserProfile('bench', 30, 'female', 168, 64, 'weight_loss', 'moderately_active',
+                          dietary_restrictions=['vegetarian'], allergies=['peanut'],
+                          fitness_experience='intermediate', preferred_workout_days=4,
+                          available_equipment=['bodyweight', 'dumbbells', 'bench'])
+    profile_data = {field: getattr(profile, field) for field in
+                    ['user_id', 'age', 'gender', 'height', 'weight', 'goal', 'activity_level',
+                     'dietary_restrictions', 'allergies', 'fitness_experience', 'preferred_workout_days',
+                     'available_equipment']}
+    results = {}
+
+    with tempfile.TemporaryDirectory() as workdir:
+        for size in sizes:
+            catalog_path = synthetic_food_catalog(os.path.join(workdir, f'foods-{size}'), size, seed)
+            engine = FitnessAI(food_db_path=catalog_path, plan_cache_ttl=None)
+            engine.create_user_profile(profile_data)
+            food_db, meals = engine.food_database, engine.meal_planner
+            next_seed = _seeds(seed)
+
+            operations = {
+                'food_db.get_foods_by_category': lambda: food_db.get_foods_by_category('protein'),
+                'food_db.filter_by_restrictions': lambda: food_db.filter_by_restrictions(['vegetarian', 'gluten_free']),
+                'food_db.restriction_mask': lambda: food_db.restriction_mask(['vegetarian', 'gluten_free']),
+                'food_db.allergen_mask': lambda: food_db.allergen_mask(['peanut', 'milk']),
+                'meal_planner.generate_daily_meals': lambda: meals.generate_daily_meals(profile, rng=next_seed()),
+                'meal_planner.generate_weekly_plan': lambda: meals.generate_weekly_plan(profile, rng=next_seed()),
+                'fitness_ai.generate_complete_fitness_plan': lambda: engine.generate_complete_fitness_plan(
+                    'bench', seed=next_seed()),
+                'fitness_ai.generate_complete_fitness_plan[cached]': lambda: engine.generate_complete_fitness_plan(
+                    'bench', seed=seed)
+            }
+            for name, run in operations.items():
+                results[f'foods={size}/{name}'] = measure(run, min_time)
+
+    workouts = FitnessAI().workout_planner
+    next_seed = _seeds(seed)
+    operations = {
+        'workout_planner.generate_workout_session': lambda: workouts.generate_workout_session(profile, rng=next_seed()),
+        'workout_planner.generate_weekly_plan': lambda: workouts.generate_weekly_plan(profile, rng=next_seed())
+    }
+    for name, run in operations.items():
+        results[name] = measure(run, min_time)
+    return results
+
+
+def compare(results: Dict[str, Dict[str, float]],
+            baseline: Dict[str, Dict[str, float]],
+            tolerance: float = 0.15) -> Dict[str, Dict]:
+    """
+    Compare operation results with a baseline
+
+    An operation regresses when its ops/sec drops, or its p99 latency or peak
+    memory grows, by more than tolerance (a fraction) against the baseline.
+
+    Returns:
+        Operation -> {'ratios': metric -> current / baseline, 'regressions': [metrics]}
+        for every operation present in both
+    """
+    comparison = {}
+    for name in sorted(set(results) & set(baseline)):
+        current, previous = results[name], baseline[name]
+        ratios = {metric: round(current[metric] / previous[metric], 3)
+                  for metric in ['ops_per_second', 'p99_ms', 'peak_memory_kb'] if previous.get(metric)}
+        regressions = [metric for metric, ratio in ratios.items()
+                       if (ratio < 1 - tolerance if metric == 'ops_per_second' else ratio > 1 + tolerance)]
+        comparison[name] = {'ratios': ratios, 'regressions': regressions}
+    return comparison
+
+
+def macro_error(plans: List[Dict]) -> Dict[str, float]:
+    """Mean absolute relative error of daily totals against the daily targets"""
+    errors = [[abs(day['total_nutrition'][nutrient] - day['daily_target'][nutrient]) / day['daily_target'][nutrient]
+               for nutrient in ['calories', 'protein', 'carbs', 'fat']]
+              for plan in plans for day in plan['days']]
+    return dict(zip(['calories', 'protein', 'carbs', 'fat'], np.mean(errors, axis=0).round(4).tolist()))
+
+
+def bench_meal_solvers(users: int = 1000, days: int = 7, seed: int = 0) -> Dict[str, Dict]:
+    """
+    Weekly meal plans per second and macro error for each planning mode
+
+    'greedy' and 'greedy_batched' plan one user per call; 'optimize' plans
+    every user in one generate_weekly_plans call.
+    """
+    engine = FitnessAI()
+    planner = engine.meal_planner
+    profiles = synthetic_profiles(engine, users, seed)
+    modes = {
+        'greedy': lambda: [planner.generate_weekly_plan(profile, days, rng=seed) for profile in profiles],
+        'greedy_batched': lambda: planner.generate_weekly_plans(profiles, days, solver='greedy', rng=seed),
+        'optimize': lambda: planner.generate_weekly_plans(profiles, days, solver='optimize', rng=seed)
+    }
+
+    results = {}
+    for mode, run in modes.items():
+        run()  # warm the candidate pool caches
+        start = time.perf_counter()
+        plans = run()
+        elapsed = time.perf_counter() - start
+        results[mode] = {
+            'plans_per_second': round(users / elapsed, 1),
+            'seconds': round(elapsed, 3),
+            'macro_error': macro_error(plans)
+        }
+    return results
+
+
+def bench_energy_targets(users: int = 1_000_000, seed: int = 0, scalar_sample: int = 20000) -> Dict[str, float]:
+    """
+    Users per second for calculate_energy_targets vs building UserProfile objects
+
+    The scalar path runs on the first scalar_sample users only; the vectorized
+    results for those users are checked against it.
+    """
+    rng = np.random.default_rng(seed)
+    population = pd.DataFrame({
+        'age': rng.integers(18, 70, users),
+        'gender': rng.choice(['male', 'female'], users),
+        'height': rng.uniform(150, 195, users).round(1),
+        'weight': rng.uniform(50, 120, users).round(1),
+        'goal': rng.choice(['weight_loss', 'muscle_gain', 'maintenance'], users),
+        'activity_level': rng.choice(list(UserProfile.ACTIVITY_MULTIPLIERS), users)
+    })
+
+    start = time.perf_counter()
+    targets = calculate_energy_targets(population)
+    vectorized = time.perf_counter() - start
+
+    sample = population.head(scalar_sample)
+    start = time.perf_counter()
+    profiles = [UserProfile(str(i), *row) for i, row in
+                enumerate(sample[['age', 'gender', 'height', 'weight', 'goal', 'activity_level']].itertuples(index=False))]
+    expected = [(p.bmi, p.bmr, p.tdee, p.target_calories, p.macros['protein'], p.macros['fat'], p.macros['carbs'])
+                for p in profiles]
+    scalar = time.perf_counter() - start
+
+    fields = ['bmi', 'bmr', 'tdee', 'target_calories', 'protein', 'fat', 'carbs']
+    actual = list(zip(*(targets[field][:len(sample)].tolist() for field in fields)))
+    return {
+        'users': users,
+        'vectorized_seconds': round(vectorized, 3),
+        'vectorized_users_per_second': round(users / vectorized, 1),
+        'scalar_users_per_second': round(len(sample) / scalar, 1),
+        'matches_scalar': actual == expected
+    }
+
+
+def _environment() -> Dict[str, str]:
+    """Versions and machine details to record next to the results"""
+    return {
+        'python': platform.python_version(),
+        'numpy': np.__version__,
+        'pandas': pd.__version__,
+        'machine': platform.machine(),
+        'cpus': os.cpu_count()
+    }
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='FitnessAI engine benchmarks')
+    parser.add_argument('--only', nargs='+', choices=['operations', 'meal_solvers', 'energy_targets'],
+                        default=['operations', 'meal_solvers', 'energy_targets'])
+    parser.add_argument('--sizes', default='25,10000,1000000', help='comma-separated food catalog sizes')
+    parser.add_argument('--min-time', type=float, default=0.5, help='seconds to time each operation for')
+    parser.add_argument('--users', type=int, default=1000)
+    parser.add_argument('--days', type=int, default=7)
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--population', type=int, default=1_000_000,
+                        help='users for the energy target benchmark')
+    parser.add_argument('--output', help='also write the JSON report to this file (e.g. a new baseline)')
+    parser.add_argument('--compare', metavar='BASELINE', help='report saved by an earlier --output run')
+    parser.add_argument('--tolerance', type=float, default=0.15,
+                        help='allowed fractional slowdown or growth before flagging a regression')
+    args = parser.parse_args()
+
+    report = {'environment': _environment(), 'seed': args.seed}
+    if 'operations' in args.only:
+        sizes = [int(size) for size in args.sizes.split(',') if size]
+        report['operations'] = bench_operations(sizes, args.seed, args.min_time)
+    if 'meal_solvers' in args.only:
+        report['meal_solvers'] = bench_meal_solvers(args.users, args.days, args.seed)
+    if 'energy_targets' in args.only:
+        report['energy_targets'] = bench_energy_targets(args.population, args.seed)
+
+    regressions: Optional[List[str]] = None
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = json.load(f)
+        report['comparison'] = compare(report.get('operations', {}), baseline.get('operations', {}), args.tolerance)
+        regressions = [f"{name}: {', '.join(entry['regressions'])}"
+                       for name, entry in report['comparison'].items() if entry['regressions']]
+
+    output = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, 'w') as f:
+            f.write(output + '\n')
+    print(output)
+    if regressions:
+        print(f"{len(regressions)} regression(s) against {args.compare}:", file=sys.stderr)
+        for line in regressions:
+            print(f"  {line}", file=sys.stderr)
+        sys.exit(1)
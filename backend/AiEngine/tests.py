@@ -0,0 +1,447 @@
+import contextlib
+import itertools
+import json
+import os
+import random
+import tempfile
+import threading
+import unittest
+from unittest import mock
+
+import numpy as np
+
+from AiEngine.FitnessAI import (
+    FitnessAI, ExerciseDatabase, FoodDatabase, InMemoryProfileStore, PlanCompactor, ProfileStore, UserProfile,
+    WorkoutPlanner, _AllergenMatcher, _StringColumn, SQLiteProfileStore, ProfileVersionConflict,
+    calculate_energy_targets, compact_plan, compile_catalog, create_fitness_api, dumps_json, ingest_catalog
+)
+
+PROFILE = {'age': 30, 'gender': 'female', 'height': 168, 'weight': 64, 'goal': 'weight_loss'}
+
+
+class SharedProfileStoreTests(unittest.TestCase):
+    def setUp(self):
+        workdir = tempfile.TemporaryDirectory()
+        self.addCleanup(workdir.cleanup)
+        path = os.path.join(workdir.name, 'profiles.db')
+        # Two workers sharing one profile database
+        self.first = FitnessAI(profile_store=SQLiteProfileStore(path))
+        self.second = FitnessAI(profile_store=SQLiteProfileStore(path))
+
+    def test_workers_never_reuse_ids(self):
+        first = self.first.create_user_profile(PROFILE)
+        second = self.second.create_user_profile(PROFILE)
+        self.assertNotEqual(first.user_id, second.user_id)
+        self.assertEqual(self.second.get_user_profile(first.user_id).weight, 64)
+
+        with self.assertRaises(ProfileVersionConflict):
+            self.second.create_user_profile({**PROFILE, 'user_id': first.user_id, 'weight': 90})
+        self.assertEqual(self.first.get_user_profile(first.user_id).weight, 64)
+
+    def test_create_after_delete(self):
+        deleted = self.first.create_user_profile(PROFILE)
+        kept = self.first.create_user_profile({**PROFILE, 'weight': 70})
+        self.first.profile_store.delete(deleted.user_id)
+
+        created = self.second.create_user_profile({**PROFILE, 'weight': 80})
+        self.assertNotIn(created.user_id, {deleted.user_id, kept.user_id})
+        self.assertEqual(self.first.get_user_profile(kept.user_id).weight, 70)
+
+    def test_update_retries_after_a_concurrent_write(self):
+        user_id = self.first.create_user_profile(PROFILE).user_id
+        store = self.second.profile_store
+        put = store.put
+
+        def put_after_other_worker(*args, **kwargs):
+            if put_mock.call_count == 1:
+                self.first.update_user_profile(user_id, {'age': 41})
+            return put(*args, **kwargs)
+
+        with mock.patch.object(store, 'put', side_effect=put_after_other_worker) as put_mock:
+            profile = self.second.update_user_profile(user_id, {'weight': 60})
+        self.assertEqual(put_mock.call_count, 2)
+        self.assertEqual((profile.age, profile.weight), (41, 60))
+        self.assertEqual(self.first.get_user_profile(user_id).weight, 60)
+
+        with mock.patch.object(store, 'put', side_effect=ProfileVersionConflict('busy')):
+            with self.assertRaises(ProfileVersionConflict):
+                self.second.update_user_profile(user_id, {'weight': 55})
+        self.assertEqual(self.first.get_user_profile(user_id).weight, 60)
+
+
+class CompiledCatalogTests(unittest.TestCase):
+    def setUp(self):
+        workdir = tempfile.TemporaryDirectory()
+        self.addCleanup(workdir.cleanup)
+        self.workdir = workdir.name
+
+    def write_csv(self, frame, name):
+        path = os.path.join(self.workdir, name)
+        frame.to_csv(path, index=False)
+        return path
+
+    def test_food_catalog(self):
+        foods = FoodDatabase().foods.copy()
+        foods['tags'] = foods['tags'].map(';'.join)
+        foods['ingredients'] = [f'{name.lower()}, salt' for name in foods['name']]
+        source = self.write_csv(foods, 'foods.csv')
+
+        parsed = FoodDatabase(source).catalog
+        loaded = FoodDatabase(compile_catalog(source, os.path.join(self.workdir, 'foods'), 'food')).catalog
+        self.assertEqual(loaded.names.tolist(), parsed.names.tolist())
+        self.assertEqual(loaded.serving_sizes.tolist(), parsed.serving_sizes.tolist())
+        self.assertEqual(loaded.ingredients.tolist(), parsed.ingredients.tolist())
+        self.assertEqual(loaded.categories, parsed.categories)
+        self.assertEqual(loaded.category_codes.tolist(), parsed.category_codes.tolist())
+        self.assertEqual(loaded.tags, parsed.tags)
+        self.assertEqual(loaded.tag_bits.tolist(), parsed.tag_bits.tolist())
+        self.assertEqual(loaded.nutrients.tolist(), parsed.nutrients.tolist())
+        self.assertEqual(loaded.fingerprint(), parsed.fingerprint())
+        for tag in parsed.tags:
+            self.assertEqual(loaded.tag_mask(tag).tolist(), parsed.tag_mask(tag).tolist())
+        self.assertEqual(loaded.allergen_mask(['salmon']).tolist(), parsed.allergen_mask(['salmon']).tolist())
+
+    def test_exercise_catalog(self):
+        exercises = ExerciseDatabase().exercises.copy()
+        exercises['equipment'] = exercises['equipment'].map(';'.join)
+        source = self.write_csv(exercises, 'exercises.csv')
+
+        parsed = ExerciseDatabase(source).catalog
+        loaded = ExerciseDatabase(compile_catalog(source, os.path.join(self.workdir, 'exercises'), 'exercise')).catalog
+        self.assertEqual(loaded.names.tolist(), parsed.names.tolist())
+        self.assertEqual(loaded.descriptions.tolist(), parsed.descriptions.tolist())
+        self.assertEqual(loaded.instructions.tolist(), parsed.instructions.tolist())
+        for field, (codes, vocabulary) in parsed.labels.items():
+            self.assertEqual(loaded.labels[field][1], vocabulary)
+            self.assertEqual(loaded.labels[field][0].tolist(), codes.tolist())
+        self.assertEqual(loaded.equipment, parsed.equipment)
+        self.assertEqual(loaded.equipment_bits.tolist(), parsed.equipment_bits.tolist())
+        self.assertEqual(set(loaded.postings), set(parsed.postings))
+        for field, bitsets in parsed.postings.items():
+            self.assertEqual(loaded.postings[field].tolist(), bitsets.tolist())
+        self.assertEqual(loaded.fingerprint(), parsed.fingerprint())
+        self.assertEqual(loaded.select(equipment=['bodyweight'], difficulties=['beginner']).tolist(),
+                         parsed.select(equipment=['bodyweight'], difficulties=['beginner']).tolist())
+
+
+class ProfileStoreTests(unittest.TestCase):
+    def test_incomplete_store_fails_at_instantiation(self):
+        class NoDeleteStore(ProfileStore):
+            get = InMemoryProfileStore.get
+            version = InMemoryProfileStore.version
+            put = InMemoryProfileStore.put
+            __len__ = InMemoryProfileStore.__len__
+
+        with self.assertRaisesRegex(TypeError, 'delete'):
+            NoDeleteStore()
+
+
+class ExerciseCatalogIngestTests(unittest.TestCase):
+    def test_ingested_and_compiled_catalogs_match(self):
+        workdir = tempfile.TemporaryDirectory()
+        self.addCleanup(workdir.cleanup)
+        records = ExerciseDatabase().exercises.to_dict('records')
+        records.append({'name': 'Bear Crawl', 'category': 'Cardio', 'muscle_group': ' Full  Body',
+                        'difficulty': 'Beginner', 'equipment': 'Bodyweight; ', 'description': '',
+                        'instructions': ''})
+        source = os.path.join(workdir.name, 'exercises.json')
+        with open(source, 'w', encoding='utf-8') as f:
+            json.dump(records, f)
+
+        compiled = ExerciseDatabase(compile_catalog(source, os.path.join(workdir.name, 'compiled'), 'exercise'))
+        ingest_catalog(source, os.path.join(workdir.name, 'ingested'), 'exercise', chunk_size=8)
+        ingested = ExerciseDatabase(os.path.join(workdir.name, 'ingested'))
+
+        self.assertTrue(compiled.exercises.equals(ingested.exercises))
+        full_body = ingested.get_exercises_by_muscle_group('full body')['name'].tolist()
+        self.assertIn('Bear Crawl', full_body)
+        self.assertIn('Burpee', full_body)
+
+
+class ProfileDerivedMetricsTests(unittest.TestCase):
+    METRICS = ['bmi', 'bmr', 'tdee', 'target_calories', 'macros']
+
+    def recomputed(self, profile):
+        """Read every derived metric; returns the ones that had to be computed again"""
+        with contextlib.ExitStack() as stack:
+            spies = {metric: stack.enter_context(mock.patch.object(
+                UserProfile, f'_calculate_{metric}', autospec=True,
+                side_effect=getattr(UserProfile, f'_calculate_{metric}'))) for metric in self.METRICS}
+            for metric in self.METRICS:
+                getattr(profile, metric)
+        return {metric for metric, spy in spies.items() if spy.called}
+
+    def test_only_dependents_are_recomputed(self):
+        profile = UserProfile('u', 30, 'female', 168, 64, 'weight_loss', 'sedentary')
+        self.assertEqual(self.recomputed(profile), set(self.METRICS))
+        self.assertEqual(self.recomputed(profile), set())
+
+        profile.goal = 'muscle_gain'
+        self.assertEqual(self.recomputed(profile), {'target_calories', 'macros'})
+        self.assertEqual(profile.target_calories, round(profile.tdee * 1.1, 2))
+
+        tdee = profile.tdee
+        profile.activity_level = 'very_active'
+        self.assertEqual(self.recomputed(profile), {'tdee', 'target_calories', 'macros'})
+        self.assertGreater(profile.tdee, tdee)
+
+        profile.workout_duration = 90
+        self.assertEqual(self.recomputed(profile), set())
+
+        profile.weight = 70
+        self.assertEqual(self.recomputed(profile), set(self.METRICS))
+        self.assertEqual(profile.bmi, round(70 / 1.68 ** 2, 2))
+
+    def test_replace_keeps_unaffected_metrics(self):
+        profile = UserProfile('u', 30, 'female', 168, 64, 'weight_loss', 'sedentary')
+        self.recomputed(profile)
+        older = profile.replace(age=40)
+        self.assertEqual(self.recomputed(older), {'bmr', 'tdee', 'target_calories', 'macros'})
+        self.assertEqual(older.bmr, profile.bmr - 50)
+        # The original keeps its own metrics
+        self.assertEqual(self.recomputed(profile), set())
+        self.assertEqual(profile.age, 30)
+
+    def test_update_reaches_cached_profiles(self):
+        engine = FitnessAI()
+        engine.create_user_profile({**PROFILE, 'user_id': 'u'})
+        calories = engine.get_user_profile('u').target_calories
+        engine.update_user_profile('u', {'goal': 'maintenance'})
+        profile = engine.get_user_profile('u')
+        self.assertEqual(profile.target_calories, profile.tdee)
+        self.assertGreater(profile.target_calories, calories)
+
+
+class EnergyTargetsTests(unittest.TestCase):
+    def test_matches_user_profile(self):
+        rng = random.Random(16)
+        genders = ['male', 'female', 'Male']
+        activity_levels = list(UserProfile.ACTIVITY_MULTIPLIERS) + ['unknown']
+        goals = list(UserProfile.MACRO_SPLITS)
+        profiles = []
+        for gender, activity_level, goal in itertools.product(genders, activity_levels, goals):
+            for _ in range(20):
+                profiles.append(UserProfile('u', rng.randint(16, 80), gender, round(rng.uniform(140, 210), 1),
+                                            round(rng.uniform(40, 150), 2), goal, activity_level))
+            # Half-cm heights and half-kg weights put bmr exactly on a .xx5 tie
+            profiles.append(UserProfile('u', 30, gender, 170.5, 60.5, goal, activity_level))
+        self.assertEqual(profiles[-1].bmr, 1525.62)
+
+        columns = ['age', 'gender', 'height', 'weight', 'goal', 'activity_level']
+        targets = calculate_energy_targets({column: [getattr(p, column) for p in profiles] for column in columns})
+        for i, profile in enumerate(profiles):
+            expected = {'bmi': profile.bmi, 'bmr': profile.bmr, 'tdee': profile.tdee,
+                        'target_calories': profile.target_calories, **profile.macros}
+            self.assertEqual({name: float(values[i]) for name, values in targets.items()}, expected,
+                             msg=profile.to_dict())
+
+
+class SeededPlanTests(unittest.TestCase):
+    def setUp(self):
+        # Separate engines, so equal plans come from the seed and not from the plan cache
+        self.engines = [FitnessAI(), FitnessAI()]
+        for engine in self.engines:
+            engine.create_user_profile({**PROFILE, 'user_id': 'u', 'preferred_workout_days': 4})
+
+    def plans(self, engine, seed):
+        plan = engine.generate_complete_fitness_plan('u', meal_days=3, seed=seed)
+        return plan['meal_plan'], plan['workout_plan']
+
+    def test_same_seed_same_plans(self):
+        first, second = self.engines
+        self.assertEqual(self.plans(first, 4), self.plans(second, 4))
+        self.assertEqual(first.generate_meal_plan('u', days=3, seed=4),
+                         second.generate_meal_plan('u', days=3, seed=4))
+        self.assertEqual(first.generate_workout_plan('u', seed=4), second.generate_workout_plan('u', seed=4))
+
+    def test_different_seeds_differ(self):
+        first, second = self.engines
+        meal_plan, workout_plan = self.plans(first, 4)
+        other_meal_plan, other_workout_plan = self.plans(second, 5)
+        self.assertNotEqual(meal_plan, other_meal_plan)
+        self.assertNotEqual(workout_plan, other_workout_plan)
+
+
+class PlanCacheTests(unittest.TestCase):
+    def setUp(self):
+        self.engine = FitnessAI(plan_cache_ttl=60)
+        for user_id in ['u', 'other']:
+            self.engine.create_user_profile({**PROFILE, 'user_id': user_id})
+
+    def test_hits(self):
+        plan = self.engine.generate_meal_plan('u', days=2, seed=1)
+        self.assertIs(self.engine.generate_meal_plan('u', days=2, seed=1), plan)
+        self.assertIsNot(self.engine.generate_meal_plan('u', days=3, seed=1), plan)
+        self.assertEqual(self.engine.plan_cache_info()['hits'], 1)
+        self.assertEqual(self.engine.plan_cache_info()['misses'], 2)
+
+    def test_seeded_and_unseeded_keys(self):
+        # Unseeded plans are cached on purpose: a repeat request gets the same plan
+        unseeded = self.engine.generate_workout_plan('u')
+        self.assertIs(self.engine.generate_workout_plan('u'), unseeded)
+        seeded = self.engine.generate_workout_plan('u', seed=1)
+        self.assertIsNot(seeded, unseeded)
+        self.assertIs(self.engine.generate_workout_plan('u', seed=np.int64(1)), seeded)
+
+        # A Generator's state isn't part of the key, so those plans are never cached
+        profile = self.engine.get_user_profile('u')
+        self.assertIsNone(self.engine._plan_cache_key('workout', profile, np.random.default_rng(1), None))
+        self.engine.generate_workout_plan('u', seed=np.random.default_rng(1))
+        self.assertEqual(self.engine.plan_cache_info()['size'], 2)
+
+    def test_ttl_expiry(self):
+        with mock.patch('AiEngine.FitnessAI.time.monotonic', return_value=1000.0) as monotonic:
+            plan = self.engine.generate_meal_plan('u', days=2, seed=1)
+            monotonic.return_value = 1059.0
+            self.assertIs(self.engine.generate_meal_plan('u', days=2, seed=1), plan)
+            monotonic.return_value = 1060.0
+            self.assertIsNot(self.engine.generate_meal_plan('u', days=2, seed=1), plan)
+
+    def test_update_invalidates_only_that_user(self):
+        plan = self.engine.generate_meal_plan('u', days=2, seed=1)
+        other_plan = self.engine.generate_meal_plan('other', days=2, seed=1)
+        self.engine.update_user_profile('u', {'weight': 80})
+
+        updated = self.engine.generate_meal_plan('u', days=2, seed=1)
+        self.assertIsNot(updated, plan)
+        self.assertGreater(updated['weekly_nutrition_avg']['calories'], plan['weekly_nutrition_avg']['calories'])
+        self.assertIs(self.engine.generate_meal_plan('other', days=2, seed=1), other_plan)
+
+
+def expand(value, catalog):
+    """Inverse of PlanCompactor.compact, given its lookup table"""
+    if isinstance(value, list):
+        return [expand(item, catalog) for item in value]
+    if not isinstance(value, dict):
+        return value
+    kinds = {id_field: kind for kind, (_, id_field, _) in PlanCompactor.CATALOG_FIELDS.items()}
+    expanded = {}
+    for k, v in value.items():
+        if k in kinds:
+            expanded.update(catalog[kinds[k]][str(v)])
+        else:
+            expanded[k] = expand(v, catalog)
+    return expanded
+
+
+class PlanCompactorTests(unittest.TestCase):
+    def setUp(self):
+        engine = FitnessAI()
+        engine.create_user_profile({**PROFILE, 'user_id': 'u'})
+        self.plan = engine.generate_complete_fitness_plan('u', meal_days=3, seed=17)
+        self.full = dumps_json(self.plan)
+
+    def test_round_trip(self):
+        compacted, catalog = compact_plan(self.plan)
+        self.assertEqual(set(catalog), {'exercises', 'foods'})
+        compact = dumps_json({'plan': compacted, 'catalog': catalog})
+
+        received = json.loads(compact)
+        self.assertEqual(expand(received['plan'], received['catalog']), json.loads(self.full))
+        self.assertLess(len(compact), len(self.full))
+        # The input plan is left as it was
+        self.assertEqual(dumps_json(self.plan), self.full)
+
+    def test_stream_sends_each_entry_once(self):
+        compactor = PlanCompactor()
+        catalog = {kind: {} for kind in PlanCompactor.CATALOG_FIELDS}
+        days = []
+        for day in self.plan['meal_plan']['days']:
+            days.append(json.loads(dumps_json(compactor.compact(day))))
+            for kind, entries in json.loads(dumps_json(compactor.take_catalog())).items():
+                self.assertFalse(set(entries) & set(catalog[kind]))
+                catalog[kind].update(entries)
+        self.assertEqual(expand(days, catalog), json.loads(self.full)['meal_plan']['days'])
+
+
+class PlanStreamTests(unittest.TestCase):
+    def setUp(self):
+        self.client = create_fitness_api().test_client()
+        self.client.post('/api/user', json={**PROFILE, 'user_id': 'u'})
+
+    def stream(self, url):
+        response = self.client.get(url)
+        self.assertEqual(response.mimetype, 'application/x-ndjson')
+        body = response.get_data(as_text=True)
+        self.assertTrue(body.endswith('\n'))
+        # json.loads rejects anything but exactly one document per line
+        return [json.loads(line) for line in body.splitlines()]
+
+    def test_stream_matches_the_plan(self):
+        url = '/api/fitness-plan/u?meal_days=3&seed=14'
+        # Streamed first, so it's generated live rather than replayed from the plan cache
+        records = self.stream(url + '&stream=1')
+        plan = self.client.get(url).get_json()['fitness_plan']
+
+        self.assertEqual([record.pop('type') for record in records],
+                         ['header'] + ['meal_day'] * 3 + ['workout'] * 3 + ['summary'])
+        header, summary = records[0], records[-1]
+        self.assertEqual(header['user_profile'], plan['user_profile'])
+        self.assertEqual((header['days_per_week'], header['rest_days']),
+                         (plan['workout_plan']['days_per_week'], plan['workout_plan']['rest_days']))
+        self.assertEqual(records[1:4], plan['meal_plan']['days'])
+        self.assertEqual(records[4:7], plan['workout_plan']['workouts'])
+        self.assertEqual(summary, {'weekly_nutrition_avg': plan['meal_plan']['weekly_nutrition_avg'], 'workouts': 3})
+
+        # Now cached, the stream is replayed with the same content
+        replayed = self.stream(url + '&stream=1')
+        for record in replayed:
+            del record['type']
+        self.assertEqual(replayed, records)
+
+
+class WorkoutSessionTests(unittest.TestCase):
+    def test_long_session_with_a_tiny_pool(self):
+        workdir = tempfile.TemporaryDirectory()
+        self.addCleanup(workdir.cleanup)
+        source = os.path.join(workdir.name, 'exercises.json')
+        with open(source, 'w', encoding='utf-8') as f:
+            json.dump([
+                {'name': name, 'category': category, 'muscle_group': muscle_group, 'difficulty': 'Beginner',
+                 'equipment': 'Bodyweight', 'description': '', 'instructions': ''}
+                for name, category, muscle_group in [('Push-up', 'Strength', 'Chest'),
+                                                     ('Bodyweight Squat', 'Strength', 'Legs'),
+                                                     ('Hamstring Stretch', 'Flexibility', 'Legs')]
+            ], f)
+        profile = UserProfile('u', 30, 'female', 168, 64, 'maintenance', 'sedentary', fitness_experience='beginner')
+
+        # 600 minutes asks for 118 main exercises; two can only stretch to the set cap
+        workout = WorkoutPlanner(ExerciseDatabase(source)).generate_workout_session(profile, duration_minutes=600, rng=6)
+        cap = WorkoutPlanner.MAX_SETS_PER_EXERCISE
+        self.assertEqual([exercise['sets'] for exercise in workout['main_exercises']], [cap, cap])
+        self.assertEqual(workout['duration_minutes'], 10 + 5 * (2 + 2 * (cap - 2)))
+
+
+class AllergenMatcherTests(unittest.TestCase):
+    def test_names_that_grow_when_lowercased(self):
+        # 'İ' lowercases to two code points, which used to shift every later row offset
+        names = _StringColumn.from_strings(['İzmir Köfte İİİİİİİİ', 'Peanut Bar', 'Rice', 'Oats'])
+        ingredients = _StringColumn.from_strings(['beef', 'peanuts, oats', 'rice', 'oats'])
+        matcher = _AllergenMatcher(names, ingredients)
+
+        self.assertEqual(matcher.allergen_mask('peanut').tolist(), [False, True, False, False])
+        self.assertEqual(matcher.allergen_mask('İzmir').tolist(), [True, False, False, False])
+        self.assertEqual(matcher.exclusion_mask(['oats', 'beef']).tolist(), [True, True, False, True])
+
+
+class PlansBatchTests(unittest.TestCase):
+    def setUp(self):
+        self.engine = FitnessAI()
+        self.user_ids = [self.engine.create_user_profile({**PROFILE, 'user_id': f'u{i}'}).user_id for i in range(3)]
+
+    def test_bad_chunk_size_fails_at_the_call(self):
+        with self.assertRaises(ValueError):
+            self.engine.generate_plans_batch(self.user_ids, chunk_size=0)
+
+    def test_pool_from_a_threaded_process(self):
+        expected = sorted(self.engine.generate_plans_batch(self.user_ids, meal_days=1, seed=5, max_workers=1))
+
+        # A live thread makes the pool start clean workers instead of forking this process
+        stop = threading.Event()
+        thread = threading.Thread(target=stop.wait)
+        thread.start()
+        self.addCleanup(thread.join)
+        self.addCleanup(stop.set)
+        results = sorted(self.engine.generate_plans_batch(self.user_ids, meal_days=1, seed=5, max_workers=2,
+                                                          chunk_size=2))
+        self.assertEqual(results, expected)
@@ -0,0 +1,13 @@
+"""
+WSGI entry point for the FitnessAI API
+
+    gunicorn --preload -w 4 AiEngine.wsgi:app
+
+With --preload the catalogs are built once in the master process and
+shared copy-on-write by every forked worker.
+"""
+
+from AiEngine import create_fitness_api, preload
+
+preload()
+app = create_fitness_api()
@@ -29,6 +29,7 @@ INSTALLED_APPS = [
     
     # Local apps
     'users',
+    'dashboard',
 ]
 
 MIDDLEWARE = [
@@ -70,6 +71,14 @@ DATABASES = {
     }
 }
 
+# Cache (holds the per-user dashboard overview). locmem is per process; with
+# several workers use a shared backend such as django.core.cache.backends.redis.RedisCache
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+    }
+}
+
 # Password validation
 AUTH_PASSWORD_VALIDATORS = [
     {
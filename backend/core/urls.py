@@ -6,6 +6,7 @@ from django.conf.urls.static import static
 urlpatterns = [
     path('admin/', admin.site.urls),
     path('api/', include('users.urls')),
+    path('api/dashboard/', include('dashboard.urls')),
 ]
 
 # Serve media files in development
@@ -1,7 +1,7 @@
 from django.contrib import admin
 from .models import (
     UserProfile, ProgressEntry, WorkoutTemplate, Exercise, 
-    WorkoutExercise, UserWorkout, MealPlan, Achievement, UserStreak
+    WorkoutExercise, UserWorkout, MealPlan, DailyNutritionSummary, Achievement, UserStreak
 )
 
 @admin.register(UserProfile)
@@ -48,6 +48,13 @@ class MealPlanAdmin(admin.ModelAdmin):
     search_fields = ['user__username', 'meal_name']
     ordering = ['-date', 'scheduled_time']
 
+@admin.register(DailyNutritionSummary)
+class DailyNutritionSummaryAdmin(admin.ModelAdmin):
+    list_display = ['user', 'date', 'planned_calories', 'consumed_calories', 'meal_count', 'consumed_meal_count']
+    list_filter = ['date']
+    search_fields = ['user__username']
+    ordering = ['-date']
+
 @admin.register(Achievement)
 class AchievementAdmin(admin.ModelAdmin):
     list_display = ['user', 'title', 'category', 'earned_date', 'is_new']
@@ -0,0 +1,123 @@
+"""
+Per-user cache of the dashboard overview
+
+Entries live in Django's default cache, so any configured backend works
+(locmem, file, Redis...). Every user has a version token that writes to their
+dashboard data replace, orphaning the cached entry. Today's workout embeds
+shared template and exercise rows, so entries also carry a workouts token
+that any template/exercise write replaces (dropping every user's entry;
+those tables only change through admin edits). Entries are keyed by date and
+expire at midnight, so day-relative fields roll over with the date.
+"""
+import math
+import uuid
+from datetime import datetime, time, timedelta
+
+from django.core.cache import cache
+from django.db import transaction
+
+KEY_PREFIX = 'dashboard:overview'
+WORKOUTS_VERSION_KEY = f'{KEY_PREFIX}:version:workouts'
+STATS_KEYS = {
+    'hits': f'{KEY_PREFIX}:hits',
+    'misses': f'{KEY_PREFIX}:misses'
+}
+
+
+def _version_key(user_id):
+    return f'{KEY_PREFIX}:version:{user_id}'
+
+
+def _versions(user_id):
+    """Current version tokens of the user's overview and the workout catalog, created on first use"""
+    keys = [_version_key(user_id), WORKOUTS_VERSION_KEY]
+    tokens = cache.get_many(keys)
+    missing = [key for key in keys if key not in tokens]
+    if missing:
+        # add() so concurrent first requests agree on one token
+        for key in missing:
+            cache.add(key, uuid.uuid4().hex, None)
+        tokens = cache.get_many(keys)
+    return '.'.join(str(tokens.get(key)) for key in keys)
+
+
+def _seconds_until_midnight(now):
+    midnight = datetime.combine(now.date() + timedelta(days=1), time.min)
+    return math.ceil((midnight - now).total_seconds())
+
+
+def _count(event):
+    key = STATS_KEYS[event]
+    try:
+        cache.incr(key)
+    except ValueError:
+        if not cache.add(key, 1, None):
+            cache.incr(key)
+
+
+def get_overview(user, build):
+    """
+    The user's overview payload, from the cache or from build(today) on a miss
+
+    Args:
+        user: User whose overview is requested
+        build: Callable taking the current date and returning the payload
+
+    Returns:
+        Overview payload dict
+    """
+    now = datetime.now()
+    today = now.date()
+    key = f'{KEY_PREFIX}:{user.pk}:{today.isoformat()}'
+    version = _versions(user.pk)
+
+    data = cache.get(key, version=version)
+    if data is not None:
+        _count('hits')
+        return data
+
+    _count('misses')
+    data = build(today)
+    cache.set(key, data, _seconds_until_midnight(now), version=version)
+    return data
+
+
+def invalidate_overview(*user_ids):
+    """
+    Drop the cached overview of each user once the current transaction commits
+
+    Waiting for the commit keeps a concurrent request from caching data that
+    is about to change under the new version.
+    """
+    user_ids = {user_id for user_id in user_ids if user_id is not None}
+    if user_ids:
+        transaction.on_commit(
+            lambda: cache.set_many({_version_key(user_id): uuid.uuid4().hex for user_id in user_ids}, None)
+        )
+
+
+def invalidate_workout_overviews():
+    """Drop every cached overview (they embed template and exercise rows) once the transaction commits"""
+    transaction.on_commit(lambda: cache.set(WORKOUTS_VERSION_KEY, uuid.uuid4().hex, None))
+
+
+def overview_cache_stats():
+    """
+    Hits and misses of the overview cache since the counters were last reset
+
+    Returns:
+        Dict with hits, misses and hit_rate (0 when nothing was served yet)
+    """
+    counts = cache.get_many(list(STATS_KEYS.values()))
+    hits = counts.get(STATS_KEYS['hits'], 0)
+    misses = counts.get(STATS_KEYS['misses'], 0)
+    total = hits + misses
+    return {
+        'hits': hits,
+        'misses': misses,
+        'hit_rate': hits / total if total else 0.0
+    }
+
+
+def reset_overview_cache_stats():
+    cache.delete_many(list(STATS_KEYS.values()))
@@ -0,0 +1,36 @@
+from datetime import datetime
+
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+
+from dashboard.services import save_meal_plan
+
+
+class Command(BaseCommand):
+    help = 'Generate meal plans with the AI engine and store them as MealPlan rows'
+
+    def add_arguments(self, parser):
+        parser.add_argument('usernames', nargs='*', help='Users to plan for (default: every active user)')
+        parser.add_argument('--start', help='First planned date, YYYY-MM-DD (default: today)')
+        parser.add_argument('--days', type=int, default=7)
+        parser.add_argument('--seed', type=int, default=None)
+        parser.add_argument('--keep-existing', action='store_true',
+                            help='Leave dates that already have meals untouched instead of replacing them')
+
+    def handle(self, *args, **options):
+        try:
+            start_date = datetime.strptime(options['start'], '%Y-%m-%d').date() if options['start'] else None
+        except ValueError:
+            raise CommandError(f"Invalid --start date: {options['start']}")
+
+        users = User.objects.filter(is_active=True)
+        if options['usernames']:
+            users = users.filter(username__in=options['usernames'])
+            missing = set(options['usernames']) - set(users.values_list('username', flat=True))
+            if missing:
+                raise CommandError(f"Unknown users: {', '.join(sorted(missing))}")
+
+        for user in users.iterator():
+            meals = save_meal_plan(user, start_date=start_date, days=options['days'], seed=options['seed'],
+                                   replace=not options['keep_existing'])
+            self.stdout.write(f'{user.username}: {len(meals)} meals')
@@ -0,0 +1,22 @@
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+
+from dashboard.models import DailyNutritionSummary
+
+
+class Command(BaseCommand):
+    help = 'Rebuild the daily nutrition summaries from the MealPlan rows'
+
+    def add_arguments(self, parser):
+        parser.add_argument('usernames', nargs='*', help='Users to rebuild (default: everyone)')
+
+    def handle(self, *args, **options):
+        users = None
+        if options['usernames']:
+            users = User.objects.filter(username__in=options['usernames'])
+            missing = set(options['usernames']) - set(users.values_list('username', flat=True))
+            if missing:
+                raise CommandError(f"Unknown users: {', '.join(sorted(missing))}")
+
+        written = DailyNutritionSummary.objects.rebuild(users=users)
+        self.stdout.write(f'{written} daily summaries rebuilt')
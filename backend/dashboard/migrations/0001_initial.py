@@ -0,0 +1,154 @@
+# Generated by Django 4.2.10 on 2026-10-18 04:33
+
+from django.conf import settings
+import django.core.validators
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    initial = True
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Exercise',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(max_length=100)),
+                ('muscle_group', models.CharField(max_length=50)),
+                ('equipment_needed', models.CharField(blank=True, max_length=100)),
+                ('instructions', models.TextField()),
+                ('difficulty_level', models.CharField(choices=[('beginner', 'Beginner'), ('intermediate', 'Intermediate'), ('advanced', 'Advanced')], max_length=20)),
+            ],
+        ),
+        migrations.CreateModel(
+            name='WorkoutTemplate',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(max_length=100)),
+                ('description', models.TextField(blank=True)),
+                ('muscle_groups', models.CharField(help_text='Comma-separated muscle groups', max_length=200)),
+                ('difficulty_level', models.CharField(choices=[('beginner', 'Beginner'), ('intermediate', 'Intermediate'), ('advanced', 'Advanced')], max_length=20)),
+                ('estimated_duration', models.IntegerField(help_text='Duration in minutes')),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+            ],
+        ),
+        migrations.CreateModel(
+            name='WorkoutExercise',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('sets', models.IntegerField()),
+                ('reps_min', models.IntegerField()),
+                ('reps_max', models.IntegerField()),
+                ('weight_suggestion', models.FloatField(blank=True, help_text='Suggested weight in kgs', null=True)),
+                ('rest_time', models.IntegerField(help_text='Rest time in seconds')),
+                ('order', models.IntegerField(default=0)),
+                ('exercise', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='dashboard.exercise')),
+                ('workout', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='exercises', to='dashboard.workouttemplate')),
+            ],
+            options={
+                'ordering': ['order'],
+            },
+        ),
+        migrations.CreateModel(
+            name='UserStreak',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('current_streak', models.IntegerField(default=0)),
+                ('longest_streak', models.IntegerField(default=0)),
+                ('last_workout_date', models.DateField(blank=True, null=True)),
+                ('user', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, related_name='streak', to=settings.AUTH_USER_MODEL)),
+            ],
+        ),
+        migrations.CreateModel(
+            name='UserProfile',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('current_weight', models.FloatField(help_text='Weight in kgs')),
+                ('target_weight', models.FloatField(help_text='Target weight in kgs')),
+                ('height', models.FloatField(help_text='Height in cm')),
+                ('age', models.IntegerField()),
+                ('gender', models.CharField(choices=[('male', 'Male'), ('female', 'Female')], max_length=10)),
+                ('fitness_level', models.CharField(choices=[('beginner', 'Beginner'), ('intermediate', 'Intermediate'), ('advanced', 'Advanced')], max_length=20)),
+                ('goal', models.CharField(choices=[('weight_loss', 'Weight Loss'), ('muscle_gain', 'Muscle Gain'), ('maintenance', 'Maintenance')], max_length=20)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('user', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, related_name='fitness_profile', to=settings.AUTH_USER_MODEL)),
+            ],
+        ),
+        migrations.CreateModel(
+            name='MealPlan',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('date', models.DateField()),
+                ('meal_type', models.CharField(choices=[('breakfast', 'Breakfast'), ('lunch', 'Lunch'), ('dinner', 'Dinner'), ('snack', 'Snack')], max_length=20)),
+                ('meal_name', models.CharField(max_length=100)),
+                ('foods', models.JSONField(help_text='List of foods in the meal')),
+                ('calories', models.IntegerField()),
+                ('protein', models.FloatField(help_text='Protein in grams')),
+                ('carbs', models.FloatField(help_text='Carbohydrates in grams')),
+                ('fat', models.FloatField(help_text='Fat in grams')),
+                ('scheduled_time', models.TimeField()),
+                ('is_consumed', models.BooleanField(default=False)),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='meal_plans', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'ordering': ['date', 'scheduled_time'],
+            },
+        ),
+        migrations.CreateModel(
+            name='Achievement',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('title', models.CharField(max_length=100)),
+                ('description', models.TextField()),
+                ('icon', models.CharField(default='🏆', max_length=50)),
+                ('category', models.CharField(choices=[('workout', 'Workout'), ('nutrition', 'Nutrition'), ('progress', 'Progress'), ('consistency', 'Consistency')], max_length=20)),
+                ('earned_date', models.DateTimeField(auto_now_add=True)),
+                ('is_new', models.BooleanField(default=True)),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='achievements', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'ordering': ['-earned_date'],
+            },
+        ),
+        migrations.CreateModel(
+            name='UserWorkout',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('scheduled_date', models.DateField()),
+                ('completed_date', models.DateTimeField(blank=True, null=True)),
+                ('duration_minutes', models.IntegerField(blank=True, null=True)),
+                ('notes', models.TextField(blank=True)),
+                ('is_completed', models.BooleanField(default=False)),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='workouts', to=settings.AUTH_USER_MODEL)),
+                ('workout_template', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='dashboard.workouttemplate')),
+            ],
+            options={
+                'unique_together': {('user', 'scheduled_date')},
+            },
+        ),
+        migrations.CreateModel(
+            name='ProgressEntry',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('date', models.DateField()),
+                ('weight', models.FloatField(help_text='Weight in kgs')),
+                ('strength_score', models.IntegerField(help_text='Strength score from 0-100', validators=[django.core.validators.MinValueValidator(0), django.core.validators.MaxValueValidator(100)])),
+                ('body_fat_percentage', models.FloatField(blank=True, null=True)),
+                ('muscle_mass', models.FloatField(blank=True, null=True)),
+                ('notes', models.TextField(blank=True)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='progress_entries', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'ordering': ['-date'],
+                'unique_together': {('user', 'date')},
+            },
+        ),
+    ]
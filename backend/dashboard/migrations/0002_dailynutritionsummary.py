@@ -0,0 +1,57 @@
+# Generated by Django 4.2.10 on 2026-10-18 04:37
+
+from django.conf import settings
+from django.db import migrations, models
+from django.db.models import Count, Q, Sum
+import django.db.models.deletion
+
+
+def populate_summaries(apps, schema_editor):
+    MealPlan = apps.get_model('dashboard', 'MealPlan')
+    DailyNutritionSummary = apps.get_model('dashboard', 'DailyNutritionSummary')
+    consumed = Q(is_consumed=True)
+    totals = MealPlan.objects.values('user_id', 'date').annotate(
+        planned_calories=Sum('calories'), planned_protein=Sum('protein'),
+        planned_carbs=Sum('carbs'), planned_fat=Sum('fat'),
+        consumed_calories=Sum('calories', filter=consumed), consumed_protein=Sum('protein', filter=consumed),
+        consumed_carbs=Sum('carbs', filter=consumed), consumed_fat=Sum('fat', filter=consumed),
+        meal_count=Count('id'), consumed_meal_count=Count('id', filter=consumed),
+    ).order_by()
+    DailyNutritionSummary.objects.bulk_create(
+        (DailyNutritionSummary(**{field: value or 0 for field, value in row.items()}) for row in totals.iterator()),
+        batch_size=1000,
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('dashboard', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='DailyNutritionSummary',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('date', models.DateField()),
+                ('planned_calories', models.IntegerField(default=0)),
+                ('planned_protein', models.FloatField(default=0, help_text='Protein in grams')),
+                ('planned_carbs', models.FloatField(default=0, help_text='Carbohydrates in grams')),
+                ('planned_fat', models.FloatField(default=0, help_text='Fat in grams')),
+                ('consumed_calories', models.IntegerField(default=0)),
+                ('consumed_protein', models.FloatField(default=0, help_text='Protein in grams')),
+                ('consumed_carbs', models.FloatField(default=0, help_text='Carbohydrates in grams')),
+                ('consumed_fat', models.FloatField(default=0, help_text='Fat in grams')),
+                ('meal_count', models.IntegerField(default=0)),
+                ('consumed_meal_count', models.IntegerField(default=0)),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='nutrition_summaries', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'ordering': ['date'],
+                'unique_together': {('user', 'date')},
+            },
+        ),
+        migrations.RunPython(populate_summaries, migrations.RunPython.noop),
+    ]
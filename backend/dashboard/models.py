@@ -1,10 +1,18 @@
-from django.db import models
+from functools import reduce
+from operator import or_
+
+from django.db import models, transaction
+from django.db.models import Count, Q, Sum
+from django.db.models.signals import post_save, post_delete
+from django.dispatch import receiver
 from django.contrib.auth.models import User
 from django.core.validators import MinValueValidator, MaxValueValidator
 
+from .cache import invalidate_overview, invalidate_workout_overviews
+
 class UserProfile(models.Model):
     """Extended user profile with fitness data"""
-    user = models.OneToOneField(User, on_delete=models.CASCADE, related_name='profile')
+    user = models.OneToOneField(User, on_delete=models.CASCADE, related_name='fitness_profile')
     current_weight = models.FloatField(help_text="Weight in kgs")
     target_weight = models.FloatField(help_text="Target weight in kgs")
     height = models.FloatField(help_text="Height in cm")
@@ -123,6 +131,56 @@ class UserWorkout(models.Model):
     def __str__(self):
         return f"{self.user.username} - {self.workout_template.name} - {self.scheduled_date}"
 
+def _meal_plans_changed(keys):
+    """Refresh the daily summaries and overview caches behind the given (user_id, date) pairs"""
+    keys = set(keys)
+    DailyNutritionSummary.objects.refresh(keys)
+    invalidate_overview(*{user_id for user_id, _ in keys})
+
+
+class MealPlanQuerySet(models.QuerySet):
+    """MealPlan queries whose bulk writes keep DailyNutritionSummary up to date"""
+
+    def _summary_keys(self):
+        return set(self.order_by().values_list('user_id', 'date').distinct())
+
+    def bulk_create(self, objs, *args, **kwargs):
+        with transaction.atomic(using=self.db, savepoint=False):
+            created = super().bulk_create(objs, *args, **kwargs)
+            _meal_plans_changed(meal.summary_key for meal in created)
+        return created
+
+    def bulk_update(self, objs, fields, *args, **kwargs):
+        objs = list(objs)
+        with transaction.atomic(using=self.db, savepoint=False):
+            keys = self.filter(pk__in=[meal.pk for meal in objs])._summary_keys()
+            updated = super().bulk_update(objs, fields, *args, **kwargs)
+            _meal_plans_changed(keys | {meal.summary_key for meal in objs})
+        return updated
+
+    def update(self, **kwargs):
+        with transaction.atomic(using=self.db, savepoint=False):
+            keys = self._summary_keys()
+            if 'user' in kwargs or 'user_id' in kwargs or 'date' in kwargs:
+                pks = list(self.values_list('pk', flat=True))
+                updated = super().update(**kwargs)
+                keys |= MealPlan.objects.filter(pk__in=pks)._summary_keys()
+            else:
+                updated = super().update(**kwargs)
+            _meal_plans_changed(keys)
+        return updated
+
+    def delete(self):
+        with transaction.atomic(using=self.db, savepoint=False):
+            keys = self._summary_keys()
+            deleted = super().delete()
+            _meal_plans_changed(keys)
+        return deleted
+
+    delete.alters_data = True
+    delete.queryset_only = True
+
+
 class MealPlan(models.Model):
     """User's meal plans"""
     user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='meal_plans')
@@ -145,12 +203,164 @@ class MealPlan(models.Model):
     scheduled_time = models.TimeField()
     is_consumed = models.BooleanField(default=False)
 
+    objects = MealPlanQuerySet.as_manager()
+
+    # Fields that feed DailyNutritionSummary
+    SUMMARY_FIELDS = {'user', 'user_id', 'date', 'calories', 'protein', 'carbs', 'fat', 'is_consumed'}
+
     class Meta:
         ordering = ['date', 'scheduled_time']
 
     def __str__(self):
         return f"{self.user.username} - {self.meal_name} - {self.date}"
 
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        meal = super().from_db(db, field_names, values)
+        # Remember which day the row was loaded under, so moving it refreshes both days
+        if 'user_id' in meal.__dict__ and 'date' in meal.__dict__:
+            meal._loaded_summary_key = meal.summary_key
+        return meal
+
+    @property
+    def summary_key(self):
+        """(user_id, date) of the DailyNutritionSummary this meal counts towards"""
+        return self.user_id, self._meta.get_field('date').to_python(self.date)
+
+    def save(self, *args, **kwargs):
+        update_fields = kwargs.get('update_fields')
+        if update_fields is not None and not self.SUMMARY_FIELDS.intersection(update_fields):
+            super().save(*args, **kwargs)
+            invalidate_overview(self.user_id)
+            return
+
+        with transaction.atomic(using=kwargs.get('using'), savepoint=False):
+            super().save(*args, **kwargs)
+            keys = {self.summary_key, getattr(self, '_loaded_summary_key', self.summary_key)}
+            _meal_plans_changed(keys)
+        self._loaded_summary_key = self.summary_key
+
+    def delete(self, *args, **kwargs):
+        key = self.summary_key
+        with transaction.atomic(using=kwargs.get('using'), savepoint=False):
+            deleted = super().delete(*args, **kwargs)
+            _meal_plans_changed({key})
+        return deleted
+
+
+class DailyNutritionSummaryManager(models.Manager):
+    # Summary field -> aggregate over a day's MealPlan rows
+    AGGREGATES = {
+        'planned_calories': Sum('calories'),
+        'planned_protein': Sum('protein'),
+        'planned_carbs': Sum('carbs'),
+        'planned_fat': Sum('fat'),
+        'consumed_calories': Sum('calories', filter=Q(is_consumed=True)),
+        'consumed_protein': Sum('protein', filter=Q(is_consumed=True)),
+        'consumed_carbs': Sum('carbs', filter=Q(is_consumed=True)),
+        'consumed_fat': Sum('fat', filter=Q(is_consumed=True)),
+        'meal_count': Count('id'),
+        'consumed_meal_count': Count('id', filter=Q(is_consumed=True))
+    }
+
+    def _from_totals(self, totals):
+        """Summary objects from MealPlan rows grouped by user and date"""
+        for row in totals:
+            yield self.model(user_id=row['user_id'], date=row['date'],
+                             **{field: row[field] or 0 for field in self.AGGREGATES})
+
+    @staticmethod
+    def _key_filter(keys):
+        """Q matching exactly the given (user_id, date) pairs (one date__in term per user)"""
+        dates = {}
+        for user_id, day in keys:
+            dates.setdefault(user_id, set()).add(day)
+        return reduce(or_, (Q(user_id=user_id, date__in=days) for user_id, days in dates.items()))
+
+    def refresh(self, keys):
+        """
+        Recompute the summaries of the given (user_id, date) pairs from their MealPlan rows
+
+        Must run inside the transaction that wrote the meals. The summary rows
+        are created if missing and locked before the meals are aggregated, so
+        a concurrent writer to the same day waits for this transaction to
+        commit and then aggregates a total that includes its meals (on SQLite,
+        writers are serialized by the database anyway).
+        """
+        keys = set(keys)
+        if not keys:
+            return
+        self.bulk_create([self.model(user_id=user_id, date=day) for user_id, day in keys], ignore_conflicts=True)
+        # Lock in a fixed order so writers touching several days can't deadlock each other
+        list(self.select_for_update().filter(self._key_filter(keys)).order_by('user_id', 'date').values_list('pk'))
+
+        totals = (
+            MealPlan.objects.filter(self._key_filter(keys))
+            .values('user_id', 'date')
+            .annotate(**self.AGGREGATES)
+            .order_by()
+        )
+        summaries = list(self._from_totals(totals))
+        if summaries:
+            self.bulk_create(summaries, update_conflicts=True, unique_fields=['user', 'date'],
+                             update_fields=list(self.AGGREGATES))
+
+        # Days left without meals don't keep a summary
+        emptied = keys - {(summary.user_id, summary.date) for summary in summaries}
+        if emptied:
+            self.filter(self._key_filter(emptied)).delete()
+
+    def rebuild(self, users=None, batch_size=1000):
+        """
+        Recreate every summary (or those of the given users) from scratch
+
+        Returns:
+            Number of summaries written
+        """
+        meals = MealPlan.objects.all()
+        summaries = self.all()
+        if users is not None:
+            meals = meals.filter(user__in=users)
+            summaries = summaries.filter(user__in=users)
+        totals = meals.values('user_id', 'date').annotate(**self.AGGREGATES).order_by()
+
+        with transaction.atomic():
+            summaries.delete()
+            written = 0
+            batch = []
+            for summary in self._from_totals(totals.iterator()):
+                batch.append(summary)
+                if len(batch) == batch_size:
+                    written += len(self.bulk_create(batch))
+                    batch = []
+            written += len(self.bulk_create(batch))
+        return written
+
+
+class DailyNutritionSummary(models.Model):
+    """Per-day nutrition totals of a user's meal plans, kept up to date on every MealPlan write"""
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='nutrition_summaries')
+    date = models.DateField()
+    planned_calories = models.IntegerField(default=0)
+    planned_protein = models.FloatField(default=0, help_text="Protein in grams")
+    planned_carbs = models.FloatField(default=0, help_text="Carbohydrates in grams")
+    planned_fat = models.FloatField(default=0, help_text="Fat in grams")
+    consumed_calories = models.IntegerField(default=0)
+    consumed_protein = models.FloatField(default=0, help_text="Protein in grams")
+    consumed_carbs = models.FloatField(default=0, help_text="Carbohydrates in grams")
+    consumed_fat = models.FloatField(default=0, help_text="Fat in grams")
+    meal_count = models.IntegerField(default=0)
+    consumed_meal_count = models.IntegerField(default=0)
+
+    objects = DailyNutritionSummaryManager()
+
+    class Meta:
+        unique_together = ('user', 'date')
+        ordering = ['date']
+
+    def __str__(self):
+        return f"{self.user.username} - {self.date} - {self.planned_calories} kcal"
+
 class Achievement(models.Model):
     """User achievements"""
     user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='achievements')
@@ -183,4 +393,26 @@ class UserStreak(models.Model):
     last_workout_date = models.DateField(null=True, blank=True)
 
     def __str__(self):
-        return f"{self.user.username} - {self.current_streak} days"
\ No newline at end of file
+        return f"{self.user.username} - {self.current_streak} days"
+
+
+@receiver([post_save, post_delete], sender=UserProfile)
+@receiver([post_save, post_delete], sender=ProgressEntry)
+@receiver([post_save, post_delete], sender=UserWorkout)
+@receiver([post_save, post_delete], sender=Achievement)
+@receiver([post_save, post_delete], sender=UserStreak)
+def invalidate_dashboard_overview(sender, instance, created=False, **kwargs):
+    """Writes to a user's dashboard data drop their cached overview (MealPlan does this in its write paths)"""
+    # Building an overview creates the profile and streak when missing, so no cached
+    # overview predates their creation; invalidating would only discard that first build
+    if created and sender in (UserProfile, UserStreak):
+        return
+    invalidate_overview(instance.user_id)
+
+
+@receiver([post_save, post_delete], sender=WorkoutTemplate)
+@receiver([post_save, post_delete], sender=WorkoutExercise)
+@receiver([post_save, post_delete], sender=Exercise)
+def invalidate_workout_overviews_on_change(sender, **kwargs):
+    """Template and exercise rows are embedded in cached overviews (today's workout)"""
+    invalidate_workout_overviews()
@@ -1,5 +1,7 @@
 from rest_framework import serializers
 from django.contrib.auth.models import User
+from django.core.exceptions import FieldDoesNotExist
+from django.db.models import Prefetch
 from .models import (
     UserProfile, ProgressEntry, WorkoutTemplate, Exercise, 
     WorkoutExercise, UserWorkout, MealPlan, Achievement, UserStreak
@@ -107,4 +109,44 @@ class DashboardDataSerializer(serializers.Serializer):
     today_meals = MealPlanSerializer(many=True)
     weekly_nutrition = serializers.ListField()
     goals_progress = serializers.DictField()
-    recent_achievements = AchievementSerializer(many=True)
\ No newline at end of file
+    recent_achievements = AchievementSerializer(many=True)
+
+
+def _related_lookups(serializer, model, prefix=''):
+    """select_related paths and Prefetch objects for the model serializers nested in serializer"""
+    select, prefetch = [], []
+    for field in serializer.fields.values():
+        nested = field.child if isinstance(field, serializers.ListSerializer) else field
+        if not isinstance(nested, serializers.ModelSerializer):
+            continue
+        try:
+            relation = model._meta.get_field(field.source)
+        except FieldDoesNotExist:
+            continue
+
+        path = prefix + field.source
+        if relation.many_to_one or relation.one_to_one:
+            select.append(path)
+            nested_select, nested_prefetch = _related_lookups(nested, relation.related_model, path + '__')
+            select += nested_select
+            prefetch += nested_prefetch
+        elif relation.one_to_many or relation.many_to_many:
+            related = optimize_queryset(relation.related_model._default_manager.all(), type(nested))
+            prefetch.append(Prefetch(path, queryset=related))
+    return select, prefetch
+
+
+def optimize_queryset(queryset, serializer_class):
+    """
+    Load the relations serializer_class nests together with queryset
+
+    Nested objects are joined with select_related and nested lists are
+    prefetched (recursively, so their own nesting is loaded too), which keeps
+    serializing any number of rows at a fixed number of queries.
+    """
+    select, prefetch = _related_lookups(serializer_class(), queryset.model)
+    if select:
+        queryset = queryset.select_related(*select)
+    if prefetch:
+        queryset = queryset.prefetch_related(*prefetch)
+    return queryset
@@ -0,0 +1,180 @@
+"""
+Glue between the AI engine and the dashboard tables
+"""
+import itertools
+from datetime import date, time, timedelta
+
+from django.db import transaction
+from django.db.models import F, Sum
+from django.db.models.functions import TruncWeek
+
+from AiEngine.FitnessAI import FitnessAI, UserProfile as EngineProfile
+from .models import UserProfile, MealPlan, DailyNutritionSummary
+
+# Dashboard profile fields used when a user has no profile yet (same as the dashboard views)
+DEFAULT_PROFILE = {
+    'current_weight': 70.0,
+    'target_weight': 75.0,
+    'height': 175.0,
+    'age': 25,
+    'gender': 'male',
+    'fitness_level': 'intermediate',
+    'goal': 'muscle_gain'
+}
+
+# Engine meal type -> (MealPlan.meal_type, scheduled time); workout meals are stored as snacks
+MEAL_TYPES = {
+    'Breakfast': ('breakfast', time(8, 0)),
+    'Lunch': ('lunch', time(12, 30)),
+    'Dinner': ('dinner', time(19, 0)),
+    'Pre-workout Meal': ('snack', time(15, 30)),
+    'Post-workout Meal': ('snack', time(17, 30))
+}
+# Snacks, and any other engine meal type ("Meal 6"), take the snack times in order
+SNACK_TIMES = [time(10, 30), time(16, 0), time(21, 0)]
+
+NUTRIENT_FIELDS = ['calories', 'protein', 'carbs', 'fat']
+NUTRITION_BUCKETS = ['day', 'week']
+# Longest start-to-end range (in days) nutrition_totals accepts per bucket
+NUTRITION_MAX_SPAN = {'day': 366, 'week': 5 * 366}
+
+_engine = None
+
+
+def get_engine():
+    """AI engine shared by every request in this process, so catalogs are only built once"""
+    global _engine
+    if _engine is None:
+        _engine = FitnessAI()
+    return _engine
+
+
+def engine_profile(profile):
+    """AI engine profile for a dashboard profile"""
+    return EngineProfile(
+        user_id=str(profile.user_id),
+        age=profile.age,
+        gender=profile.gender,
+        height=profile.height,
+        weight=profile.current_weight,
+        goal=profile.goal,
+        activity_level='lightly_active',
+        fitness_experience=profile.fitness_level
+    )
+
+
+def _meal_row(user, day, meal, meal_type, scheduled_time):
+    """Unsaved MealPlan row for one generated meal"""
+    nutrition = meal['nutrition']
+    return MealPlan(
+        user=user,
+        date=day,
+        meal_type=meal_type,
+        meal_name=', '.join(food['name'] for food in meal['foods'])[:100] or meal['type'],
+        foods=meal['foods'],
+        calories=round(nutrition['calories']),
+        protein=round(nutrition['protein'], 1),
+        carbs=round(nutrition['carbs'], 1),
+        fat=round(nutrition['fat'], 1),
+        scheduled_time=scheduled_time
+    )
+
+
+def meal_plan_rows(user, plan, start_date):
+    """
+    Map a plan from MealPlanner.generate_weekly_plan to unsaved MealPlan rows
+
+    Day N of the plan is scheduled on start_date + N - 1.
+    """
+    rows = []
+    for offset, day_plan in enumerate(plan['days']):
+        day = start_date + timedelta(days=offset)
+        snack_times = itertools.cycle(SNACK_TIMES)
+        for meal in day_plan['meals']:
+            meal_type, scheduled_time = MEAL_TYPES.get(meal['type']) or ('snack', next(snack_times))
+            rows.append(_meal_row(user, day, meal, meal_type, scheduled_time))
+        for snack in day_plan['snacks']:
+            rows.append(_meal_row(user, day, snack, 'snack', next(snack_times)))
+    return rows
+
+
+def save_meal_plan(user, start_date=None, days=7, seed=None, replace=True):
+    """
+    Generate a meal plan for a user and store it as MealPlan rows
+
+    A user's meals for a date are treated as one unit: with replace, meals
+    already stored on the planned dates are replaced; otherwise those dates
+    keep their meals and only the free dates are filled. The whole week is
+    written in one transaction with a single bulk insert.
+
+    Returns:
+        List of the MealPlan rows created
+    """
+    start_date = start_date or date.today()
+    profile, _ = UserProfile.objects.get_or_create(user=user, defaults=DEFAULT_PROFILE)
+    plan = get_engine().meal_planner.generate_weekly_plan(engine_profile(profile), days, rng=seed)
+    rows = meal_plan_rows(user, plan, start_date)
+
+    dates = [start_date + timedelta(days=offset) for offset in range(days)]
+    with transaction.atomic():
+        existing = MealPlan.objects.filter(user=user, date__in=dates)
+        if replace:
+            existing.delete()
+        else:
+            taken = set(existing.values_list('date', flat=True))
+            rows = [row for row in rows if row.date not in taken]
+        return MealPlan.objects.bulk_create(rows)
+
+
+def nutrition_totals(user, start, end, bucket='day'):
+    """
+    Planned and consumed calories and macros per day or week from start to end (inclusive)
+
+    Read from DailyNutritionSummary in one query, so the cost depends on the
+    number of days rather than meals. Every bucket in the range is returned,
+    with zeros where there are no meals. Weekly buckets are whole weeks: the
+    range is widened to the Monday before start and the Sunday after end,
+    and each bucket is labelled with its Monday.
+
+    Returns:
+        List of {'date', 'calories', 'protein', 'carbs', 'fat', 'consumed_calories', ...} dicts in date order
+
+    Raises:
+        ValueError: For an unknown bucket, or a range longer than NUTRITION_MAX_SPAN allows
+    """
+    if bucket not in NUTRITION_BUCKETS:
+        raise ValueError(f"bucket must be one of {NUTRITION_BUCKETS}, got {bucket!r}")
+    if (end - start).days + 1 > NUTRITION_MAX_SPAN[bucket]:
+        raise ValueError(f"{bucket} totals cover at most {NUTRITION_MAX_SPAN[bucket]} days")
+    step = 1
+    if bucket == 'week':
+        step = 7
+        # date.min is a Monday, so only the end can run off the calendar
+        start -= timedelta(days=start.weekday())
+        end += timedelta(days=min(6 - end.weekday(), (date.max - end).days))
+
+    # Summary column for each returned total
+    columns = {field: f'planned_{field}' for field in NUTRIENT_FIELDS}
+    columns.update({f'consumed_{field}': f'consumed_{field}' for field in NUTRIENT_FIELDS})
+
+    summaries = DailyNutritionSummary.objects.filter(user=user, date__range=(start, end))
+    if bucket == 'day':
+        rows = summaries.annotate(period=F('date')).values('period', *columns.values())
+    else:
+        rows = (
+            summaries.annotate(period=TruncWeek('date'))
+            .values('period')
+            .annotate(**{f'{column}_sum': Sum(column) for column in columns.values()})
+            .order_by('period')
+        )
+        rows = [{'period': row['period'], **{column: row[f'{column}_sum'] for column in columns.values()}}
+                for row in rows]
+    totals = {row['period']: row for row in rows}
+
+    # Offsets rather than repeated addition, so the last bucket never steps past date.max
+    buckets = []
+    for offset in range(0, (end - start).days + 1, step):
+        day = start + timedelta(days=offset)
+        row = totals.get(day, {})
+        buckets.append({'date': day, **{field: row.get(column) or 0 for field, column in columns.items()}})
+    return buckets
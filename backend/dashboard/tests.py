@@ -1,3 +1,437 @@
+from datetime import date, time, timedelta
+from io import StringIO
+
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.core.management import call_command
 from django.test import TestCase
+from rest_framework.test import APIClient
+
+from .models import (
+    UserProfile, ProgressEntry, WorkoutTemplate, Exercise, WorkoutExercise, UserWorkout,
+    MealPlan, DailyNutritionSummary, Achievement, UserStreak
+)
+from .services import save_meal_plan, meal_plan_rows, nutrition_totals
+from .cache import overview_cache_stats
+from .views import build_overview
+
+
+class SaveMealPlanTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username='alice', password='secret')
+        UserProfile.objects.create(
+            user=self.user, current_weight=80, target_weight=75, height=180, age=30,
+            gender='male', fitness_level='beginner', goal='weight_loss'
+        )
+        self.start = date(2024, 1, 1)
+
+    def test_week_is_written_in_a_handful_of_queries(self):
+        # Profile lookup, delete of the week's rows, one bulk insert and the four statements refreshing
+        # the daily summaries (create, lock, aggregate, upsert), plus the transaction savepoints
+        with self.assertNumQueries(10):
+            meals = save_meal_plan(self.user, start_date=self.start, seed=1)
+
+        self.assertEqual(len(meals), MealPlan.objects.filter(user=self.user).count())
+        self.assertEqual(DailyNutritionSummary.objects.filter(user=self.user).count(), 7)
+        dates = set(MealPlan.objects.values_list('date', flat=True))
+        self.assertEqual(dates, {self.start + timedelta(days=offset) for offset in range(7)})
+        breakfast = MealPlan.objects.filter(date=self.start, meal_type='breakfast').get()
+        self.assertEqual(breakfast.scheduled_time, time(8, 0))
+        self.assertTrue(breakfast.foods)
+
+    def test_every_engine_meal_type_is_a_valid_choice(self):
+        # muscle_gain plans include pre- and post-workout meals
+        UserProfile.objects.filter(user=self.user).update(goal='muscle_gain')
+        save_meal_plan(self.user, start_date=self.start, days=2, seed=1)
+
+        choices = {value for value, _ in MealPlan._meta.get_field('meal_type').choices}
+        for meal in MealPlan.objects.all():
+            meal.full_clean()
+            self.assertIn(meal.meal_type, choices)
+        day = MealPlan.objects.filter(date=self.start)
+        self.assertEqual(list(day.values_list('scheduled_time', 'meal_type')), [
+            (time(8, 0), 'breakfast'), (time(10, 30), 'snack'), (time(12, 30), 'lunch'), (time(15, 30), 'snack'),
+            (time(16, 0), 'snack'), (time(17, 30), 'snack'), (time(19, 0), 'dinner')
+        ])
+
+        # Types the dashboard doesn't know ("Meal 6") become snacks at the snack times
+        meal = {'type': 'Meal 6', 'foods': [], 'nutrition': {'calories': 300, 'protein': 20, 'carbs': 30, 'fat': 10}}
+        rows = meal_plan_rows(self.user, {'days': [{'meals': [meal], 'snacks': [meal]}]}, self.start)
+        self.assertEqual([(row.meal_type, row.scheduled_time) for row in rows],
+                         [('snack', time(10, 30)), ('snack', time(16, 0))])
+
+    def test_replace_overwrites_the_planned_dates(self):
+        save_meal_plan(self.user, start_date=self.start, seed=1)
+        count = MealPlan.objects.count()
+        save_meal_plan(self.user, start_date=self.start, seed=2)
+        self.assertEqual(MealPlan.objects.count(), count)
+
+    def test_keep_existing_only_fills_free_dates(self):
+        save_meal_plan(self.user, start_date=self.start, days=2, seed=1)
+        kept = set(MealPlan.objects.values_list('id', flat=True))
+        meals = save_meal_plan(self.user, start_date=self.start, days=3, seed=2, replace=False)
+
+        self.assertEqual({meal.date for meal in meals}, {self.start + timedelta(days=2)})
+        self.assertTrue(kept <= set(MealPlan.objects.values_list('id', flat=True)))
+
+    def test_endpoint_and_command(self):
+        client = APIClient()
+        client.force_authenticate(self.user)
+        response = client.post('/api/dashboard/meals/generate/',
+                               {'start_date': '2024-02-01', 'days': 2, 'seed': 3}, format='json')
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(len(response.data), MealPlan.objects.filter(date__gte=date(2024, 2, 1)).count())
+
+        response = client.post('/api/dashboard/meals/generate/', {'days': 0}, format='json')
+        self.assertEqual(response.status_code, 400)
+
+        call_command('generate_meal_plans', 'alice', '--start', '2024-03-01', '--days', '1', stdout=StringIO())
+        self.assertTrue(MealPlan.objects.filter(date=date(2024, 3, 1)).exists())
+
+
+class NutritionTotalsTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user(username='bob', password='secret')
+        other = User.objects.create_user(username='carol', password='secret')
+        # Monday 2024-01-01 and Wednesday 2024-01-03, plus the following Monday
+        for user, day, calories in [(self.user, date(2024, 1, 1), 500), (self.user, date(2024, 1, 1), 300),
+                                    (self.user, date(2024, 1, 3), 700), (self.user, date(2024, 1, 8), 400),
+                                    (other, date(2024, 1, 1), 900)]:
+            MealPlan.objects.create(user=user, date=day, meal_type='lunch', meal_name='Meal', foods=[],
+                                    calories=calories, protein=10.5, carbs=20, fat=5, scheduled_time=time(12, 0))
+
+    def test_daily_buckets_in_one_query(self):
+        with self.assertNumQueries(1):
+            days = nutrition_totals(self.user, date(2024, 1, 1), date(2024, 1, 3))
+
+        self.assertEqual([day['date'] for day in days], [date(2024, 1, 1), date(2024, 1, 2), date(2024, 1, 3)])
+        self.assertEqual([day['calories'] for day in days], [800, 0, 700])
+        self.assertEqual(days[0]['protein'], 21.0)
+
+    def test_weekly_buckets_are_whole_weeks(self):
+        # Mid-week start and end still sum the full Monday-Sunday weeks
+        weeks = nutrition_totals(self.user, date(2024, 1, 3), date(2024, 1, 8), bucket='week')
+        self.assertEqual([(week['date'], week['calories']) for week in weeks],
+                         [(date(2024, 1, 1), 1500), (date(2024, 1, 8), 400)])
+
+    def test_range_is_bounded(self):
+        self.assertEqual(len(nutrition_totals(self.user, date(2024, 1, 1), date(2024, 12, 31))), 366)
+        with self.assertRaises(ValueError):
+            nutrition_totals(self.user, date(2023, 1, 1), date(2024, 1, 2))
+        with self.assertRaises(ValueError):
+            nutrition_totals(self.user, date(1824, 1, 1), date(2024, 1, 1), bucket='week')
+
+        # The last week of the calendar ends on date.max, a Friday
+        weeks = nutrition_totals(self.user, date(9999, 12, 25), date.max, bucket='week')
+        self.assertEqual([week['date'] for week in weeks], [date(9999, 12, 20), date(9999, 12, 27)])
+
+    def test_endpoint(self):
+        client = APIClient()
+        client.force_authenticate(self.user)
+        response = client.get('/api/dashboard/nutrition/', {'start': '2024-01-01', 'end': '2024-01-14',
+                                                            'bucket': 'week'})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual([week['calories'] for week in response.data['results']], [1500, 400])
+
+        for params in [{'bucket': 'month'}, {'start': '2024-02-01', 'end': '2024-01-01'}, {'start': 'soon'},
+                       {'start': '1824-01-01', 'end': '2024-01-01'}, {'end': '0001-01-02'}]:
+            self.assertEqual(client.get('/api/dashboard/nutrition/', params).status_code, 400)
+        response = client.get('/api/dashboard/nutrition/', {'start': '9999-12-25', 'end': '9999-12-31'})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(response.data['results']), 7)
+
+    def test_overview_weekly_nutrition(self):
+        client = APIClient()
+        client.force_authenticate(self.user)
+        today = date.today()
+        MealPlan.objects.create(user=self.user, date=today, meal_type='dinner', meal_name='Meal', foods=[],
+                                calories=650, protein=40, carbs=60, fat=20, scheduled_time=time(19, 0))
+
+        weekly = client.get('/api/dashboard/overview/').data['weekly_nutrition']
+        self.assertEqual(len(weekly), 7)
+        self.assertEqual(weekly[today.weekday()], {'name': today.strftime('%a'), 'calories': 650,
+                                                   'protein': 40, 'carbs': 60, 'fat': 20})
+
+
+class DailyNutritionSummaryTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username='dave', password='secret')
+        self.day = date(2024, 1, 1)
+
+    def meal(self, calories, day=None, **fields):
+        return MealPlan(user=self.user, date=day or self.day, meal_type='lunch', meal_name='Meal', foods=[],
+                        calories=calories, protein=10, carbs=20, fat=5, scheduled_time=time(12, 0), **fields)
+
+    def summary(self, day=None):
+        return DailyNutritionSummary.objects.filter(user=self.user, date=day or self.day).first()
+
+    def test_single_row_writes(self):
+        lunch = self.meal(500)
+        lunch.save()
+        self.meal(300, is_consumed=True).save()
+        summary = self.summary()
+        self.assertEqual((summary.planned_calories, summary.consumed_calories), (800, 300))
+        self.assertEqual((summary.planned_protein, summary.meal_count, summary.consumed_meal_count), (20, 2, 1))
+
+        lunch = MealPlan.objects.get(pk=lunch.pk)
+        lunch.is_consumed = True
+        lunch.save()
+        self.assertEqual(self.summary().consumed_calories, 800)
+
+        # Moving a meal refreshes both days
+        lunch.date = self.day + timedelta(days=1)
+        lunch.save()
+        self.assertEqual(self.summary().planned_calories, 300)
+        self.assertEqual(self.summary(lunch.date).planned_calories, 500)
+
+        lunch.delete()
+        self.assertIsNone(self.summary(lunch.date))
+
+        # Saves that don't touch nutrition leave the summaries alone
+        meal = MealPlan.objects.get(user=self.user)
+        meal.meal_name = 'Renamed'
+        with self.assertNumQueries(1):
+            meal.save(update_fields=['meal_name'])
+
+    def test_bulk_writes(self):
+        MealPlan.objects.bulk_create([self.meal(400), self.meal(600), self.meal(200, day=self.day + timedelta(days=1))])
+        self.assertEqual(self.summary().planned_calories, 1000)
+
+        MealPlan.objects.filter(user=self.user, date=self.day).update(is_consumed=True)
+        self.assertEqual(self.summary().consumed_calories, 1000)
+
+        meals = list(MealPlan.objects.filter(calories=400))
+        meals[0].calories = 450
+        MealPlan.objects.bulk_update(meals, ['calories'])
+        self.assertEqual(self.summary().planned_calories, 1050)
+
+        MealPlan.objects.filter(user=self.user, date=self.day).update(date=self.day + timedelta(days=1))
+        self.assertIsNone(self.summary())
+        self.assertEqual(self.summary(self.day + timedelta(days=1)).planned_calories, 1250)
+
+        MealPlan.objects.filter(user=self.user).delete()
+        self.assertFalse(DailyNutritionSummary.objects.exists())
+
+    def test_refresh_only_touches_the_written_days(self):
+        other = User.objects.create_user(username='hank', password='secret')
+        later = self.day + timedelta(days=1)
+        self.meal(100, day=later).save()
+        DailyNutritionSummary.objects.filter(user=self.user, date=later).delete()
+
+        # (dave, day) and (hank, later) are refreshed; (dave, later) is not one of the written keys
+        MealPlan.objects.bulk_create([self.meal(400), MealPlan(
+            user=other, date=later, meal_type='lunch', meal_name='Meal', foods=[], calories=300,
+            protein=10, carbs=20, fat=5, scheduled_time=time(12, 0)
+        )])
+        self.assertEqual(set(DailyNutritionSummary.objects.values_list('user__username', 'date', 'planned_calories')),
+                         {('dave', self.day, 400), ('hank', later, 300)})
+
+    def test_rebuild_command_and_consumed_totals(self):
+        MealPlan.objects.bulk_create([self.meal(500, is_consumed=True), self.meal(300)])
+        DailyNutritionSummary.objects.all().delete()
+
+        call_command('rebuild_nutrition_summaries', 'dave', stdout=StringIO())
+        day, = nutrition_totals(self.user, self.day, self.day)
+        self.assertEqual((day['calories'], day['consumed_calories'], day['consumed_protein']), (800, 500, 10))
+
+
+class OverviewCacheTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user(username='erin', password='secret')
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def overview(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            response = self.client.get('/api/dashboard/overview/')
+        self.assertEqual(response.status_code, 200)
+        return response.data
+
+    def test_repeat_views_are_served_from_the_cache(self):
+        # The first load creates the profile and streak without invalidating itself
+        self.overview()
+        with self.assertNumQueries(0):
+            data = self.overview()
+        self.assertEqual(data['stats']['total_achievements'], 0)
+        self.assertEqual(overview_cache_stats(), {'hits': 1, 'misses': 1, 'hit_rate': 0.5})
+
+    def test_template_edits_invalidate_the_cache(self):
+        template = WorkoutTemplate.objects.create(name='Legs', muscle_groups='legs', difficulty_level='beginner',
+                                                  estimated_duration=30)
+        exercise = Exercise.objects.create(name='Squat', muscle_group='legs', instructions='',
+                                           difficulty_level='beginner')
+        WorkoutExercise.objects.create(workout=template, exercise=exercise, sets=3, reps_min=8, reps_max=12,
+                                       rest_time=60)
+        with self.captureOnCommitCallbacks(execute=True):
+            UserWorkout.objects.create(user=self.user, workout_template=template, scheduled_date=date.today())
+        self.overview()
+
+        exercise.name = 'Front Squat'
+        with self.captureOnCommitCallbacks(execute=True):
+            exercise.save()
+        workout = self.overview()['today_workout']['workout_template']
+        self.assertEqual(workout['exercises'][0]['exercise']['name'], 'Front Squat')
+
+    def test_writes_invalidate_the_cache(self):
+        self.overview()
+
+        with self.captureOnCommitCallbacks(execute=True):
+            ProgressEntry.objects.create(user=self.user, date=date.today(), weight=68, strength_score=60)
+        self.assertEqual(self.overview()['stats']['current_weight'], 68)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            MealPlan.objects.bulk_create([MealPlan(
+                user=self.user, date=date.today(), meal_type='lunch', meal_name='Meal', foods=[], calories=500,
+                protein=30, carbs=50, fat=10, scheduled_time=time(12, 0)
+            )])
+        self.assertEqual(len(self.overview()['today_meals']), 1)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            MealPlan.objects.filter(user=self.user).update(meal_name='Renamed')
+        self.assertEqual(self.overview()['today_meals'][0]['meal_name'], 'Renamed')
+
+        with self.captureOnCommitCallbacks(execute=True):
+            Achievement.objects.create(user=self.user, title='First', description='', icon='star',
+                                       category='workout')
+        self.assertEqual(self.overview()['stats']['new_achievements'], 1)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client.post('/api/dashboard/achievements/mark-read/')
+        self.assertEqual(self.overview()['stats']['new_achievements'], 0)
+
+        # Another user's writes leave the entry alone
+        other = User.objects.create_user(username='frank', password='secret')
+        with self.captureOnCommitCallbacks(execute=True):
+            ProgressEntry.objects.create(user=other, date=date.today(), weight=90, strength_score=40)
+        with self.assertNumQueries(0):
+            self.overview()
+
+    def test_metrics_endpoint_is_admin_only(self):
+        self.overview()
+        self.assertEqual(self.client.get('/api/dashboard/overview/cache-stats/').status_code, 403)
+
+        admin = User.objects.create_user(username='admin', password='secret', is_staff=True)
+        self.client.force_authenticate(admin)
+        self.assertEqual(self.client.get('/api/dashboard/overview/cache-stats/').data['misses'], 1)
+        self.client.delete('/api/dashboard/overview/cache-stats/')
+        self.assertEqual(self.client.get('/api/dashboard/overview/cache-stats/').data['hit_rate'], 0.0)
+
+
+class OverviewQueryBudgetTests(TestCase):
+    # User with profile and streak, progress entries, achievement counts, recent achievements,
+    # workout counts, today's workout, its template exercises, today's meals and weekly nutrition
+    BUDGET = 9
+
+    def setUp(self):
+        self.today = date.today()
+
+    def populate(self, size):
+        user = User.objects.create_user(username=f'user{size}', password='secret')
+        UserProfile.objects.create(user=user, current_weight=80, target_weight=75, height=180, age=30,
+                                   gender='male', fitness_level='beginner', goal='weight_loss')
+        UserStreak.objects.create(user=user, current_streak=3, longest_streak=5)
+        ProgressEntry.objects.bulk_create([
+            ProgressEntry(user=user, date=self.today - timedelta(days=day), weight=80 - day / 10, strength_score=50)
+            for day in range(size * 10)
+        ])
+        Achievement.objects.bulk_create([
+            Achievement(user=user, title=f'Badge {i}', description='', category='workout', is_new=i % 2 == 0)
+            for i in range(size)
+        ])
+        template = WorkoutTemplate.objects.create(name='Full body', muscle_groups='legs', difficulty_level='beginner',
+                                                  estimated_duration=45)
+        for i in range(size):
+            exercise = Exercise.objects.create(name=f'Exercise {i}', muscle_group='legs', instructions='',
+                                               difficulty_level='beginner')
+            WorkoutExercise.objects.create(workout=template, exercise=exercise, sets=3, reps_min=8, reps_max=12,
+                                           rest_time=60, order=i)
+        UserWorkout.objects.bulk_create([
+            UserWorkout(user=user, workout_template=template, scheduled_date=self.today - timedelta(days=day),
+                        is_completed=day > 0)
+            for day in range(size * 3)
+        ])
+        MealPlan.objects.bulk_create([
+            MealPlan(user=user, date=self.today - timedelta(days=day % 7), meal_type='snack', meal_name='Meal',
+                     foods=[], calories=200, protein=10, carbs=20, fat=5, scheduled_time=time(10, 0))
+            for day in range(size * 4)
+        ])
+        return user
+
+    def test_budget_does_not_grow_with_data(self):
+        for size in [1, 20]:
+            user = self.populate(size)
+            with self.assertNumQueries(self.BUDGET):
+                data = build_overview(user, self.today)
+
+            self.assertEqual(len(data['today_workout']['workout_template']['exercises']), size)
+            self.assertEqual(data['stats']['total_achievements'], size)
+            self.assertEqual(data['stats']['new_achievements'], (size + 1) // 2)
+            self.assertEqual(data['stats']['current_weight'], 80)
+            self.assertAlmostEqual(data['stats']['weight_change_percentage'], (80 - 79.3) / 79.3 * 100)
+            self.assertEqual(len(data['progress_data']), min(size * 10, 57))
+            self.assertEqual(data['progress_data'][-1]['date'], self.today.isoformat())
+
+    def test_first_load_creates_profile_and_streak(self):
+        user = User.objects.create_user(username='newcomer', password='secret')
+        data = build_overview(user, self.today)
+
+        self.assertEqual(data['stats']['current_weight'], 70.0)
+        self.assertEqual(data['stats']['current_streak'], 0)
+        self.assertTrue(UserStreak.objects.filter(user=user).exists())
+        self.assertIsNone(data['today_workout'])
+        self.assertTrue(UserProfile.objects.filter(user=user).exists())
+
+
+class WorkoutListQueryTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username='gina', password='secret')
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+        self.exercises = Exercise.objects.bulk_create([
+            Exercise(name=f'Exercise {i}', muscle_group='legs', instructions='', difficulty_level='beginner')
+            for i in range(3)
+        ])
+
+    def create_templates(self, count):
+        templates = WorkoutTemplate.objects.bulk_create([
+            WorkoutTemplate(name=f'Template {i}', muscle_groups='legs', difficulty_level='beginner',
+                            estimated_duration=30)
+            for i in range(count)
+        ])
+        WorkoutExercise.objects.bulk_create([
+            WorkoutExercise(workout=template, exercise=exercise, sets=3, reps_min=8, reps_max=12, rest_time=60,
+                            order=order)
+            for template in templates for order, exercise in enumerate(self.exercises)
+        ])
+        return templates
+
+    def test_workout_list_queries_do_not_grow_with_rows(self):
+        templates = self.create_templates(5)
+        start = date(2020, 1, 1)
+        created = 0
+        for count in [10, 100, 1000]:
+            UserWorkout.objects.bulk_create([
+                UserWorkout(user=self.user, workout_template=templates[day % len(templates)],
+                            scheduled_date=start + timedelta(days=day))
+                for day in range(created, count)
+            ])
+            created = count
+
+            # Workouts with their templates, then template exercises with their exercises
+            with self.assertNumQueries(2):
+                response = self.client.get('/api/dashboard/workouts/')
+            self.assertEqual(len(response.data), count)
+            self.assertEqual(len(response.data[-1]['workout_template']['exercises']), len(self.exercises))
+
+    def test_template_list_queries_do_not_grow_with_rows(self):
+        created = 0
+        for count in [10, 100, 1000]:
+            self.create_templates(count - created)
+            created = count
 
-# Create your tests here.
+            with self.assertNumQueries(2):
+                response = self.client.get('/api/dashboard/workout-templates/')
+            self.assertEqual(len(response.data), count)
+            self.assertEqual(response.data[0]['exercises'][2]['exercise']['name'], 'Exercise 2')
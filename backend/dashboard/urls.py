@@ -4,6 +4,7 @@ from . import views
 urlpatterns = [
     # Dashboard overview
     path('overview/', views.dashboard_overview, name='dashboard_overview'),
+    path('overview/cache-stats/', views.overview_cache_metrics, name='overview_cache_metrics'),
     
     # User profile
     path('profile/', views.user_profile, name='user_profile'),
@@ -18,6 +19,8 @@ urlpatterns = [
     
     # Meal plans
     path('meals/', views.MealPlanListCreateView.as_view(), name='meal_plans'),
+    path('meals/generate/', views.generate_meal_plan, name='generate_meal_plan'),
+    path('nutrition/', views.nutrition_summary, name='nutrition_summary'),
     
     # Achievements
     path('achievements/', views.AchievementListView.as_view(), name='achievements'),
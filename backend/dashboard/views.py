@@ -1,8 +1,9 @@
 from rest_framework import generics, status
 from rest_framework.decorators import api_view, permission_classes
-from rest_framework.permissions import IsAuthenticated
+from rest_framework.permissions import IsAuthenticated, IsAdminUser
 from rest_framework.response import Response
-from django.db.models import Q, Avg
+from django.contrib.auth.models import User
+from django.db.models import Q, Avg, Count, Max
 from django.utils import timezone
 from datetime import datetime, timedelta, date
 from .models import (
@@ -12,166 +13,161 @@ from .models import (
 from .serializers import (
     UserProfileSerializer, ProgressEntrySerializer, WorkoutTemplateSerializer,
     UserWorkoutSerializer, MealPlanSerializer, AchievementSerializer,
-    DashboardDataSerializer, UserStreakSerializer
+    DashboardDataSerializer, UserStreakSerializer, optimize_queryset
 )
+from .services import save_meal_plan, nutrition_totals, NUTRIENT_FIELDS, DEFAULT_PROFILE
+from .cache import get_overview, invalidate_overview, overview_cache_stats, reset_overview_cache_stats
 
-@api_view(['GET'])
-@permission_classes([IsAuthenticated])
-def dashboard_overview(request):
+def build_overview(user, today):
     """
-    Get comprehensive dashboard data for the authenticated user
+    Compute the dashboard overview payload of user as of today
     """
-    user = request.user
-    today = date.today()
-    
-    try:
-        # Get or create user profile
-        profile, created = UserProfile.objects.get_or_create(
-            user=user,
-            defaults={
-                'current_weight': 70.0,
-                'target_weight': 75.0,
-                'height': 175.0,
-                'age': 25,
-                'gender': 'male',
-                'fitness_level': 'intermediate',
-                'goal': 'muscle_gain'
-            }
+    week_ago = today - timedelta(days=7)
+    eight_weeks_ago = today - timedelta(weeks=8)
+    thirty_days_ago = today - timedelta(days=30)
+
+    # Profile, streak and the dates of the latest and week-old progress entries in one query
+    user = (
+        User.objects.select_related('fitness_profile', 'streak')
+        .annotate(
+            latest_progress_date=Max('progress_entries__date'),
+            week_ago_progress_date=Max('progress_entries__date', filter=Q(progress_entries__date__lte=week_ago))
         )
-        
-        # Get latest progress entries
-        latest_progress = ProgressEntry.objects.filter(user=user).first()
-        week_ago_progress = ProgressEntry.objects.filter(
-            user=user, 
-            date__lte=today - timedelta(days=7)
-        ).first()
-        
-        # Calculate progress stats
-        current_weight = latest_progress.weight if latest_progress else profile.current_weight
-        current_strength = latest_progress.strength_score if latest_progress else 50
-        
-        weight_change = 0
-        strength_change = 0
-        
-        if week_ago_progress:
-            if week_ago_progress.weight > 0:
-                weight_change = ((current_weight - week_ago_progress.weight) / week_ago_progress.weight) * 100
-            if week_ago_progress.strength_score > 0:
-                strength_change = ((current_strength - week_ago_progress.strength_score) / week_ago_progress.strength_score) * 100
-        
-        # Get streak info
+        .get(pk=user.pk)
+    )
+    try:
+        profile = user.fitness_profile
+    except UserProfile.DoesNotExist:
+        profile, _ = UserProfile.objects.get_or_create(user=user, defaults=DEFAULT_PROFILE)
+    try:
+        streak = user.streak
+    except UserStreak.DoesNotExist:
         streak, _ = UserStreak.objects.get_or_create(
             user=user,
             defaults={'current_streak': 0, 'longest_streak': 0}
         )
-        
-        # Get achievements
-        total_achievements = Achievement.objects.filter(user=user).count()
-        new_achievements = Achievement.objects.filter(user=user, is_new=True).count()
-        
-        # Prepare stats
-        stats = {
-            'current_weight': current_weight,
-            'target_weight': profile.target_weight,
-            'weight_change_percentage': weight_change,
-            'strength_score': current_strength,
-            'strength_change_percentage': strength_change,
-            'current_streak': streak.current_streak,
-            'total_achievements': total_achievements,
-            'new_achievements': new_achievements
-        }
-        
-        # Get progress data for charts (last 8 weeks)
-        eight_weeks_ago = today - timedelta(weeks=8)
-        progress_data = ProgressEntry.objects.filter(
-            user=user,
-            date__gte=eight_weeks_ago
+
+    # Chart entries (last 8 weeks) together with the latest and week-old ones
+    # (dates are unique per user)
+    progress_entries = {
+        entry.date: entry for entry in ProgressEntry.objects.filter(
+            Q(date__gte=eight_weeks_ago) | Q(date__in=[user.latest_progress_date, user.week_ago_progress_date]),
+            user=user
         ).order_by('date')
-        
-        # Get today's workout
-        today_workout = UserWorkout.objects.filter(
-            user=user,
-            scheduled_date=today
-        ).first()
-        
-        # Get today's meals
-        today_meals = MealPlan.objects.filter(
-            user=user,
-            date=today
-        ).order_by('scheduled_time')
-        
-        # Get weekly nutrition data
-        week_start = today - timedelta(days=today.weekday())
-        weekly_nutrition = []
-        
-        for i in range(7):
-            day = week_start + timedelta(days=i)
-            day_meals = MealPlan.objects.filter(user=user, date=day)
-            
-            daily_calories = sum(meal.calories for meal in day_meals)
-            daily_protein = sum(meal.protein for meal in day_meals)
-            daily_carbs = sum(meal.carbs for meal in day_meals)
-            daily_fat = sum(meal.fat for meal in day_meals)
-            
-            weekly_nutrition.append({
-                'name': day.strftime('%a'),
-                'calories': daily_calories,
-                'protein': daily_protein,
-                'carbs': daily_carbs,
-                'fat': daily_fat
-            })
-        
-        # Calculate goals progress
-        weight_progress = 0
-        if profile.target_weight != profile.current_weight:
-            if profile.goal == 'weight_loss':
-                weight_progress = max(0, min(100, 
-                    ((profile.current_weight - current_weight) / 
-                     (profile.current_weight - profile.target_weight)) * 100
-                ))
-            else:  # weight gain or maintenance
-                weight_progress = max(0, min(100,
-                    ((current_weight - profile.current_weight) / 
-                     (profile.target_weight - profile.current_weight)) * 100
-                ))
-        
-        strength_progress = min(100, (current_strength / 100) * 100)
-        
-        # Calculate workout consistency (last 30 days)
-        thirty_days_ago = today - timedelta(days=30)
-        completed_workouts = UserWorkout.objects.filter(
-            user=user,
-            scheduled_date__gte=thirty_days_ago,
-            is_completed=True
-        ).count()
-        
-        total_scheduled = UserWorkout.objects.filter(
-            user=user,
-            scheduled_date__gte=thirty_days_ago
-        ).count()
-        
-        consistency_progress = (completed_workouts / max(1, total_scheduled)) * 100 if total_scheduled > 0 else 0
-        
-        goals_progress = {
-            'weight': weight_progress,
-            'strength': strength_progress,
-            'consistency': consistency_progress
-        }
-        
-        # Get recent achievements
-        recent_achievements = Achievement.objects.filter(user=user)[:5]
-        
-        # Prepare dashboard data
-        dashboard_data = {
-            'stats': stats,
-            'progress_data': ProgressEntrySerializer(progress_data, many=True).data,
-            'today_workout': UserWorkoutSerializer(today_workout).data if today_workout else None,
-            'today_meals': MealPlanSerializer(today_meals, many=True).data,
-            'weekly_nutrition': weekly_nutrition,
-            'goals_progress': goals_progress,
-            'recent_achievements': AchievementSerializer(recent_achievements, many=True).data
-        }
-        
+    }
+    latest_progress = progress_entries.get(user.latest_progress_date)
+    week_ago_progress = progress_entries.get(user.week_ago_progress_date)
+    progress_data = [entry for day, entry in progress_entries.items() if day >= eight_weeks_ago]
+
+    # Calculate progress stats
+    current_weight = latest_progress.weight if latest_progress else profile.current_weight
+    current_strength = latest_progress.strength_score if latest_progress else 50
+
+    weight_change = 0
+    strength_change = 0
+
+    if week_ago_progress:
+        if week_ago_progress.weight > 0:
+            weight_change = ((current_weight - week_ago_progress.weight) / week_ago_progress.weight) * 100
+        if week_ago_progress.strength_score > 0:
+            strength_change = ((current_strength - week_ago_progress.strength_score) / week_ago_progress.strength_score) * 100
+
+    # Get achievement counts
+    achievement_counts = Achievement.objects.filter(user=user).aggregate(
+        total=Count('id'),
+        new=Count('id', filter=Q(is_new=True))
+    )
+
+    # Prepare stats
+    stats = {
+        'current_weight': current_weight,
+        'target_weight': profile.target_weight,
+        'weight_change_percentage': weight_change,
+        'strength_score': current_strength,
+        'strength_change_percentage': strength_change,
+        'current_streak': streak.current_streak,
+        'total_achievements': achievement_counts['total'],
+        'new_achievements': achievement_counts['new']
+    }
+
+    # Get today's workout with its template and exercises
+    today_workout = optimize_queryset(UserWorkout.objects.filter(
+        user=user,
+        scheduled_date=today
+    ), UserWorkoutSerializer).first()
+
+    # Get today's meals
+    today_meals = MealPlan.objects.filter(
+        user=user,
+        date=today
+    ).order_by('scheduled_time')
+
+    # Get weekly nutrition data (one grouped query for the whole week)
+    week_start = today - timedelta(days=today.weekday())
+    weekly_nutrition = [
+        {'name': day['date'].strftime('%a'), **{field: day[field] for field in NUTRIENT_FIELDS}}
+        for day in nutrition_totals(user, week_start, week_start + timedelta(days=6))
+    ]
+
+    # Calculate goals progress
+    weight_progress = 0
+    if profile.target_weight != profile.current_weight:
+        if profile.goal == 'weight_loss':
+            weight_progress = max(0, min(100, 
+                ((profile.current_weight - current_weight) / 
+                 (profile.current_weight - profile.target_weight)) * 100
+            ))
+        else:  # weight gain or maintenance
+            weight_progress = max(0, min(100,
+                ((current_weight - profile.current_weight) / 
+                 (profile.target_weight - profile.current_weight)) * 100
+            ))
+
+    strength_progress = min(100, (current_strength / 100) * 100)
+
+    # Calculate workout consistency (last 30 days)
+    workout_counts = UserWorkout.objects.filter(
+        user=user,
+        scheduled_date__gte=thirty_days_ago
+    ).aggregate(
+        completed=Count('id', filter=Q(is_completed=True)),
+        scheduled=Count('id')
+    )
+    completed_workouts = workout_counts['completed']
+    total_scheduled = workout_counts['scheduled']
+
+    consistency_progress = (completed_workouts / max(1, total_scheduled)) * 100 if total_scheduled > 0 else 0
+
+    goals_progress = {
+        'weight': weight_progress,
+        'strength': strength_progress,
+        'consistency': consistency_progress
+    }
+
+    # Get recent achievements
+    recent_achievements = Achievement.objects.filter(user=user)[:5]
+
+    # Prepare dashboard data
+    dashboard_data = {
+        'stats': stats,
+        'progress_data': ProgressEntrySerializer(progress_data, many=True).data,
+        'today_workout': UserWorkoutSerializer(today_workout).data if today_workout else None,
+        'today_meals': MealPlanSerializer(today_meals, many=True).data,
+        'weekly_nutrition': weekly_nutrition,
+        'goals_progress': goals_progress,
+        'recent_achievements': AchievementSerializer(recent_achievements, many=True).data
+    }
+
+    return dashboard_data
+
+@api_view(['GET'])
+@permission_classes([IsAuthenticated])
+def dashboard_overview(request):
+    """
+    Get comprehensive dashboard data for the authenticated user
+    """
+    try:
+        dashboard_data = get_overview(request.user, lambda today: build_overview(request.user, today))
         return Response(dashboard_data, status=status.HTTP_200_OK)
         
     except Exception as e:
@@ -180,6 +176,16 @@ def dashboard_overview(request):
             status=status.HTTP_500_INTERNAL_SERVER_ERROR
         )
 
+@api_view(['GET', 'DELETE'])
+@permission_classes([IsAdminUser])
+def overview_cache_metrics(request):
+    """
+    Hit rate of the dashboard overview cache (DELETE resets the counters)
+    """
+    if request.method == 'DELETE':
+        reset_overview_cache_stats()
+    return Response(overview_cache_stats())
+
 @api_view(['GET', 'PUT'])
 @permission_classes([IsAuthenticated])
 def user_profile(request):
@@ -234,7 +240,7 @@ class WorkoutTemplateListView(generics.ListAPIView):
     """
     List all available workout templates
     """
-    queryset = WorkoutTemplate.objects.all()
+    queryset = optimize_queryset(WorkoutTemplate.objects.all(), WorkoutTemplateSerializer)
     serializer_class = WorkoutTemplateSerializer
     permission_classes = [IsAuthenticated]
 
@@ -246,7 +252,7 @@ class UserWorkoutListCreateView(generics.ListCreateAPIView):
     permission_classes = [IsAuthenticated]
     
     def get_queryset(self):
-        return UserWorkout.objects.filter(user=self.request.user)
+        return optimize_queryset(UserWorkout.objects.filter(user=self.request.user), self.get_serializer_class())
     
     def perform_create(self, serializer):
         serializer.save(user=self.request.user)
@@ -310,6 +316,66 @@ class MealPlanListCreateView(generics.ListCreateAPIView):
     def perform_create(self, serializer):
         serializer.save(user=self.request.user)
 
+@api_view(['POST'])
+@permission_classes([IsAuthenticated])
+def generate_meal_plan(request):
+    """
+    Generate meal plans with the AI engine and store them
+
+    Optional body fields: start_date (YYYY-MM-DD, default today), days
+    (default 7), seed, and replace (default true; false keeps dates that
+    already have meals).
+    """
+    try:
+        start_date = request.data.get('start_date')
+        start_date = datetime.strptime(start_date, '%Y-%m-%d').date() if start_date else date.today()
+        days = int(request.data.get('days', 7))
+        seed = request.data.get('seed')
+        seed = int(seed) if seed is not None else None
+        if not 1 <= days <= 31:
+            raise ValueError('days must be between 1 and 31')
+    except (TypeError, ValueError) as e:
+        return Response({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
+
+    try:
+        meals = save_meal_plan(
+            request.user,
+            start_date=start_date,
+            days=days,
+            seed=seed,
+            replace=request.data.get('replace', True) not in (False, 'false', '0', 0)
+        )
+        return Response(MealPlanSerializer(meals, many=True).data, status=status.HTTP_201_CREATED)
+    except Exception as e:
+        return Response(
+            {'error': f'Failed to generate meal plan: {str(e)}'},
+            status=status.HTTP_500_INTERNAL_SERVER_ERROR
+        )
+
+@api_view(['GET'])
+@permission_classes([IsAuthenticated])
+def nutrition_summary(request):
+    """
+    Planned nutrition totals per day or week, aggregated in the database
+
+    Query parameters: start and end (YYYY-MM-DD, inclusive; default the last
+    7 days) and bucket ('day' or 'week', default 'day'). Ranges are capped at
+    366 days for daily and about five years for weekly totals.
+    """
+    try:
+        end = request.query_params.get('end')
+        end = datetime.strptime(end, '%Y-%m-%d').date() if end else date.today()
+        start = request.query_params.get('start')
+        start = datetime.strptime(start, '%Y-%m-%d').date() if start else end - timedelta(days=6)
+        bucket = request.query_params.get('bucket', 'day')
+        if start > end:
+            raise ValueError('start must not be after end')
+        results = nutrition_totals(request.user, start, end, bucket)
+    except (ValueError, OverflowError) as e:
+        return Response({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
+
+    return Response({'start': start, 'end': end, 'bucket': bucket, 'results': results})
+
 class AchievementListView(generics.ListAPIView):
     """
     List user's achievements
@@ -328,6 +394,8 @@ def mark_achievements_read(request):
     """
     try:
         Achievement.objects.filter(user=request.user, is_new=True).update(is_new=False)
+        # Bulk updates bypass the model signals
+        invalidate_overview(request.user.id)
         return Response({'message': 'Achievements marked as read'})
     except Exception as e:
         return Response(